@@ -50,7 +50,8 @@ class ArchiveModel(TreeModel):
 
     def removeRows(self, indexes, parent = qtc.QModelIndex()):
         """
-        Removes the selected rows from the archive model.
+        Removes the selected rows from the archive model. The rows are removed from
+        the last one, so the positions of the rows still to remove are not shifted.
 
         Args:
             index (QModelIndex): the index of the item to remove
@@ -61,6 +62,7 @@ class ArchiveModel(TreeModel):
         """
 
         parentItem = self.rootItem
+        indexes = sorted(indexes, key = lambda index: index.row(), reverse = True)
 
         for index in indexes:
             item = index.internalPointer()
@@ -83,10 +85,30 @@ class ArchiveModel(TreeModel):
             bool: the success of the operation.
         """
 
+        return self.insertNodes(position, [item], parent)
+
+    def insertNodes(self, position, items, parent = qtc.QModelIndex()):
+        """
+        Insert multiple node rows starting from the specified position, with a
+        single ranged notification.
+
+        Args:
+            position (int): the index where the first item will be added
+            items (list[ComponentNode]): the nodes to add to the model
+            parent (QModelIndex): not used, the nodes are always added to the root. Defaults to qtc.QModelIndex().
+
+        Returns:
+            bool: the success of the operation.
+        """
+
         parentItem = self.rootItem
 
-        self.beginInsertRows(qtc.QModelIndex(), position, position)
-        success = parentItem.addChild(item)
+        items = list(items)
+        if not items: return True
+        if not 0 <= position <= len(parentItem): return False
+
+        self.beginInsertRows(qtc.QModelIndex(), position, position + len(items) - 1)
+        success = parentItem.insertChildren(items, position)
         self.endInsertRows()
 
         return success
@@ -1,56 +1,72 @@
 from PyQt5 import QtCore as qtc
 from PyQt5 import QtGui as qtg
+from contextlib import contextmanager
+from functools import partial
 import csv
+import os
 
 from uis import resources_rc
 
 from data_types.nodes import CompositeNodes as comp_nodes
 from data_types.nodes.ComponentNode import ComponentNode
 from data_types.trees.ComponentTree import ComponentTree
+from data_types.trees.BinaryProject import BinaryProject
+from data_types.trees.LazyLoader import LazyLoader
+from data_types.trees.TreeDiff import TreeDiff
 
 class TreeModel(qtc.QAbstractItemModel):
     """
     This class manages the tree model that stores the data for every project.
     It writes the structure in a .csv file and can also generate a tree structure
     reading the created file.
+
+    The model listens to the changes of the tree: the ones made through the model
+    functions are announced by them, row by row; the others, like the edits of
+    the nodes or the changes made in a batch of the tree, are announced when
+    they are delivered, with a single signal per parent for the feature edits
+    and a single layout change when rows are inserted or removed. Every change
+    of the content is then forwarded with the treeChanged signal.
+
+    A lazily read model keeps the key of its file until the first edit: it's the
+    content key and the undo snapshot of the model, so opening a file doesn't
+    build the pending nodes (see getHash() and getSnapshot()).
     """
 
-    HEADERS = [
-        'ID',
-        'name',
-        'description',
-        'type',
-        'manufacture',
-        'status',
-        'comment',
-        'price',
-        'quantity',
-        'packageQuantity',
-        'seller',
-        'link',
-    ]
-
-    def __init__(self, filename = None):
+    HEADERS = ComponentNode.SCHEMA.columns
+
+    treeChanged = qtc.pyqtSignal(object)
+
+    def __init__(self, filename = None, lazy = False):
         """
         Initialise the object parameters.
         If a filename is passed, the file is read and the data structure inside
         that file is extracted. If nothing is passed, creates a new root.
 
+        In lazy mode only the first level of a json file is built, the deeper
+        nodes are built when the view fetches them or the tree needs them.
+
         Args:
             filename (str): name or path of the file to read. Default is None.
+            lazy (bool): whether to build the nodes on demand. Default is False.
         """
 
         super(TreeModel, self).__init__()
 
         self.rootItem = ComponentNode()
+        self.announcing = False
+        self.layoutAnnounced = False
+        self.fileKey = None
 
         if filename:
-            self.first = ComponentTree.jsonRead(filename)
+            self.first = self._readRoot(filename, lazy)
             self.tree = ComponentTree(self.first)
+            self.fileKey = self._readKey(filename)
         else:
             self.tree = ComponentTree()
             self.first = self.tree.getRoot()
 
+        self.tree.fetcher = self._fetchChildren
+        self.tree.addListener(self._treeChanged)
         self.rootItem.addChild(self.first)
 
 # --- MODEL FUNCTIONS ---
@@ -79,12 +95,16 @@ class TreeModel(qtc.QAbstractItemModel):
 
         elif role == qtc.Qt.BackgroundRole:
             colorTuple = item.getFeature('color')
+            if colorTuple is None: return None
             return qtg.QColor(*colorTuple)
 
         elif role == qtc.Qt.DecorationRole and index.column() == 0:
             iconPath = ':/' + item.getFeature('icon')
             return qtg.QIcon(iconPath)
 
+        elif role == qtc.Qt.ToolTipRole and len(item):
+            return self.totalsToString(item.getTotals())
+
     def setData(self, index, value, role = qtc.Qt.EditRole):
         """
         Used to edit and update the model items values.
@@ -100,8 +120,13 @@ class TreeModel(qtc.QAbstractItemModel):
 
         if index.isValid() and role == qtc.Qt.EditRole:
             item = index.internalPointer()
-            item.addFeature(self.HEADERS[index.column()], value)
-            self.dataChanged.emit(index, index)
+            if self.tree.inBatch():
+                item.addFeature(self.HEADERS[index.column()], value)
+                return True
+
+            with self._announcing():
+                item.addFeature(self.HEADERS[index.column()], value)
+                self.dataChanged.emit(index, index)
             return True
         return
 
@@ -201,7 +226,8 @@ class TreeModel(qtc.QAbstractItemModel):
         childItem = index.internalPointer()
         parentItem = childItem.getParent()
 
-        if parentItem == self.rootItem:
+        # a node removed in a batch, before the views are notified
+        if parentItem is None or parentItem is self.rootItem:
             return qtc.QModelIndex()
 
         row = parentItem.getIndex()
@@ -229,6 +255,55 @@ class TreeModel(qtc.QAbstractItemModel):
 
         return len(parentItem)
 
+    def hasChildren(self, parent = qtc.QModelIndex()):
+        """
+        Returns whether the parent has children, the pending ones included, so
+        that the view shows the expansion arrow before they are fetched.
+
+        Args:
+            parent (QModelIndex): the index of the current item.
+
+        Returns:
+            bool: the item has children.
+        """
+
+        if parent.column() > 0:
+            return False
+
+        if not parent.isValid():
+            parentItem = self.rootItem
+        else:
+            parentItem = parent.internalPointer()
+
+        return len(parentItem) > 0 or parentItem.hasPendingChildren()
+
+    def canFetchMore(self, parent):
+        """
+        Returns whether the parent has pending children to fetch.
+
+        Args:
+            parent (QModelIndex): the index of the current item.
+
+        Returns:
+            bool: the item has pending children.
+        """
+
+        if not parent.isValid():
+            return False
+
+        return parent.internalPointer().hasPendingChildren()
+
+    def fetchMore(self, parent):
+        """
+        Builds the pending children of the parent and inserts their rows.
+
+        Args:
+            parent (QModelIndex): the index of the current item.
+        """
+
+        if parent.isValid():
+            self._fetchChildren(parent.internalPointer())
+
     def columnCount(self, parent):
         """
         Returns the number of columns for the children of the given parent.
@@ -256,14 +331,38 @@ class TreeModel(qtc.QAbstractItemModel):
             bool: the success of the operation
         """
 
+        return self.insertNodes(position, [item], parent)
+
+    def insertNodes(self, position, items, parent = qtc.QModelIndex()):
+        """
+        Insert multiple node rows starting from the specified position. The nodes
+        are added with a single operation and a single ranged notification, so the
+        views and proxies update once for the whole group.
+
+        Args:
+            position (int): the index where the first item will be added
+            items (list[ComponentNode]): the nodes to add to the model
+            parent (QModelIndex): the index of the parent item. Default is an invalid index
+
+        Returns:
+            bool: the success of the operation
+        """
+
         if parent.isValid():
             parentItem = parent.internalPointer()
         else:
             parentItem = self.first
 
-        self.beginInsertRows(parent.siblingAtColumn(0), position, position)
-        success = parentItem.addChild(item)
-        self.endInsertRows()
+        items = list(items)
+        if not items: return True
+        if parentItem.hasPendingChildren(): self._fetchChildren(parentItem)
+        if not 0 <= position <= len(parentItem): return False
+        if self.tree.inBatch(): return parentItem.insertChildren(items, position)
+
+        with self._announcing():
+            self.beginInsertRows(parent.siblingAtColumn(0), position, position + len(items) - 1)
+            success = parentItem.insertChildren(items, position)
+            self.endInsertRows()
 
         return success
 
@@ -284,12 +383,13 @@ class TreeModel(qtc.QAbstractItemModel):
         else:
             parentItem = self.first
 
-        self.beginRemoveRows(parent.siblingAtColumn(0), position, position)
-
         childItem = parentItem.getChildAt(position)
-        success = childItem.detach()
+        if self.tree.inBatch(): return childItem.detach()
 
-        self.endRemoveRows()
+        with self._announcing():
+            self.beginRemoveRows(parent.siblingAtColumn(0), position, position)
+            success = childItem.detach()
+            self.endRemoveRows()
 
         return success
 
@@ -299,29 +399,110 @@ class TreeModel(qtc.QAbstractItemModel):
 
     def saveFile(self, filename):
         """
-        Saves the tree structure in a .csv file, given a proper filename.
+        Saves the tree structure in a .json file, given a proper filename.
+        The files with the binary project extension are saved in that format.
 
         Args:
             filename (str): name or path of the file to save.
         """
 
-        if filename:
+        if not filename: return
+
+        if BinaryProject.isBinaryFile(filename):
+            self.tree.binarySave(filename)
+        else:
             self.tree.jsonSave(filename)
 
-    def readFile(self, filename):
+    def exportBill(self, filename):
         """
-        Reads a .json file and transforms it, if possible, into a tree data structure.
+        Exports the bill of materials of the project to a .csv or a .jsonl file,
+        by the extension. The rows are written one at a time.
+
+        Args:
+            filename (str): name or path of the file to write.
+
+        Raises:
+            ValueError: the extension is not .csv or .jsonl
+        """
+
+        self.tree.getBill().exportFile(filename)
+
+    def readFile(self, filename, lazy = False):
+        """
+        Reads a .json or binary project file and transforms it, if possible, into
+        a tree data structure.
 
         Args:
             filename (str): name or path of the file to read.
+            lazy (bool): whether to build the nodes on demand. Default is False.
         """
 
         if filename:
-            self.tree = ComponentTree.jsonRead(filename)
-            self.first = self.tree.getRoot()
-            self.rootItem.children = []
+            self.first = self._readRoot(filename, lazy)
+            self.tree = ComponentTree(self.first)
+            self.fileKey = self._readKey(filename)
+            self.tree.fetcher = self._fetchChildren
+            self.tree.addListener(self._treeChanged)
+            self.rootItem.removeChildren(self.rootItem.getChildren())
             self.rootItem.addChild(self.first)
 
+    def compareFile(self, filename):
+        """
+        Returns the differences of the tree from the one of a .json or binary
+        project file, like its saved version. The pending nodes are fetched.
+
+        Args:
+            filename (str): name or path of the file to compare.
+
+        Returns:
+            TreeDiff: the differences going from the file to the tree.
+        """
+
+        return TreeDiff.compare(ComponentTree(self._readRoot(filename, False)), self.tree)
+
+    @staticmethod
+    def _readRoot(filename, lazy):
+        """
+        Private function.
+        Reads the root of a tree from a .json or binary project file, by its extension.
+        The json files can be read lazily.
+        """
+
+        if BinaryProject.isBinaryFile(filename): return ComponentTree.binaryRead(filename)
+        if lazy: return LazyLoader.readFile(filename)
+        return ComponentTree.jsonRead(filename)
+
+    def _readKey(self, filename):
+        """
+        Private function.
+        Returns the key of a file just read if the tree has pending nodes: its
+        path, its size and its modification time. Returns None otherwise.
+        """
+
+        if not self.isLazy(): return None
+
+        status = os.stat(filename)
+        return (os.path.abspath(filename), status.st_size, status.st_mtime_ns)
+
+    @staticmethod
+    def _readText(key):
+        """
+        Private function.
+        Returns the text of a file with its key (see _readKey()), the snapshot of
+        a lazily read model.
+
+        Raises:
+            OSError: the file changed since it was read
+        """
+
+        filename, size, mtime = key
+        status = os.stat(filename)
+        if (status.st_size, status.st_mtime_ns) != (size, mtime):
+            raise OSError(f'{filename!r} changed since it was read')
+
+        with open(filename, 'r', newline = '') as file:
+            return file.read()
+
     def readString(self, string):
         """
         Reads a json string and transforms it, if possible, into a tree data structure.
@@ -333,9 +514,214 @@ class TreeModel(qtc.QAbstractItemModel):
         if string:
             self.first = ComponentTree.jsonParse(string)
             self.tree = ComponentTree(self.first)
-            self.rootItem.children = []
+            self.fileKey = None
+            self.tree.fetcher = self._fetchChildren
+            self.tree.addListener(self._treeChanged)
+            self.rootItem.removeChildren(self.rootItem.getChildren())
             self.rootItem.addChild(self.first)
 
+# LAZY LOADING
+
+    def isLazy(self):
+        """
+        Returns whether some nodes of the tree are not built yet.
+
+        Returns:
+            bool: the tree has pending nodes.
+        """
+
+        return self.tree.hasPendingNodes()
+
+    def _fetchChildren(self, node):
+        """
+        Private function.
+        Builds the pending children of a node, announcing the new rows. Used by
+        the tree when a function needs every node.
+
+        Args:
+            node (ComponentNode): the node with pending children.
+        """
+
+        if self.tree.inBatch():
+            node.fetchChildren()
+            return
+
+        position = len(node)
+        count = node.getPendingCount()
+        index = self.createIndex(node.getIndex(), 0, node)
+
+        with self._announcing():
+            self.beginInsertRows(index, position, position + count - 1)
+            node.fetchChildren()
+            self.endInsertRows()
+
+# BATCHES
+
+    @contextmanager
+    def batch(self):
+        """
+        Runs the changes made in the block in a batch of the tree (see
+        AbstractTree.batch()). The views are notified once, with a layout change,
+        when the batch ends. The batches can be nested.
+        """
+
+        if self.tree.inBatch():
+            yield
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        self.layoutAnnounced = True
+        try:
+            with self.tree.batch():
+                yield
+        finally:
+            # a batch without changes is not delivered
+            if self.layoutAnnounced: self._changeLayout()
+
+    @contextmanager
+    def _announcing(self):
+        """
+        Private function.
+        Runs a change that the model announces to the views itself, as a batch of
+        the tree: when it's delivered it's only forwarded.
+        """
+
+        self.announcing = True
+        try:
+            with self.tree.batch():
+                yield
+        finally:
+            self.announcing = False
+
+    def _treeChanged(self, changes):
+        """
+        Private function.
+        Announces to the views the changes delivered by the tree, unless the model
+        already did, then forwards them if the content changed.
+
+        Args:
+            changes (TreeChanges): the changes of the tree.
+        """
+
+        if not self.announcing:
+            if self.layoutAnnounced or changes.isStructural(): self._changeLayout()
+            else: self._emitDataChanged(changes)
+
+        if changes.hasEdits():
+            self.fileKey = None
+            self.treeChanged.emit(changes)
+
+    def _changeLayout(self):
+        """
+        Private function.
+        Announces a change of the rows: the persistent indexes are moved to the
+        current rows of their nodes, the ones of the removed nodes become invalid.
+        """
+
+        if not self.layoutAnnounced: self.layoutAboutToBeChanged.emit()
+        self.layoutAnnounced = False
+
+        oldIndexes = self.persistentIndexList()
+        newIndexes = []
+        for index in oldIndexes:
+            node = index.internalPointer()
+            if node.getTree() is self.tree:
+                newIndexes.append(self.createIndex(node.getIndex(), index.column(), node))
+            else:
+                newIndexes.append(qtc.QModelIndex())
+
+        self.changePersistentIndexList(oldIndexes, newIndexes)
+        self.layoutChanged.emit()
+
+    def _emitDataChanged(self, changes):
+        """
+        Private function.
+        Announces the edited nodes, with one signal for the range of edited rows
+        of every parent.
+
+        Args:
+            changes (TreeChanges): the changes of the tree.
+        """
+
+        ranges = {}
+        for node in changes.getChangedNodes():
+            if node.getTree() is not self.tree: continue
+
+            parent = node.getParent()
+            row = node.getIndex()
+            rowRange = ranges.get(id(parent))
+            if rowRange is None: ranges[id(parent)] = [parent, row, row]
+            elif row < rowRange[1]: rowRange[1] = row
+            elif row > rowRange[2]: rowRange[2] = row
+
+        lastColumn = len(self.HEADERS) - 1
+        for parent, first, last in ranges.values():
+            topLeft = self.createIndex(first, 0, parent.getChildAt(first))
+            bottomRight = self.createIndex(last, lastColumn, parent.getChildAt(last))
+            self.dataChanged.emit(topLeft, bottomRight)
+
+# TOTALS
+
+    def getTotals(self):
+        """
+        Returns the totals of the whole project. The totals are cached in the nodes,
+        so this doesn't walk the tree.
+
+        Returns:
+            NodeTotals: the totals of the project
+        """
+
+        return self.tree.getTotals()
+
+    @staticmethod
+    def totalsToString(totals):
+        """
+        Returns a one line description of the passed totals.
+
+        Args:
+            totals (NodeTotals): the totals to describe
+
+        Returns:
+            str: the description of the totals
+        """
+
+        return (
+            f'Pieces: {totals.getPieces():g}  |  '
+            f'Unique pieces: {totals.getUniquePieces()}  |  '
+            f'Hardware: {totals.getHardware():g}  |  '
+            f'Assemblies: {totals.getAssemblies():g}  |  '
+            f'Price: {totals.getPrice():.2f}'
+        )
+
+# CONTENT HASH
+
+    def getHash(self):
+        """
+        Returns the content key of the tree: the digest of the tree, or the key of
+        its file if it was read lazily and not edited since, so the pending nodes
+        are not built. The hashes are cached in the nodes, so after an edit only
+        the path to the root is hashed again.
+
+        Returns:
+            bytes | tuple: the content key of the tree
+        """
+
+        if self.fileKey is not None: return self.fileKey
+        return self.tree.getHash()
+
+    def getSnapshot(self):
+        """
+        Returns a snapshot of the tree for the undo stack: its json text. The
+        snapshot of a tree read lazily and not edited since is deferred: it's a
+        function that reads the text of the file (see UndoStack.addSnapshot()).
+
+        Returns:
+            str | callable: the snapshot of the tree
+        """
+
+        if self.fileKey is not None: return partial(self._readText, self.fileKey)
+        return str(self)
+
 # UTILITY
 
     def swapComponent(self, position, newNode, parent = qtc.QModelIndex()):
@@ -348,8 +734,9 @@ class TreeModel(qtc.QAbstractItemModel):
             parent (QModelIndex): the index of the parent item. Default is an invalid index.
         """
 
-        self.removeRows(position, parent)
-        self.insertRows(position, newNode, parent)
+        with self.batch():
+            self.removeRows(position, parent)
+            self.insertRows(position, newNode, parent)
 
     def getNewNode(self, parent, classname):
         """
@@ -43,7 +43,9 @@ class MainWindow(qtw.QMainWindow, ui):
 
 # undo stack init
         self.unsavedChanges = False
+        self.savedHash = None
         self.undoStack = UndoStack()
+        self.undoableDepth = 0
 
 # settings window init
         self.settingsWindow = SettingsWindow()
@@ -61,6 +63,9 @@ class MainWindow(qtw.QMainWindow, ui):
         self.componentsPage.fileSaved.connect(self.settingsWindow.addRecentFile)
         self.componentsPage.nodeAdded.connect(self._undoable)
         self.componentsPage.nodeAdded.connect(self._producesChanges)
+        self.componentsPage.treeChanged.connect(self._undoable)
+        self.componentsPage.treeChanged.connect(self._producesChanges)
+        self.componentsPage.totalsChanged.connect(self.uiStatusbar.showMessage)
 
         self._openLatest()
         self._updateRecentFilesMenu()
@@ -83,6 +88,7 @@ class MainWindow(qtw.QMainWindow, ui):
         self.uiActSaveas.triggered.connect(self.saveFileAs)
         self.uiActExportBill.triggered.connect(self.exportBill)
         self.uiActClear.triggered.connect(self.clearFile)
+        self.uiActCompare.triggered.connect(self.compareFile)
 
         self.uiActSettings.triggered.connect(self.openSettings)
 
@@ -124,6 +130,7 @@ class MainWindow(qtw.QMainWindow, ui):
 
         self.componentsPage.resetModel()
         self.tabWidget.setCurrentIndex(0)
+        self._markSaved()
 
     @decor.askSave
     def openFile(self, filename = None, *args):
@@ -143,6 +150,8 @@ class MainWindow(qtw.QMainWindow, ui):
             except Exception:
                 dialogs.fileReadError()
 
+            self._markSaved()
+
     @decor.ifHasModel
     def saveFile(self, *args):
         """
@@ -150,7 +159,9 @@ class MainWindow(qtw.QMainWindow, ui):
         to the user.
         """
 
-        if self.componentsPage.saveModel(): self.unsavedChanges = False
+        # the deferred snapshots read the file the save may overwrite
+        self._loadSnapshots()
+        if self.componentsPage.saveModel(): self._markSaved()
 
     @decor.ifHasModel
     def saveFileAs(self, *args):
@@ -158,10 +169,30 @@ class MainWindow(qtw.QMainWindow, ui):
         Saves a file with a new name.
         """
 
-        if self.componentsPage.saveModelAs(): self.unsavedChanges = False
+        self._loadSnapshots()
+        if self.componentsPage.saveModelAs(): self._markSaved()
 
+    @decor.ifHasModel
     def exportBill(self, *args):
-        pass
+        """
+        Exports the bill of materials of the current file.
+        """
+
+        self.componentsPage.exportBill()
+
+    @decor.ifHasModel
+    def compareFile(self, *args):
+        """
+        Shows the changes of the current file from its saved version.
+        """
+
+        # without unsaved changes the saved file is not read
+        if not self.unsavedChanges: return dialogs.changesDialog('')
+
+        diff = self.componentsPage.compareModel()
+        if diff is None: return dialogs.notSavedError()
+
+        dialogs.changesDialog(diff.toString())
 
     @decor.askSave
     def clearFile(self, *args):
@@ -170,6 +201,7 @@ class MainWindow(qtw.QMainWindow, ui):
         """
 
         self.componentsPage.clearModel()
+        self._markSaved()
 
     def openSettings(self):
         """
@@ -265,7 +297,13 @@ class MainWindow(qtw.QMainWindow, ui):
         Undo the current action.
         """
 
-        string = self.undoStack.undo()
+        try:
+            string = self.undoStack.undo()
+        except OSError:
+            string = None
+
+        # a lost snapshot keeps the current model
+        if string is None: return dialogs.snapshotLostError()
         self.componentsPage.readJsonString(string)
 
     @decor.componentsAction
@@ -275,7 +313,13 @@ class MainWindow(qtw.QMainWindow, ui):
         Redo the currently undone action.
         """
 
-        string = self.undoStack.redo()
+        try:
+            string = self.undoStack.redo()
+        except OSError:
+            string = None
+
+        # a lost snapshot keeps the current model
+        if string is None: return dialogs.snapshotLostError()
         self.componentsPage.readJsonString(string)
 
 # --- VIEW MENU FUNCTIONS ---
@@ -322,12 +366,49 @@ class MainWindow(qtw.QMainWindow, ui):
     @decor.producesChanges
     def _producesChanges(self, *args):
         """
-        Sets the unsaved changes variable to true. Used in functions that cannot
+        Updates the unsaved changes variable. Used in functions that cannot
         use the corresponding decorator.
         """
 
         pass
 
+    def _markSaved(self):
+        """
+        Stores the content key of the current model as the saved state, there
+        are no unsaved changes. A lazily read model is not built: its key is the
+        one of the file until the first edit.
+        """
+
+        model = self.componentsPage.getModel()
+        self.savedHash = model.getHash() if model else None
+        self.unsavedChanges = False
+
+    def _updateUnsavedChanges(self):
+        """
+        Sets the unsaved changes variable comparing the content key of the current
+        model with the saved one. Undoing back to the saved state clears it: the
+        restored snapshot keeps the key it was taken with, like the file key of a
+        lazily read model.
+        """
+
+        model = self.componentsPage.getModel()
+        if model is None or self.undoStack.isCurrent(self.savedHash):
+            self.unsavedChanges = False
+        else:
+            self.unsavedChanges = model.getHash() != self.savedHash
+
+    def _loadSnapshots(self):
+        """
+        Loads the deferred snapshots of the undo stack, the texts of the lazily
+        read files, before the files can change. A snapshot whose file already
+        changed is lost, with a warning.
+        """
+
+        try:
+            self.undoStack.loadSnapshots()
+        except OSError:
+            dialogs.snapshotLostError()
+
     @decor.undoable
     def _undoable(self, *args):
         """
@@ -428,4 +509,7 @@ class MainWindow(qtw.QMainWindow, ui):
             filename = recentFiles[0]
 
         self.componentsPage.readModel(filename)
-        self.undoStack.addSnapshot(str(self.componentsPage.getModel()), 'init')
+        self._markSaved()
+
+        model = self.componentsPage.getModel()
+        self.undoStack.addSnapshot(model.getSnapshot(), 'init', model.getHash())
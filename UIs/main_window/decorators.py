@@ -185,7 +185,8 @@ def askSave(func):
 
 def producesChanges(func):
     """
-    Updates the variable for unsaved changes.
+    Updates the variable for unsaved changes, comparing the content key of the
+    model with the one of the last save.
 
     Args:
         func (PyFunction): the function that produces unsaved changes
@@ -196,7 +197,7 @@ def producesChanges(func):
         self = args[0]
 
         val = func(*args, **kwargs)
-        self.unsavedChanges = True
+        self._updateUnsavedChanges()
         return val
 
     return wrapper
@@ -204,6 +205,10 @@ def producesChanges(func):
 def undoable(func):
     """
     Adds a snapshot to the UndoStack to undo the currently performed action.
+    The snapshot is skipped if the content key of the model didn't change.
+    The undoable functions run by another one, like the slots of the changes
+    made by an action, don't take a snapshot: the outermost one takes it, with
+    its name.
 
     Args:
         func (PyFunction): the function that is undoable
@@ -213,11 +218,24 @@ def undoable(func):
     def wrapper(*args, **kwargs):
         self = args[0]
 
-        val = func(*args, **kwargs)
+        self.undoableDepth += 1
+        try:
+            val = func(*args, **kwargs)
+        finally:
+            self.undoableDepth -= 1
+
+        if self.undoableDepth: return val
+
+        model = self.componentsPage.getModel()
+        key = model.getHash() if model else None
+        if self.undoStack.isCurrent(key): return val
+
+        # a new change: the deferred snapshots are read while their file is unchanged
+        self._loadSnapshots()
 
-        data = str(self.componentsPage.getModel())
+        data = model.getSnapshot() if model else str(model)
         name = func.__name__
-        self.undoStack.addSnapshot(data, name)
+        self.undoStack.addSnapshot(data, name, key)
 
         return val
 
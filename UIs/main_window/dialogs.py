@@ -84,7 +84,7 @@ def openDialog():
         None,
         "Select a file to open...",
         qtc.QDir.homePath(),
-        'JSON Documents (*.json) ;; All Files (*)',
+        'JSON Documents (*.json) ;; Binary Projects (*.prjb) ;; All Files (*)',
         'JSON Documents (*.json)'
     )
 
@@ -102,11 +102,52 @@ def saveDialog():
         None,
         "Select the file to save to...",
         qtc.QDir.homePath(),
-        'JSON Documents (*.json)'
+        'JSON Documents (*.json) ;; Binary Projects (*.prjb)'
+    )
+
+    return filename
+
+def exportDialog():
+    """
+    Returns a filename if a file is selected from the browser, for the export of
+    the bill of materials.
+
+    Returns:
+        str: the filename selected
+    """
+
+    filename, _ = qtw.QFileDialog.getSaveFileName(
+        None,
+        "Select the file to export the bill to...",
+        qtc.QDir.homePath(),
+        'CSV Documents (*.csv) ;; JSON Lines Documents (*.jsonl)'
     )
 
     return filename
 
+# changes
+def changesDialog(changes):
+    """
+    Shows the changes of the current file from the saved one, one per line, in
+    the details of an information dialog.
+
+    Args:
+        changes (str): the changes, one per line, empty if there are none
+    """
+
+    msgBox = qtw.QMessageBox()
+    msgBox.setIcon(qtw.QMessageBox.Information)
+    msgBox.setWindowTitle('Changes...')
+
+    if changes:
+        count = changes.count('\n') + 1
+        msgBox.setText(f'{count} changes from the saved file.')
+        msgBox.setDetailedText(changes)
+    else:
+        msgBox.setText('No changes from the saved file.')
+
+    return msgBox.exec_()
+
 # ERRORS
 
 def pageError():
@@ -127,6 +168,12 @@ def levelError():
 def typeError():
     return _okDialog('Warning!', 'The selected item is not of the correct type!')
 
+def snapshotLostError():
+    return _okDialog('Warning!', 'The file changed since it was opened, the undo steps before the first edit are lost!')
+
+def notSavedError():
+    return _okDialog('Warning!', 'The current file was never saved!')
+
 # QUESTIONS
 
 def askSave():
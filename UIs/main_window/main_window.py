@@ -195,6 +195,8 @@ class Ui_uiMainWindow(object):
         self.uiActExpandOne.setObjectName("uiActExpandOne")
         self.uiActSettings = QtWidgets.QAction(uiMainWindow)
         self.uiActSettings.setObjectName("uiActSettings")
+        self.uiActCompare = QtWidgets.QAction(uiMainWindow)
+        self.uiActCompare.setObjectName("uiActCompare")
         self.menuFile.addAction(self.uiActNew)
         self.menuFile.addAction(self.uiActSave)
         self.menuFile.addAction(self.uiActSaveas)
@@ -204,6 +206,8 @@ class Ui_uiMainWindow(object):
         self.menuFile.addAction(self.uiActExportBill)
         self.menuFile.addAction(self.uiActExportArchive)
         self.menuFile.addSeparator()
+        self.menuFile.addAction(self.uiActCompare)
+        self.menuFile.addSeparator()
         self.menuFile.addAction(self.uiActSettings)
         self.menuAdd.addAction(self.uiActAddAssembly)
         self.menuAdd.addAction(self.uiActAddPart)
@@ -300,4 +304,5 @@ class Ui_uiMainWindow(object):
         self.uiActExportArchive.setText(_translate("uiMainWindow", "Export Archive"))
         self.uiActExpandOne.setText(_translate("uiMainWindow", "Expand Next Level"))
         self.uiActSettings.setText(_translate("uiMainWindow", "Settings..."))
+        self.uiActCompare.setText(_translate("uiMainWindow", "Compare with Saved..."))
 from .. import resources_rc
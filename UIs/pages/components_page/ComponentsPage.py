@@ -4,7 +4,10 @@ from PyQt5 import QtCore as qtc
 
 from models.tree.Model import TreeModel
 from models.tree.Proxy import TreeProxy
-from ...main_window.dialogs import saveDialog
+from data_types.trees.BillOfMaterials import BillOfMaterials
+from data_types.trees.Predicates import In
+from data_types.nodes.NodeTotals import NodeTotals
+from ...main_window.dialogs import saveDialog, exportDialog
 
 from ...widgets.component_editor.ComponentEditor import ComponentEditor
 from ...popups.newcomponent_editor.NewComponentEditor import NewComponentEditor
@@ -21,6 +24,8 @@ class ComponentsPage(qtw.QWidget, ui):
 
     fileSaved = qtc.pyqtSignal(str)
     nodeAdded = qtc.pyqtSignal(object)
+    treeChanged = qtc.pyqtSignal(object)
+    totalsChanged = qtc.pyqtSignal(str)
 
     def __init__(self):
         """
@@ -61,9 +66,18 @@ class ComponentsPage(qtw.QWidget, ui):
             self.selection = self.uiView.selectionModel()
             self.selection.currentChanged.connect(self._mapIndex)
             self.model.dataChanged.connect(self.hideDeprecated)
-            self.expandAll()
+            self.model.treeChanged.connect(self._emitTotals)
+            self.model.treeChanged.connect(self.treeChanged)
+
+            # a lazy model shows the first level, the rest is fetched on expansion
+            if self.model.isLazy():
+                self.uiView.expandToDepth(0)
+                self.expandLvl = 0
+            else:
+                self.expandAll()
 
         self._resizeView()
+        self._emitTotals()
 
     def setManufactureModel(self, manufactureModel):
         """
@@ -158,6 +172,17 @@ class ComponentsPage(qtw.QWidget, ui):
 
 # --- UTILITY ---
 
+    def _emitTotals(self, *args):
+        """
+        Emits the description of the current model totals. The totals are kept
+        updated by the nodes, so this is cheap on any model size.
+        """
+
+        if self.model:
+            self.totalsChanged.emit(self.model.totalsToString(self.model.getTotals()))
+        else:
+            self.totalsChanged.emit('')
+
     def _resizeView(self):
         """
         Updates the view resizing the columns to a specified value and expanding the tree.
@@ -200,7 +225,7 @@ class ComponentsPage(qtw.QWidget, ui):
         """
 
         self.filename = filename
-        self.setModel(TreeModel(filename))
+        self.setModel(TreeModel(filename, lazy = True))
 
     def saveModel(self):
         """
@@ -235,6 +260,36 @@ class ComponentsPage(qtw.QWidget, ui):
             return True
         return False
 
+    def exportBill(self):
+        """
+        Exports the bill of materials of the current model to the chosen file. The
+        files without a .csv or .jsonl extension are written as .csv.
+
+        Returns:
+            bool: if the bill is exported or not
+        """
+
+        filename = exportDialog()
+        if not filename: return False
+
+        extensions = (BillOfMaterials.CSV_EXTENSION, BillOfMaterials.JSON_LINES_EXTENSION)
+        if not filename.lower().endswith(extensions): filename += BillOfMaterials.CSV_EXTENSION
+
+        self.model.exportBill(filename)
+        return True
+
+    def compareModel(self):
+        """
+        Returns the differences of the current model from its saved file, None if
+        the model has no file.
+
+        Returns:
+            TreeDiff: the differences from the saved file
+        """
+
+        if not self.filename: return None
+        return self.model.compareFile(self.filename)
+
     def clearModel(self):
         """
         Clears the model and sets the filename to None.
@@ -269,15 +324,26 @@ class ComponentsPage(qtw.QWidget, ui):
             newNode (ComponentNode): the new node to add
         """
 
+        self.addNodes([newNode])
+
+    def addNodes(self, newNodes):
+        """
+        Adds multiple component nodes to the tree in the selected location, with a
+        single model insertion.
+
+        Args:
+            newNodes (list[ComponentNode]): the new nodes to add
+        """
+
         currentIndex = self.getCurrentIndex()
         parentItem = currentIndex.internalPointer()
 
-        self.model.insertRows(len(parentItem), newNode, currentIndex)
+        self.model.insertNodes(len(parentItem), newNodes, currentIndex)
         currentIndex = self.proxy.mapFromSource(self.getCurrentIndex().siblingAtColumn(0))
         self.uiView.expandRecursively(currentIndex, 0)
 
         self._resizeView()
-        self.nodeAdded.emit(newNode)
+        self.nodeAdded.emit(newNodes)
 
     def removeNode(self):
         """
@@ -315,7 +381,8 @@ class ComponentsPage(qtw.QWidget, ui):
 
     def updateSpecialNodes(self, archiveNodes):
         """
-        Updates the fields of all the hardware archive nodes inside the tree.
+        Updates the fields of all the hardware archive nodes inside the tree, in a
+        single batch of the model.
 
         Args:
             archiveNodes (list[ComponentNode]): the list of archive nodes
@@ -333,13 +400,16 @@ class ComponentsPage(qtw.QWidget, ui):
             'link'
         ]
 
-        hardwareNodes = self.model.tree.getHardwareNodes()
+        archive = {aNode.getFeature('ID'): aNode for aNode in archiveNodes}
+        hardwareNodes = self.model.tree.query(
+            In('ID', archive),
+            In('type', NodeTotals.HARDWARE_TYPES)
+        )
 
-        for hNode in hardwareNodes:
-            for aNode in archiveNodes:
-                if hNode == aNode:
-                    features = aNode.getFeatures(*COLUMNS_TO_UPDATE)
-                    hNode.addFeatures(**features)
+        with self.model.batch():
+            for hNode in hardwareNodes:
+                features = archive[hNode.getFeature('ID')].getFeatures(*COLUMNS_TO_UPDATE)
+                hNode.addFeatures(**features)
 
         self._resizeView()
 
@@ -352,11 +422,12 @@ class ComponentsPage(qtw.QWidget, ui):
 
     def copyNode(self):
         """
-        Copies and stores the currently selected node.
+        Copies and stores the currently selected node. The copy shares the features
+        with the original nodes until one of them is modified.
         """
 
         currentNode = self.getCurrentNode()
-        self.copiedNode = currentNode.deepCopy()
+        self.copiedNode = currentNode.deepCopy(share = True)
 
     def pasteNode(self):
         """
@@ -365,7 +436,7 @@ class ComponentsPage(qtw.QWidget, ui):
         """
 
         if self.copiedNode:
-            newNode = self.copiedNode.deepCopy()
+            newNode = self.copiedNode.deepCopy(share = True)
             self.addNode(newNode)
 
 # VIEW MENU
@@ -391,6 +462,7 @@ class ComponentsPage(qtw.QWidget, ui):
         Expands all of the items in the view.
         """
 
+        self.model.tree.fetchAll()
         self.uiView.expandAll()
         self.expandLvl = self.model.tree.getHeight() - 1
 
@@ -0,0 +1,129 @@
+"""
+Benchmark of the tree traversals: compares the iterative postorder of
+AbstractTree with a recursive one, on a wide tree and on a deep chain, for
+a full walk and for a walk stopped at the first node.
+
+Run from the repository root:
+    python benchmarks/traversals.py
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_types.nodes.CompositeNodes import AssemblyNode, LeafNode
+from data_types.trees.ComponentTree import ComponentTree
+
+REPEATS = 5
+
+def recursivePostorder(node):
+    """
+    Iters through the nodes of a subtree from leaf to root level, recursively.
+    The reference for the iterative version.
+
+    Args:
+        node (AbstractNode): the root of the subtree
+
+    Yields:
+        AbstractNode: the next node to visit
+    """
+
+    for child in node.getChildren():
+        yield from recursivePostorder(child)
+    yield node
+
+def wideTree(assemblies = 100, parts = 1000):
+    """
+    Returns a tree with a level of assemblies, each one with a level of parts.
+
+    Args:
+        assemblies (int): the number of assemblies. Defaults to 100.
+        parts (int): the number of parts of every assembly. Defaults to 1000.
+
+    Returns:
+        ComponentTree: the tree
+    """
+
+    tree = ComponentTree()
+    for assembly in range(assemblies):
+        node = AssemblyNode(ID = f'#A{assembly:02d}-000')
+        node.addChildren([LeafNode(ID = f'#P{assembly:02d}-{part:03d}') for part in range(parts)])
+        tree.getRoot().addChild(node)
+
+    return tree
+
+def deepTree(depth = 5000):
+    """
+    Returns a tree made of a single chain of assemblies.
+
+    Args:
+        depth (int): the length of the chain. Defaults to 5000.
+
+    Returns:
+        ComponentTree: the tree
+    """
+
+    tree = ComponentTree()
+    node = tree.getRoot()
+    for level in range(depth):
+        child = AssemblyNode(ID = f'#C{level:06d}')
+        node.addChild(child)
+        node = child
+
+    return tree
+
+def timeIt(function):
+    """
+    Returns the best time of REPEATS calls of a function, in milliseconds.
+
+    Args:
+        function (callable): the timed function
+
+    Returns:
+        float: the best time
+    """
+
+    best = float('inf')
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best * 1000
+
+def compare(name, tree):
+    """
+    Checks that both postorders visit the same nodes in the same order, then
+    prints the times of a full walk and of a walk stopped at the first node.
+
+    Args:
+        name (str): the name of the tree
+        tree (ComponentTree): the tree
+    """
+
+    root = tree.getRoot()
+    iterative = list(tree._iterPostorder(root))
+    if [id(node) for node in iterative] != [id(node) for node in recursivePostorder(root)]:
+        raise AssertionError(f'{name}: the postorders differ')
+
+    full = (
+        timeIt(lambda: sum(1 for _ in recursivePostorder(root))),
+        timeIt(lambda: sum(1 for _ in tree._iterPostorder(root)))
+    )
+    first = (
+        timeIt(lambda: next(recursivePostorder(root))),
+        timeIt(lambda: tree.walk('postorder').first())
+    )
+
+    print(f'{name} ({len(iterative)} nodes)')
+    print(f'    full walk:  recursive {full[0]:8.3f} ms, iterative {full[1]:8.3f} ms')
+    print(f'    first node: recursive {first[0]:8.3f} ms, iterative {first[1]:8.3f} ms')
+
+if __name__ == '__main__':
+    # the recursive version needs a frame per level
+    sys.setrecursionlimit(20000)
+
+    compare('wide tree', wideTree())
+    compare('deep chain', deepTree())
@@ -18,6 +18,7 @@ def parse(inCSV, outJSON):
 
         # tree creation
         tree = ComponentTree(firstNode)
+        tree.addIndex('selfHash', unique = True)
 
         for line in csv_reader:
             # dict cleaning
@@ -63,16 +64,18 @@ def parse(inCSV, outJSON):
         for node in tree.iterPreorder():
             node.delFeatures('selfHash', 'parentHash')
             if node.comment == '-':
-                node.comment = None
+                node.addFeature('comment', None)
             if node.link == '' or node.link == '-':
-                node.link = None
+                node.addFeature('link', None)
             if node.packageQuantity == '':
-                node.packageQuantity = 1
+                node.addFeature('packageQuantity', 1)
             if node.seller == '' or node.seller == '-':
-                node.seller = None
-            node.price = float(node.price)
-            node.quantity = int(node.quantity)
-            node.packageQuantity = int(node.packageQuantity)
+                node.addFeature('seller', None)
+            node.addFeatures(
+                price = float(node.price),
+                quantity = int(node.quantity),
+                packageQuantity = int(node.packageQuantity)
+            )
 
         # json loading
         tree.jsonSave(outJSON)
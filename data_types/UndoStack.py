@@ -21,24 +21,52 @@ class UndoStack():
 
 # CHANGES MANAGEMENT
 
-    def addSnapshot(self, snapshot, name = 'unnamed change'):
+    def addSnapshot(self, snapshot, name = 'unnamed change', key = None):
         """
         Adds a new change snapshot to the stack. Before doing so it clears the
         redo segment (items ahead of the head). After adding the snapshot clears
         the overflow.
 
+        The key identifies the content of the snapshot: the snapshots with the
+        same key share the same stored item. A callable snapshot is deferred: it
+        is called to get the item the first time the item is returned, or when
+        the deferred snapshots are loaded (see loadSnapshots()).
+
         Args:
             snapshot (PyObject): the save item
             name (str): the name of the change performed. Default at unnamed change.
+            key (PyObject): the content key of the snapshot, like a hash. Defaults to None.
         """
 
         self._clearRedoSegment()
 
-        snapshot = (snapshot, name)
-        self.memory.insert(0, snapshot)
+        if key is not None:
+            for storedSnapshot, _, storedKey in self.memory:
+                if storedKey == key:
+                    snapshot = storedSnapshot
+                    break
+
+        self.memory.insert(0, (snapshot, name, key))
 
         self._clearOverflow()
 
+    def isCurrent(self, key):
+        """
+        Returns whether the current snapshot has the passed content key, so a new
+        snapshot with the key would not change anything.
+
+        Args:
+            key (PyObject): the content key
+
+        Returns:
+            bool: the current snapshot has the key
+        """
+
+        if self._isEmpty() or key is None: return False
+
+        _, _, currentKey = self.memory[self.head]
+        return currentKey == key
+
     def undo(self):
         """
         If possible, move the head back one position (increments it) and returns
@@ -53,8 +81,7 @@ class UndoStack():
         if self.head + 1 < len(self.memory) and not self._isEmpty():
             self.head += 1
 
-        snapshot, _ = self.memory[self.head]
-        return snapshot
+        return self._load(self.head)
 
     def redo(self):
         """
@@ -70,11 +97,58 @@ class UndoStack():
         if self.head - 1 >= 0:
             self.head -= 1
 
-        snapshot, _ = self.memory[self.head]
-        return snapshot
+        return self._load(self.head)
+
+    def loadSnapshots(self):
+        """
+        Calls every deferred snapshot, storing its item. Used before the source
+        of the deferred snapshots changes, like the file they read. The other
+        snapshots are loaded even if one fails.
+
+        Raises:
+            Exception: the last error of a deferred snapshot (see _load())
+        """
+
+        error = None
+        for position in range(len(self.memory)):
+            try:
+                self._load(position)
+            except Exception as exception:
+                error = exception
+
+        if error is not None: raise error
 
 # UTILITY
 
+    def _load(self, position):
+        """
+        Returns the item at the passed position, calling the snapshot first if
+        it's deferred. The item replaces the snapshot in every position sharing it.
+        A deferred snapshot that raises an error is replaced by None, the item is
+        lost and the snapshot is not called again.
+
+        Args:
+            position (int): the position in the stack
+
+        Returns:
+            PyObject: the stored item
+
+        Raises:
+            Exception: the error of the deferred snapshot
+        """
+
+        deferred = self.memory[position][0]
+        if not callable(deferred): return deferred
+
+        snapshot = None
+        try:
+            snapshot = deferred()
+        finally:
+            for index, (storedSnapshot, name, key) in enumerate(self.memory):
+                if storedSnapshot is deferred: self.memory[index] = (snapshot, name, key)
+
+        return snapshot
+
     def _clearRedoSegment(self):
         """
         Removes the items in the list segment between index 0 and the head value.
@@ -121,11 +195,11 @@ class UndoStack():
         """
 
         string = ''
-        for snapshot, name in self.memory:
+        for position, (_, name, _) in enumerate(self.memory):
             string += f'{name}'
-            if self.memory.index((snapshot, name)) == self.head:
+            if position == self.head:
                 string += f' <-- current change'
-            if self.memory.index((snapshot, name)) == 0:
+            if position == 0:
                 string += ' <-- latest change'
             string += '\n'
 
@@ -1,22 +1,153 @@
+import hashlib
+
+from .FeatureSchema import FeatureSchema
+
+# registry of the node classes, by class name
+NODE_CLASSES = {}
+
 class AbstractNode():
     """
     Class that describes the basic behaviour of a tree node.
     Provides insertion, deletion, copying, ancestor traversal, features
     and properties managers, representation and basic getters.
+
+    The feature values are stored once, in a plain list. The position of every
+    key is held by a FeatureLayout shared between the nodes with the same keys,
+    so the lookup is O(1) and nodes don't carry a per instance __dict__.
+    Every new node starts from the layout and the default values of the class
+    schema.
+
+    Every child caches its own position in the children list of the parent,
+    with the number of shifts of the parent it already counts. An insertion or
+    a removal before the end of the list doesn't renumber the following
+    children: the parent logs the shift, and a child asked for its position
+    replays the shifts logged after its own. The log is kept shorter than the
+    square root of the number of children, by renumbering them all when it
+    grows past it, so lookups and edits cost O(sqrt(n)). The children are
+    renumbered as well once the replayed shifts outnumber them, so asking for
+    the position of every child costs O(n). Appending doesn't log anything.
+    The children stay in a plain list, the cheapest option for the positional
+    access of the models.
+
+    Depth and height are cached too, and kept correct on every insertion and
+    removal: the depth is pushed down the moved subtree, the height is
+    propagated up along the ancestors while it changes.
+
+    The nodes of a tree hold a reference to the tree, set on insertion like the
+    depth, so the tree is notified in O(1) when its nodes are inserted, removed
+    or edited.
+
+    Every node caches its serialized text (see JSONStreamWriter) and the content
+    hash of its subtree until it is edited: a change of the features or of the
+    children drops the cached values of the node and of its ancestors, so an
+    unchanged subtree is written again without being encoded and hashed again
+    without being visited. The feature values must be replaced, not mutated in
+    place, for the caches to notice the change.
+
+    Copies skip the constructor chain. A copy can also share the values list
+    with the original node: both nodes are marked as shared and the first one
+    modified takes its own list (copy-on-write).
+
+    The children of a node can be pending: described by an object that builds
+    them only when they are fetched, for the lazy loading of large trees. Until
+    then the node has no children and its height doesn't count them. Inserting
+    or copying children fetches the pending ones first.
     """
 
+    __slots__ = (
+        'up', 'children', '_layout', '_values', '_shared',
+        '_row', '_stamp', '_shifts', '_replays', '_depth', '_height', '_tree', '_pending', '_fragment', '_hash'
+    )
+
+    SCHEMA = FeatureSchema(['ID'])
+
+    # the shorter logs of shifted rows are never replaced by a renumbering
+    MIN_SHIFTS = 32
+
+    # the size, in bytes, of the content hashes
+    HASH_SIZE = 16
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Registers every node class, so it can be retrieved by name.
+        """
+
+        super().__init_subclass__(**kwargs)
+        NODE_CLASSES[cls.__name__] = cls
+
 # INIT
 
     def __init__(self, *keys, **features):
         """
-        Initializes the class variables and adds all the passed features.
+        Initializes the class variables with the schema defaults and adds all the
+        passed features.
         """
 
-        self.features = []
+        self._layout = self.SCHEMA.layout
+        self._values = self.SCHEMA.newValues()
+        self._shared = False
         self.up = None
         self.children = []
+        self._row = 0
+        self._stamp = 0
+        self._shifts = None
+        self._replays = 0
+        self._depth = 0
+        self._height = 0
+        self._tree = None
+        self._pending = None
+        self._fragment = None
+        self._hash = None
+
+        self.addFeatures(*keys, **features)
+
+    @classmethod
+    def fromFeatures(cls, features):
+        """
+        Builds a detached node from the features of a deserialized object, the
+        bulk construction path of the readers. The constructor chain is skipped:
+        every feature is written once over the schema defaults and no node or
+        tree is notified. The node is the same the constructor builds with the
+        same features, subclasses extend this function to keep it so.
 
-        self.addFeatures('ID', *keys, **features)
+        Args:
+            features (dict[str, PyObject]): the features of the node
+
+        Returns:
+            AbstractNode: the built node
+        """
+
+        layout = cls.SCHEMA.layout
+        values = cls.SCHEMA.newValues()
+        positions = layout.positions
+
+        for key, value in features.items():
+            position = positions.get(key)
+            if position is None:
+                layout = layout.add(key)
+                positions = layout.positions
+                values.append(value)
+            else:
+                values[position] = value
+
+        node = cls.__new__(cls)
+        node._layout = layout
+        node._values = values
+        node._shared = False
+        node.up = None
+        node.children = []
+        node._row = 0
+        node._stamp = 0
+        node._shifts = None
+        node._replays = 0
+        node._depth = 0
+        node._height = 0
+        node._tree = None
+        node._pending = None
+        node._fragment = None
+        node._hash = None
+
+        return node
 
 # INSERTION
 
@@ -33,10 +164,46 @@ class AbstractNode():
             False: position error
         """
 
+        if self._pending is not None: self.fetchChildren()
         if not 0 <= position <= len(self): return False
 
         self.children.insert(position, child)
         child.up = self
+        child._row = position
+        child._stamp = self._shiftRows(position, 1)
+
+        self._childrenInserted((child,))
+        return True
+
+    def insertChildren(self, children, position):
+        """
+        Adds multiple nodes to the children of this node, starting from a specific
+        position. The nodes are spliced in the children list in a single operation
+        and the cached values are updated once for the whole group.
+
+        Args:
+            children (list[AbstractNode]): the nodes to add
+            position (int): the position where to add the first node
+
+        Returns:
+            True: successfully inserted the nodes
+            False: position error
+        """
+
+        if self._pending is not None: self.fetchChildren()
+        if not 0 <= position <= len(self): return False
+
+        children = list(children)
+        if not children: return True
+
+        self.children[position:position] = children
+        stamp = self._shiftRows(position, len(children))
+        for row, child in enumerate(children, position):
+            child.up = self
+            child._row = row
+            child._stamp = stamp
+
+        self._childrenInserted(children)
         return True
 
     def addChild(self, child):
@@ -55,14 +222,17 @@ class AbstractNode():
 
     def addChildren(self, children):
         """
-        Adds multiple nodes to the children of this node.
+        Appends multiple nodes to the children of this node.
 
         Args:
             children (list[AbstractNode]): the list of nodes to add
+
+        Returns:
+            True: successfully added the nodes
+            False: add error
         """
 
-        for child in children:
-            self.addChild(child)
+        return self.insertChildren(children, len(self))
 
 # DELETION
 
@@ -78,21 +248,37 @@ class AbstractNode():
             False: position error
         """
 
-        if child not in self.children: return False
+        if child.up is not self: return False
 
-        self.children.remove(child)
+        self.popChild(child.getIndex())
         return True
 
     def removeChildren(self, children):
         """
-        Removes multiple nodes from the children list if present
+        Removes multiple nodes from the children list if present. The children list
+        is rebuilt once, whatever the number of removed nodes.
 
         Args:
             children (list[AbstractNode]): the nodes to remove
         """
 
-        for child in children:
-            self.removeChild(child)
+        removed = {id(child) for child in children if child.up is self}
+        if not removed: return
+
+        keptChildren = []
+        removedChildren = []
+        for child in self.children:
+            if id(child) in removed:
+                child.up = None
+                removedChildren.append(child)
+            else:
+                keptChildren.append(child)
+
+        self.children[:] = keptChildren
+        self._renumberRows()
+
+        for child in removedChildren:
+            self._childRemoved(child)
 
     def popChild(self, position):
         """
@@ -110,6 +296,9 @@ class AbstractNode():
 
         poppedNode = self.children.pop(position)
         poppedNode.up = None
+        self._shiftRows(position, -1)
+
+        self._childRemoved(poppedNode)
         return poppedNode
 
     def detach(self):
@@ -125,6 +314,81 @@ class AbstractNode():
 
         return self.up.popChild(self.getIndex())
 
+# PENDING CHILDREN
+
+    def setPendingChildren(self, pending):
+        """
+        Sets the pending children of this node, built only when fetched. The
+        pending object has a length, the number of children, and a build()
+        function that returns the children nodes.
+
+        Args:
+            pending (PyObject): the description of the children, None for no pending children
+        """
+
+        self._pending = pending
+        self._invalidate()
+        if self._tree is not None: self._tree._pendingChanged(self)
+
+    def hasPendingChildren(self):
+        """
+        Returns whether this node has children not fetched yet.
+
+        Returns:
+            bool: the node has pending children
+        """
+
+        return self._pending is not None
+
+    def getPendingCount(self):
+        """
+        Returns the number of children not fetched yet.
+
+        Returns:
+            int: the number of pending children
+        """
+
+        return 0 if self._pending is None else len(self._pending)
+
+    def fetchChildren(self):
+        """
+        Builds the pending children of this node and appends them to the children.
+        The built children can have pending children in turn.
+
+        Returns:
+            list[AbstractNode]: the fetched children
+        """
+
+        pending = self._pending
+        if pending is None: return []
+
+        self._pending = None
+        children = pending.build()
+
+        position = len(self.children)
+        self.children.extend(children)
+        stamp = len(self._shifts) if self._shifts else 0
+        for row, child in enumerate(children, position):
+            child.up = self
+            child._row = row
+            child._stamp = stamp
+
+        self._childrenFetched(children)
+        if self._tree is not None: self._tree._pendingChanged(self)
+
+        return children
+
+    def fetchSubtree(self):
+        """
+        Fetches every pending child in the subtree of this node.
+        """
+
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node._pending is not None: node.fetchChildren()
+            stack.extend(node.children)
+
 # TRAVERSAL
 
     def iterAncestors(self):
@@ -143,32 +407,88 @@ class AbstractNode():
 
 # COPY
 
-    def superficialCopy(self):
+    def superficialCopy(self, share = False):
         """
         Returns a copy of this node with only it's features. The parent and children
         are not copied.
 
+        Args:
+            share (bool): whether the copy shares the features until the first modification. Defaults to False.
+
         Returns:
             AbstractNode: a superficial copy of this node
         """
 
-        data = self.items().copy()
-        copiedNode = self.__class__(**data)
-
-        return copiedNode
+        return self._clone(share)
 
-    def deepCopy(self):
+    def deepCopy(self, share = False):
         """
-        Returns a copy of this node with descendants.
+        Returns a copy of this node with descendants. The structure is copied as is,
+        so the cached values of the copied nodes are copied instead of recalculated.
+
+        Args:
+            share (bool): whether the copies share the features until the first modification. Defaults to False.
 
         Returns:
             AbstractNode: the copied node
         """
 
-        copiedNode = self.superficialCopy()
+        # the heights of the copies are valid only with every child fetched
+        if self._tree is None: self.fetchSubtree()
+        else: self._tree.fetchAll()
 
-        for child in self.children:
-            copiedNode.addChild(child.deepCopy())
+        depth = self._depth
+        copiedRoot = self._clone(share)
+        copiedRoot._copyCache(self, depth)
+
+        stack = [(self, copiedRoot)]
+        while stack:
+            node, copiedNode = stack.pop()
+            copiedChildren = copiedNode.children
+
+            for row, child in enumerate(node.children):
+                copiedChild = child._clone(share)
+                copiedChild.up = copiedNode
+                copiedChild._row = row
+                copiedChild._copyCache(child, depth)
+                copiedChildren.append(copiedChild)
+                stack.append((child, copiedChild))
+
+        return copiedRoot
+
+    def _clone(self, share):
+        """
+        Private function.
+        Creates a detached copy of this node without calling the constructor.
+        Subclasses with more slots extend this function.
+
+        Args:
+            share (bool): whether the copy shares the values list with this node
+
+        Returns:
+            AbstractNode: the copied node
+        """
+
+        copiedNode = self.__class__.__new__(self.__class__)
+        copiedNode._layout = self._layout
+        if share:
+            copiedNode._values = self._values
+            copiedNode._shared = self._shared = True
+        else:
+            copiedNode._values = self._values.copy()
+            copiedNode._shared = False
+        copiedNode.up = None
+        copiedNode.children = []
+        copiedNode._row = 0
+        copiedNode._stamp = 0
+        copiedNode._shifts = None
+        copiedNode._replays = 0
+        copiedNode._depth = 0
+        copiedNode._height = 0
+        copiedNode._tree = None
+        copiedNode._pending = None
+        copiedNode._fragment = None
+        copiedNode._hash = None
 
         return copiedNode
 
@@ -183,9 +503,20 @@ class AbstractNode():
             value (PyObject): the value of the feature to store
         """
 
-        setattr(self, key, value)
-        if not key in self.features:
-            self.features.append(key)
+        position = self._layout.positions.get(key)
+        if self._shared: self._unshare()
+
+        if position is None:
+            oldValue = None
+            self._layout = self._layout.add(key)
+            self._values.append(value)
+        else:
+            oldValue = self._values[position]
+            self._values[position] = value
+
+        self._invalidate()
+        if self._tree is not None:
+            self._tree._featureChanged(self, key, oldValue, value)
 
     def addFeatures(self, *keys, **features):
         """
@@ -207,9 +538,17 @@ class AbstractNode():
             key (str): the feature to delete
         """
 
-        delattr(self, key)
-        if key in self.features:
-            self.features.remove(key)
+        position = self._layout.positions.get(key)
+        if position is None: return
+        if self._shared: self._unshare()
+
+        oldValue = self._values[position]
+        self._layout = self._layout.remove(key)
+        del self._values[position]
+
+        self._invalidate()
+        if self._tree is not None:
+            self._tree._featureChanged(self, key, oldValue, None)
 
     def delFeatures(self, *keys):
         """
@@ -222,6 +561,7 @@ class AbstractNode():
     def getFeature(self, key):
         """
         Returns the value of the feature in this node, specified by the passed key.
+        If the key is not a feature, the node attribute with the same name is returned.
         None is returned if the key doesn't exist.
 
         Args:
@@ -232,6 +572,9 @@ class AbstractNode():
             None: key doesn't exist
         """
 
+        position = self._layout.positions.get(key)
+        if position is not None: return self._values[position]
+
         return getattr(self, key, None)
 
     def getFeatures(self, *keys):
@@ -242,11 +585,8 @@ class AbstractNode():
             dict[str, PyObject]: the dictionary with the passed feature keys and values
         """
 
-        data = {}
-        for key in keys:
-            data[key] = self.getFeature(key)
-
-        return data
+        getFeature = self.getFeature
+        return {key: getFeature(key) for key in keys}
 
     def keys(self):
         """
@@ -256,7 +596,7 @@ class AbstractNode():
             list[str]: the list of features keys of this node
         """
 
-        return self.features
+        return list(self._layout.keys)
 
     def values(self):
         """
@@ -266,13 +606,7 @@ class AbstractNode():
             list[PyObject]: the list of features values of this node
         """
 
-        values = []
-        for key in self.features:
-            value = self.getFeature(key)
-            if value:
-                values.append(value)
-
-        return values
+        return [value for value in self._values if value]
 
     def items(self):
         """
@@ -282,7 +616,7 @@ class AbstractNode():
             dict[str, PyObject]: the dictionary of this node's features
         """
 
-        return self.getFeatures(*self.features)
+        return dict(zip(self._layout.keys, self._values))
 
 # GETTERS
 
@@ -296,6 +630,17 @@ class AbstractNode():
 
         return self.up
 
+    def getTree(self):
+        """
+        Returns the tree this node belongs to.
+
+        Returns:
+            AbstractTree: the tree of this node
+            None: the node doesn't belong to a tree
+        """
+
+        return self._tree
+
     def getChildren(self):
         """
         Returns the children list of this node.
@@ -330,12 +675,34 @@ class AbstractNode():
             int: the index of this node
         """
 
-        if not self.up: return 0
-        return self.up.children.index(self)
+        parent = self.up
+        if not parent: return 0
+
+        row = self._row
+        shifts = parent._shifts
+        children = parent.children
+        if shifts and self._stamp < len(shifts):
+            parent._replays += len(shifts) - self._stamp
+            if parent._replays > len(children):
+                parent._renumberRows()
+                row = self._row
+            else:
+                for position, delta in shifts[self._stamp:]:
+                    if row > position or row == position and delta > 0: row += delta
+                self._row = row
+                self._stamp = len(shifts)
+
+        if row < len(children) and children[row] is self: return row
+
+        parent._renumberRows()
+        if self._row >= len(children) or children[self._row] is not self:
+            raise ValueError('the node is not a child of this node')
+
+        return self._row
 
     def getHeight(self):
         """
-        Returns this node's heigth.
+        Returns this node's heigth. The value is cached.
 
         - if the node is a leaf, heigth = 0;
         - else heigth = 1 + max(node's children heigths);
@@ -344,17 +711,11 @@ class AbstractNode():
             int: the heigth ot this node
         """
 
-        if len(self) == 0: return 0
-
-        heights = []
-        for child in self.getChildren():
-            heights.append((child.getHeight()))
-
-        return max(heights) + 1
+        return self._height
 
     def getDepth(self):
         """
-        Returns this node's depth.
+        Returns this node's depth. The value is cached.
 
         - if the node is the root, depth = 0;
         - else depth = 1 + node's parent depth;
@@ -363,9 +724,359 @@ class AbstractNode():
             int: this node's depth
         """
 
-        if not self.up: return 0
+        return self._depth
+
+# CACHE
+
+    def _shiftRows(self, position, delta):
+        """
+        Private function.
+        Logs the shift of the children from a position on, after an insertion
+        (positive delta) or a removal (negative delta). The log is replaced by
+        a renumbering of every child once it's longer than the square root of
+        the number of children.
+
+        Args:
+            position (int): the position of the first inserted or removed child
+            delta (int): the number of inserted children, -1 for a removal
+
+        Returns:
+            int: the stamp of the children inserted at the position
+        """
+
+        children = self.children
+        shifts = self._shifts
+
+        # appending or removing the last child doesn't move any other child
+        if position >= len(children) - max(delta, 0):
+            return len(shifts) if shifts else 0
+
+        if shifts is None: shifts = self._shifts = []
+        if len(shifts) >= self.MIN_SHIFTS and len(shifts) * len(shifts) >= len(children):
+            self._renumberRows()
+            return 0
+
+        shifts.append((position, delta))
+        return len(shifts)
+
+    def _renumberRows(self):
+        """
+        Private function.
+        Updates the cached position of every child and clears the log of
+        shifted rows and the count of replayed shifts.
+        """
+
+        for row, child in enumerate(self.children):
+            child._row = row
+            child._stamp = 0
+        self._shifts = None
+        self._replays = 0
+
+    def _copyCache(self, node, depth):
+        """
+        Private function.
+        Copies the cached values of the passed node into this copy of the node.
+        Subclasses with more cached values extend this function.
+
+        Args:
+            node (AbstractNode): the copied node
+            depth (int): the depth of the root of the copied subtree
+        """
+
+        self._depth = node._depth - depth
+        self._height = node._height
+        self._fragment = node._fragment
+        self._hash = node._hash
+
+    def _unshare(self):
+        """
+        Private function.
+        Gives this node its own copy of the values list before a modification.
+        """
+
+        self._values = self._values.copy()
+        self._shared = False
+
+    def _childrenInserted(self, children, fetched = False):
+        """
+        Private function.
+        Updates the cached values after one or more children are added to this node.
+        The height is propagated once for the whole group.
+
+        Args:
+            children (list[AbstractNode]): the inserted children
+            fetched (bool): whether the children were pending. Defaults to False.
+        """
+
+        self._invalidate()
+
+        tree = self._tree
+        depth = self._depth + 1
+        height = 0
+
+        for child in children:
+            childTree = child._tree if child._isTreeRoot() else tree
+            child._setPlace(depth, childTree)
+            if child._height >= height: height = child._height + 1
+
+        node = self
+        while node and node._height < height:
+            node._height = height
+            node = node.up
+            height += 1
+
+        if tree is None: return
+
+        for child in children:
+            if child._tree is tree: tree._nodesAdded(child, fetched)
+
+    def _childrenFetched(self, children):
+        """
+        Private function.
+        Updates the cached values after the pending children of this node are
+        fetched. Subclasses that already counted the pending children in their
+        cached values extend this function.
+
+        Args:
+            children (list[AbstractNode]): the fetched children
+        """
+
+        self._childrenInserted(children, True)
+
+    def _childRemoved(self, child):
+        """
+        Private function.
+        Updates the cached values after a child is removed from this node.
+
+        Args:
+            child (AbstractNode): the removed child
+        """
+
+        self._invalidate()
+
+        tree = self._tree
+        keptTree = child._tree if child._isTreeRoot() else None
+        child._setPlace(0, keptTree)
+
+        if child._height + 1 == self._height:
+            self._refreshHeight()
+
+        if tree is not None and tree is not keptTree:
+            tree._nodesRemoved(child, self)
+
+    def _isTreeRoot(self):
+        """
+        Private function.
+        Returns whether this node is the root of its tree.
+
+        Returns:
+            bool: this node is the root of a tree
+        """
+
+        return self._tree is not None and self._tree.root is self
+
+    def _setPlace(self, depth, tree):
+        """
+        Private function.
+        Sets the depth and the tree of this node and updates the descendants.
+
+        Args:
+            depth (int): the new depth of this node
+            tree (AbstractTree): the new tree of this node
+        """
 
-        return self.up.getDepth() + 1
+        if self._depth == depth and self._tree is tree: return
+
+        self._depth = depth
+        self._tree = tree
+        stack = list(self.children)
+        while stack:
+            node = stack.pop()
+            node._depth = node.up._depth + 1
+            node._tree = tree
+            stack.extend(node.children)
+
+    def _refreshHeight(self):
+        """
+        Private function.
+        Recalculates the height of this node from the children heights and
+        propagates the change to the ancestors.
+        """
+
+        node = self
+        while node:
+            children = node.children
+            target = node._height - 1
+
+            # the height can't grow here, it stays the same if any child still reaches it
+            if children and any(child._height == target for child in children): return
+
+            height = max(child._height for child in children) + 1 if children else 0
+            if height == node._height: return
+
+            node._height = height
+            node = node.up
+
+    def _invalidate(self):
+        """
+        Private function.
+        Drops the serialized text and the hash of this node and of its ancestors.
+        The walk stops at the first node without both: the ancestors of a node
+        without a cached value never have one.
+        """
+
+        node = self
+        while node is not None and (node._fragment is not None or node._hash is not None):
+            node._fragment = None
+            node._hash = None
+            node = node.up
+
+# SERIALIZATION CACHE
+
+    def getFragment(self):
+        """
+        Returns the serialized text of this node and its descendants, cached by
+        the last writer that encoded it.
+
+        Returns:
+            PyObject: the cached fragment, in the format of the writer
+            None: the node changed since the fragment was cached
+        """
+
+        return self._fragment
+
+    def setFragment(self, fragment):
+        """
+        Caches the serialized text of this node and its descendants, until the
+        next change of the subtree.
+
+        Args:
+            fragment (PyObject): the fragment to cache, None to drop it
+        """
+
+        self._fragment = fragment
+
+    def isDirty(self):
+        """
+        Returns whether this node has no cached serialized text: it changed since
+        it was last written, or it was never written.
+
+        Returns:
+            bool: the node must be encoded again
+        """
+
+        return self._fragment is None
+
+# CONTENT HASH
+
+    def getHash(self):
+        """
+        Returns the content hash of the subtree of this node: a Merkle digest of
+        the class and the features of the node and of the digests of its children,
+        in order. The digest is cached in every node, so after an edit only the
+        edited node and its ancestors are hashed again. The pending children are
+        fetched.
+
+        The features are hashed with the type of every value, so values that
+        compare equal, like 1, 1.0 and True, have different digests, and the
+        digest is stable between runs for the values with a stable repr().
+
+        Returns:
+            bytes: the digest of the subtree
+        """
+
+        if self._hash is not None: return self._hash
+
+        if self._tree is None: self.fetchSubtree()
+        else: self._tree.fetchAll()
+
+        # postorder on the nodes without a cached hash only
+        stack = [(self, False)]
+        while stack:
+            node, visited = stack.pop()
+            children = node.children
+
+            if visited:
+                features = node._featuresText()
+                parts = [len(features).to_bytes(8, 'little'), features]
+                parts.extend(child._hash for child in children)
+                node._hash = hashlib.blake2b(b''.join(parts), digest_size = self.HASH_SIZE).digest()
+                continue
+
+            stack.append((node, True))
+            stack.extend((child, False) for child in children if child._hash is None)
+
+        return self._hash
+
+    def sameContent(self, other):
+        """
+        Returns whether the subtree of this node has the same classes, features and
+        structure of the subtree of another node, comparing their hashes.
+
+        Args:
+            other (AbstractNode): the node to compare
+
+        Returns:
+            bool: the subtrees are equal
+        """
+
+        return self.getHash() == other.getHash()
+
+    def sameFeatures(self, other):
+        """
+        Returns whether this node has the same class and the same features, in
+        any order, of another node. The values are compared like the content
+        hash does, by type and value (see sameValue()).
+
+        Args:
+            other (AbstractNode): the node to compare
+
+        Returns:
+            bool: the nodes have the same features
+        """
+
+        if self.__class__ is not other.__class__: return False
+
+        features = other.items()
+        if len(features) != len(self._values): return False
+
+        for key, value in zip(self._layout.keys, self._values):
+            if key not in features or not self.sameValue(value, features[key]): return False
+
+        return True
+
+    @staticmethod
+    def sameValue(value, other):
+        """
+        Returns whether two feature values are the same for the content hash:
+        equal and of the same type, so 1, 1.0 and True are different values.
+        The items of lists and dictionaries are compared by type too.
+
+        Args:
+            value (PyObject): the first value
+            other (PyObject): the second value
+
+        Returns:
+            bool: the values are the same
+        """
+
+        if value is other: return True
+        if value.__class__ is not other.__class__ or value != other: return False
+        if value.__class__ in (str, int, bool): return True
+
+        return repr(value) == repr(other)
+
+    def _featuresText(self):
+        """
+        Private function.
+        Returns the class and the features of this node, in order, as encoded
+        text. The repr() of the values keeps their type: strings are quoted,
+        floats have a decimal point, and lists and dictionaries are written
+        with the repr() of their items.
+        """
+
+        text = repr((self.__class__.__name__, self._layout.keys, self._values))
+        return text.encode('utf-8', 'backslashreplace')
 
 # REPRESENTATION
 
@@ -378,13 +1089,22 @@ class AbstractNode():
         """
 
         string = ''
-        for key in self.features:
-            value = self.getFeature(key)
+        for key, value in zip(self._layout.keys, self._values):
             string += f'{key}: {value},\n'
         return string
 
 # DUNDERS
 
+    def __getattr__(self, key):
+        # called only when the normal attribute lookup fails, exposes the features
+        # as read only attributes (node.name, node.level, ...)
+        if key.startswith('_'): raise AttributeError(key)
+
+        position = self._layout.positions.get(key)
+        if position is None: raise AttributeError(key)
+
+        return self._values[position]
+
     def __len__(self):
         return len(self.children)
 
@@ -398,4 +1118,6 @@ class AbstractNode():
         return True
 
     def __eq__(self, other):
-        return self.getFeature('ID') == other.getFeature('ID')
\ No newline at end of file
+        return self.getFeature('ID') == other.getFeature('ID')
+
+NODE_CLASSES[AbstractNode.__name__] = AbstractNode
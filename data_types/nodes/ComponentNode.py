@@ -1,37 +1,149 @@
-from .NODESutil import unpackID, toBase10
+from .NODESutil import parseID
 from .AbstractNode import AbstractNode
+from .FeatureSchema import FeatureSchema
+from .NodeTotals import NodeTotals, toNumber
 
 class ComponentNode(AbstractNode):
     """
     Class that describes the behaviour of a component node.
     Extends the AbstractNode class, provides getters and editable boolean.
+
+    The properties shared by every node of a type (editable boolean, color, icon
+    and the fixed features) are class constants, subclasses override them.
+
+    The nodes with children keep the totals of their subtree (price and node
+    counts, multiplied by the quantities). Every insertion, removal or edit of
+    the price, quantity or type updates the totals of the ancestors only, in
+    O(depth). The totals of a leaf are calculated from its own features.
     """
 
-    HEADERS = [
-        'ID',
-        'name',
-        'description',
-        'comment',
-        'packageQuantity',
-        'quantity',
-        'price',
-        'type',
-        'manufacture',
-        'status',
-        'seller',
-        'link'
-    ]
+    __slots__ = ('_id', '_totals')
+
+    # features that change the totals of the ancestors
+    TOTALS_KEYS = frozenset(('price', 'quantity', 'type'))
+
+    editable = True
+    color = None
+    icon = None
+
+    # features that always have the same value for every node of the class
+    FIXED = {}
+
+    SCHEMA = FeatureSchema(
+        keys = [
+            'ID',
+            'name',
+            'description',
+            'comment',
+            'packageQuantity',
+            'quantity',
+            'price',
+            'type',
+            'manufacture',
+            'status',
+            'seller',
+            'link'
+        ],
+        columns = [
+            'ID',
+            'name',
+            'description',
+            'type',
+            'manufacture',
+            'status',
+            'comment',
+            'price',
+            'quantity',
+            'packageQuantity',
+            'seller',
+            'link'
+        ]
+    )
+
+    HEADERS = SCHEMA.keys
 
     def __init__(self, *keys, **features):
         """
-        Initializes some defalut features to None, adds the passed features
-        and sets the editable parameter to True.
+        Initializes the schema features to their defaults and adds the passed
+        features. The fixed features of the class can't be overridden.
+        """
+
+        self._totals = None
+
+        if keys or features: features.update(self.FIXED)
+        super().__init__(*keys, **features)
+
+        self._id = None
+
+    @classmethod
+    def fromFeatures(cls, features):
+        """
+        Extends AbstractNode.fromFeatures() applying the fixed features of the
+        class, like the constructor does.
+        """
+
+        if features and cls.FIXED: features = {**features, **cls.FIXED}
+
+        node = super().fromFeatures(features)
+        node._totals = None
+        node._id = None
+
+        return node
+
+# COPY
+
+    def _clone(self, share):
+        """
+        Private function.
+        Extends AbstractNode._clone() copying the component properties.
+        """
+
+        copiedNode = super()._clone(share)
+        copiedNode._id = self._id
+        copiedNode._totals = None
+
+        return copiedNode
+
+    def _copyCache(self, node, depth):
+        """
+        Private function.
+        Extends AbstractNode._copyCache() copying the subtree totals.
         """
 
-        self.HEADERS.extend(keys)
-        super().__init__(*self.HEADERS, **features)
+        super()._copyCache(node, depth)
+        if node._totals is not None: self._totals = node._totals.copy()
 
-        self.editable = True
+# FEATURES
+
+    def addFeature(self, key, value):
+        """
+        Extends AbstractNode.addFeature(). Updates the totals of the ancestors
+        when the price, the quantity or the type change.
+        """
+
+        if key not in self.TOTALS_KEYS or (self.up is None and self._totals is None):
+            super().addFeature(key, value)
+            return
+
+        ownTotals = NodeTotals.ofNode(self)
+        quantity = self.getQuantity()
+        super().addFeature(key, value)
+        self._ownTotalsChanged(ownTotals, quantity)
+
+    def delFeature(self, key):
+        """
+        Extends AbstractNode.delFeature(). Updates the totals of the ancestors
+        when the price, the quantity or the type are deleted.
+        """
+
+        if key not in self.TOTALS_KEYS or (self.up is None and self._totals is None):
+            super().delFeature(key)
+            return
+
+        ownTotals = NodeTotals.ofNode(self)
+        quantity = self.getQuantity()
+        super().delFeature(key)
+        self._ownTotalsChanged(ownTotals, quantity)
 
 # GETTERS
 
@@ -45,6 +157,23 @@ class ComponentNode(AbstractNode):
 
         return self.getDepth()
 
+    def getID(self):
+        """
+        Returns the parsed ID of this node. The parsed ID is cached and parsed again
+        only when the ID feature changes.
+
+        Returns:
+            NodeID: the parsed ID
+        """
+
+        ID = self.getFeature('ID')
+        parsedID = self._id
+
+        if parsedID is None or parsedID.string != ID:
+            parsedID = self._id = parseID(ID)
+
+        return parsedID
+
     def getSize(self):
         """
         Returns the ID of this node in decimal base.
@@ -53,11 +182,7 @@ class ComponentNode(AbstractNode):
             int: the converted ID
         """
 
-        ID = self.getFeature('ID')
-        if not ID: return 0
-
-        ID = unpackID(ID)
-        return toBase10(ID)
+        return self.getID().key
 
     def getPrefix(self):
         """
@@ -67,23 +192,33 @@ class ComponentNode(AbstractNode):
             str: the first 3 digits of the ID
         """
 
-        ID = self.getFeature('ID')
-        if not ID: return
+        return self.getID().prefix
 
-        ID = unpackID(ID)
-        return ID[:3]
+    def getQuantity(self):
+        """
+        Returns the quantity of this node as a number. Nodes without a valid
+        quantity count as one.
 
-# BOOLEANS
+        Returns:
+            float: the quantity of this node
+        """
+
+        return toNumber(self.getFeature('quantity'), 1)
 
-    def setEditable(self, boolean):
+    def getTotals(self):
         """
-        Changes the editable property of this node.
+        Returns the totals of the subtree of this node, for one unit of this node.
+        The returned totals of a node with children are the cached ones and must
+        not be modified.
 
-        Args:
-            boolean (bool): if this node is editable or not
+        Returns:
+            NodeTotals: the totals of the subtree
         """
 
-        self.editable = boolean
+        if self._totals is None: return NodeTotals.ofNode(self)
+        return self._totals
+
+# BOOLEANS
 
     def isEditable(self):
         """
@@ -94,4 +229,124 @@ class ComponentNode(AbstractNode):
             False: not editable node
         """
 
-        return self.editable
\ No newline at end of file
+        return self.editable
+
+# PENDING CHILDREN
+
+    def setPendingChildren(self, pending, totals = None):
+        """
+        Extends AbstractNode.setPendingChildren(). The totals of the pending
+        subtree can be passed, so that the node and its ancestors count the
+        pending children before they are fetched.
+
+        Args:
+            pending (PyObject): the description of the children, None for no pending children
+            totals (NodeTotals): the totals of the subtree of this node, pending children included. Defaults to None.
+        """
+
+        super().setPendingChildren(pending)
+        if totals is None or self.children: return
+
+        delta = totals.copy()
+        delta.add(self.getTotals(), -1, -1)
+        self._totals = totals
+        if self.up is not None: self.up._propagateTotals(delta, self.getQuantity())
+
+    def _childrenFetched(self, children):
+        """
+        Private function.
+        Extends AbstractNode._childrenFetched(). The fetched children are already
+        counted in the totals, only the other cached values are updated.
+        """
+
+        if self._totals is None:
+            super()._childrenFetched(children)
+            return
+
+        AbstractNode._childrenInserted(self, children, True)
+
+# TOTALS
+
+    def _childrenInserted(self, children, fetched = False):
+        """
+        Private function.
+        Extends AbstractNode._childrenInserted() adding the children totals to
+        this node and its ancestors, with a single walk for the whole group.
+        """
+
+        super()._childrenInserted(children, fetched)
+
+        if self._totals is None: self._totals = NodeTotals.ofNode(self)
+
+        if len(children) == 1:
+            child = children[0]
+            self._propagateTotals(child.getTotals(), child.getQuantity())
+            return
+
+        delta = NodeTotals()
+        for child in children:
+            delta.add(child.getTotals(), child.getQuantity())
+        self._propagateTotals(delta)
+
+    def _childRemoved(self, child):
+        """
+        Private function.
+        Extends AbstractNode._childRemoved() subtracting the child totals from
+        this node and its ancestors.
+        """
+
+        super()._childRemoved(child)
+
+        # already back to a leaf, after the removal of multiple children
+        if self._totals is None: return
+
+        if self.children:
+            self._propagateTotals(child.getTotals(), -child.getQuantity(), -1)
+            return
+
+        # the totals of a leaf are its own, the difference goes to the ancestors
+        oldTotals = self._totals
+        self._totals = None
+        if self.up is None: return
+
+        quantity = self.getQuantity()
+        self.up._propagateTotals(self.getTotals(), quantity)
+        self.up._propagateTotals(oldTotals, -quantity, -1)
+
+    def _ownTotalsChanged(self, ownTotals, quantity):
+        """
+        Private function.
+        Updates the totals after an edit of this node features.
+
+        Args:
+            ownTotals (NodeTotals): the totals of this node alone before the edit
+            quantity (float): the quantity of this node before the edit
+        """
+
+        ownDelta = NodeTotals.ofNode(self)
+        ownDelta.add(ownTotals, -1, -1)
+        if self._totals is not None: self._totals.add(ownDelta)
+
+        if self.up is None: return
+
+        # new quantity * new totals - old quantity * (new totals - own change)
+        self.up._propagateTotals(self.getTotals(), self.getQuantity() - quantity, 0)
+        self.up._propagateTotals(ownDelta, quantity)
+
+    def _propagateTotals(self, totals, factor = 1, uniqueFactor = 1):
+        """
+        Private function.
+        Adds the passed totals to this node and to its ancestors. The factor is
+        multiplied by the quantity of every node the totals pass through.
+
+        Args:
+            totals (NodeTotals): the totals to add
+            factor (float): the multiplier of the price and weighted counts. Defaults to 1.
+            uniqueFactor (int): the multiplier of the unique counts. Defaults to 1.
+        """
+
+        node = self
+        while node is not None and node._totals is not None:
+            node._totals.add(totals, factor, uniqueFactor)
+            factor *= node.getQuantity()
+            node = node.up
@@ -3,20 +3,21 @@ from .ComponentNode import ComponentNode
 # --- ASSEMBLY NODES ---
 
 class ProjectNode(ComponentNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.setEditable(False)
-        self.color = (255, 121, 65)
-        self.icon = "project.png"
+    editable = False
+    color = (255, 121, 65)
+    icon = "project.png"
 
-        self.addFeatures(
-            ID = '#000-000',
-            type = 'Project',
-            manufacture = 'Assembled',
-        )
+    FIXED = {
+        'ID': '#000-000',
+        'type': 'Project',
+        'manufacture': 'Assembled'
+    }
+    SCHEMA = ComponentNode.SCHEMA.derive(**FIXED)
 
 class AssemblyNode(ComponentNode):
+    __slots__ = ()
 
     colors = [
         (255, 159, 81),
@@ -24,120 +25,137 @@ class AssemblyNode(ComponentNode):
         (255, 225, 93)
     ]
 
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    editable = False
+    icon = "assembly.png"
 
-        self.setEditable(False)
-        self.icon = "assembly.png"
+    FIXED = {
+        'type': 'Assembly',
+        'manufacture': 'Assembled'
+    }
+    SCHEMA = ComponentNode.SCHEMA.derive(**FIXED)
 
-        self.addFeatures(
-            type = 'Assembly',
-            manufacture = 'Assembled'
-        )
+    @property
+    def color(self):
+        """
+        Returns the color tuple of the assembly, which depends on the level.
+
+        Returns:
+            tuple[int]: the color of this assembly node
+            None: the level is not valid
+        """
 
         level = self.getFeature('level')
-        if level:
-            self.setLevel(level)
+        if level and 2 <= level <= 4:
+            return self.colors[level - 2]
+
+    @classmethod
+    def fromFeatures(cls, features):
+        """
+        Extends ComponentNode.fromFeatures(). The color is not stored as a feature.
+        """
+
+        if 'color' in features:
+            features = dict(features)
+            del features['color']
+
+        return super().fromFeatures(features)
+
+    def addFeature(self, key, value):
+        """
+        Extends ComponentNode.addFeature(). The color is not stored as a feature,
+        it depends on the level of the node.
+        """
+
+        if key == 'color': return
+
+        super().addFeature(key, value)
 
     def setLevel(self, level):
         """
-        Sets the level of the assembly node and it's color tuple.
+        Sets the level of the assembly node and with it it's color tuple.
 
         Args:
             level (int): the level of this assembly node
         """
 
-        self.addFeatures(
-            level = level,
-            color = self.colors[level - 2]
-        )
+        self.addFeature('level', level)
 
 class LeafNode(ComponentNode):
-    def __init__(self, *keys, **features):
-
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.setEditable(True)
-        self.color = (179, 179, 179)
-        self.icon = "part.png"
+    editable = True
+    color = (179, 179, 179)
+    icon = "part.png"
 
-        self.addFeatures(type = 'Part')
+    FIXED = {'type': 'Part'}
+    SCHEMA = ComponentNode.SCHEMA.derive(**FIXED)
 
 # --- HARDWARE NODES ---
 
 class HardwareNode(ComponentNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.setEditable(False)
-        self.color = (246, 246, 246)
+    editable = False
+    color = (246, 246, 246)
 
-        self.addFeatures(
-            type = 'Hardware',
-            manufacture = 'Off the Shelf'
-        )
+    FIXED = {
+        'type': 'Hardware',
+        'manufacture': 'Off the Shelf'
+    }
+    SCHEMA = ComponentNode.SCHEMA.derive(**FIXED)
 
 class MechanicalNode(HardwareNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.icon = "hardware.png"
+    icon = "hardware.png"
 
 class ElectricalNode(HardwareNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.icon = "electronic.png"
+    icon = "electronic.png"
 
 class ElectromechanicalNode(HardwareNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.icon = "electromechanical.png"
+    icon = "electromechanical.png"
 
 class MeasuredNode(HardwareNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.icon = "measured.png"
+    icon = "measured.png"
 
-        self.addFeatures(
-            type = 'Hardware',
-            manufacture = 'Cut to Length'
-        )
+    FIXED = dict(HardwareNode.FIXED, manufacture = 'Cut to Length')
+    SCHEMA = HardwareNode.SCHEMA.derive(**FIXED)
 
 class ProductNode(HardwareNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.icon = "consumable.png"
+    icon = "consumable.png"
 
-        self.addFeatures(
-            type = 'Consumable',
-            manufacture = 'Product'
-        )
+    FIXED = {
+        'type': 'Consumable',
+        'manufacture': 'Product'
+    }
+    SCHEMA = HardwareNode.SCHEMA.derive(**FIXED)
 
 # --- MISC NODES ---
 
 class JigNode(ComponentNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.setEditable(True)
-        self.color = (108, 201, 255)
-        self.icon = "jig.png"
+    editable = True
+    color = (108, 201, 255)
+    icon = "jig.png"
 
-        self.addFeatures(type = 'Jig')
+    FIXED = {'type': 'Jig'}
+    SCHEMA = ComponentNode.SCHEMA.derive(**FIXED)
 
 class PlaceholderNode(ComponentNode):
-    def __init__(self, *keys, **features):
-        super().__init__(*keys, **features)
+    __slots__ = ()
 
-        self.setEditable(True)
-        self.color = (148, 223, 255)
-        self.icon = "placeholder.png"
+    editable = True
+    color = (148, 223, 255)
+    icon = "placeholder.png"
 
-        self.addFeatures(
-            type = 'Placeholder',
-            status = 'Not Designed'
-        )
+    FIXED = {'type': 'Placeholder'}
+    SCHEMA = ComponentNode.SCHEMA.derive(status = 'Not Designed', **FIXED)
@@ -0,0 +1,71 @@
+class FeatureLayout():
+    """
+    Class that describes the position of every feature key inside the values
+    list of a node. Layouts are immutable and shared between all the nodes
+    with the same sequence of keys: adding or removing a key moves the node to
+    another layout, which is created once and then cached as a transition.
+    """
+
+    __slots__ = ('keys', 'positions', '_additions', '_removals')
+
+# INIT
+
+    def __init__(self, keys = ()):
+        """
+        Initializes the keys tuple and the key to position map.
+
+        Args:
+            keys (tuple[str]): the ordered feature keys. Defaults to an empty tuple.
+        """
+
+        self.keys = tuple(keys)
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+        self._additions = {}
+        self._removals = {}
+
+# TRANSITIONS
+
+    def add(self, key):
+        """
+        Returns the layout with the passed key appended to the keys of this layout.
+
+        Args:
+            key (str): the key to append
+
+        Returns:
+            FeatureLayout: the layout with the new key
+        """
+
+        layout = self._additions.get(key)
+        if layout is None:
+            layout = self._additions[key] = FeatureLayout(self.keys + (key,))
+
+        return layout
+
+    def remove(self, key):
+        """
+        Returns the layout without the passed key.
+
+        Args:
+            key (str): the key to remove
+
+        Returns:
+            FeatureLayout: the layout without the key
+        """
+
+        layout = self._removals.get(key)
+        if layout is None:
+            keys = tuple(k for k in self.keys if k != key)
+            layout = self._removals[key] = FeatureLayout(keys)
+
+        return layout
+
+# DUNDERS
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __repr__(self):
+        return f'FeatureLayout{self.keys}'
+
+EMPTY_LAYOUT = FeatureLayout()
@@ -0,0 +1,97 @@
+import sys
+
+from .FeatureLayout import FeatureLayout
+
+class FeatureSchema():
+    """
+    Class that describes the features shared by every node of a class: the
+    interned feature keys, their default values and the order of the columns
+    when the features are displayed. A schema is built once per class and is
+    never modified afterwards.
+    """
+
+    __slots__ = ('keys', 'defaults', 'columns', 'layout', '_values')
+
+# INIT
+
+    def __init__(self, keys, defaults = None, columns = None):
+        """
+        Initializes the schema. The keys are interned and the starting layout of
+        the nodes is created.
+
+        Args:
+            keys (list[str]): the feature keys, in storage order
+            defaults (dict[str, PyObject]): the default value of the keys. Missing keys default to None.
+            columns (list[str]): the keys in display order. Defaults to the storage order.
+        """
+
+        self.keys = tuple(sys.intern(key) for key in keys)
+        self.defaults = dict.fromkeys(self.keys)
+        self.defaults.update(defaults or {})
+        self.columns = tuple(self.intern(key) for key in columns or self.keys)
+        self.layout = FeatureLayout(self.keys)
+        self._values = tuple(self.defaults[key] for key in self.keys)
+
+# GETTERS
+
+    def newValues(self):
+        """
+        Returns a new list of values, filled with the defaults and ordered as the
+        keys of the schema.
+
+        Returns:
+            list[PyObject]: the list of the default values
+        """
+
+        return list(self._values)
+
+    def intern(self, key):
+        """
+        Returns the shared instance of a feature key.
+
+        Args:
+            key (str): the feature key
+
+        Returns:
+            str: the interned key
+        """
+
+        return sys.intern(key)
+
+    def column(self, section):
+        """
+        Returns the feature key displayed in the passed column.
+
+        Args:
+            section (int): the column number
+
+        Returns:
+            str: the feature key of the column
+        """
+
+        return self.columns[section]
+
+    def derive(self, **defaults):
+        """
+        Returns a new schema with the same keys and columns of this schema and
+        the passed default values updated.
+
+        Returns:
+            FeatureSchema: the derived schema
+        """
+
+        newDefaults = self.defaults.copy()
+        newDefaults.update(defaults)
+
+        return FeatureSchema(self.keys, newDefaults, self.columns)
+
+# DUNDERS
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.layout.positions
+
+    def __iter__(self):
+        return iter(self.keys)
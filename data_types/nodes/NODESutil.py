@@ -1,4 +1,5 @@
 import re
+from functools import lru_cache
 
 SPECIAL_PREFIXES = [
     'PRO',
@@ -104,6 +105,8 @@ def packID(prefix, suffix):
 
     return f'#{prefix}-{suffix}'
 
+NON_ALPHANUMERIC = re.compile(r'[\W_]+')
+
 def unpackID(numberID):
     """
     Removes the non alphanumerical characters from the string and returns the cleaned string.
@@ -117,13 +120,79 @@ def unpackID(numberID):
 
     if numberID:
         numberID = numberID.upper()
-        numberID = re.sub(r'[\W_]+', '', numberID)
-        return numberID
+
+        # fast path for the standard #XXX-XXX format
+        if len(numberID) == 8 and numberID[0] == '#' and numberID[4] == '-':
+            unpacked = numberID[1:4] + numberID[5:]
+            if unpacked.isalnum() and unpacked.isascii(): return unpacked
+
+        return NON_ALPHANUMERIC.sub('', numberID)
+
+@lru_cache(maxsize = 1 << 16)
+def parseID(numberID):
+    """
+    Returns the parsed version of a number. The parsed numbers are cached, so
+    every number is parsed only once.
+
+    Args:
+        numberID (str): the number to parse
+
+    Returns:
+        NodeID: the parsed number
+    """
+
+    return NodeID(numberID)
+
+class NodeID():
+    """
+    Class that describes a parsed number: the string, the prefix, the suffix and
+    the key, the base 10 value of the number used for sorting.
+    """
+
+    __slots__ = ('string', 'prefix', 'suffix', 'key')
+
+    def __init__(self, numberID):
+        """
+        Parses the number.
+
+        Args:
+            numberID (str): the number to parse
+        """
+
+        self.string = numberID
+        unpacked = unpackID(numberID)
+
+        if unpacked:
+            self.prefix = unpacked[:3]
+            self.suffix = unpacked[3:]
+            self.key = toBase10(unpacked)
+        else:
+            self.prefix = None
+            self.suffix = None
+            self.key = 0
+
+    def __lt__(self, other):
+        return self.key < other.key
+
+    def __eq__(self, other):
+        return isinstance(other, NodeID) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f'NodeID({self.string!r})'
+
+    def __str__(self):
+        return str(self.string)
 
 # CONVERSION
 
 VALUES = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
 
+# two digits per lookup, the table has 36 ** 2 entries
+PAIRS = [high + low for high in VALUES for low in VALUES]
+
 def toBase36(number):
     """
     Converts a number from base 10 to base 36.
@@ -137,9 +206,12 @@ def toBase36(number):
 
     outputCharacters = []
 
-    while number > 0:
-        number, rest = divmod(number, 36)
-        outputCharacters.append(VALUES[rest])
+    while number >= 36:
+        number, rest = divmod(number, 1296)
+        outputCharacters.append(PAIRS[rest])
+
+    if number > 0:
+        outputCharacters.append(VALUES[number])
 
     outputCharacters.reverse()
     outputCharacters = ''.join(outputCharacters)
@@ -157,11 +229,10 @@ def toBase10(string):
         int: the converted number
     """
 
-    output = 0
-    x = len(string) - 1
+    if not string: return 0
 
-    for char in string:
-        output += VALUES.index(char.upper()) * (36 ** x)
-        x -= 1
+    # int() also accepts signs, spaces and underscores, the old digit by digit conversion didn't
+    if not (string.isascii() and string.isalnum()):
+        raise ValueError(f'{string!r} is not a base 36 number')
 
-    return output
+    return int(string, 36)
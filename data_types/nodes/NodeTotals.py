@@ -0,0 +1,193 @@
+class NodeTotals():
+    """
+    Class that stores the aggregates of a subtree, for one unit of the subtree
+    root: the total price and the number of nodes of every type.
+
+    Every child subtree counts as many times as its quantity, so the weighted
+    counts and the price follow the quantities along the path, while the unique
+    counts count every node once.
+    """
+
+    __slots__ = ('price', 'counts', 'unique')
+
+    ASSEMBLY_TYPES = ('Project', 'Assembly')
+    HARDWARE_TYPES = ('Hardware', 'Consumable')
+
+# INIT
+
+    def __init__(self, price = 0, counts = None, unique = None):
+        """
+        Initializes the totals.
+
+        Args:
+            price (float): the total price. Defaults to 0.
+            counts (dict[str, float]): the weighted number of nodes of every type. Defaults to None.
+            unique (dict[str, int]): the number of nodes of every type. Defaults to None.
+        """
+
+        self.price = price
+        self.counts = counts or {}
+        self.unique = unique or {}
+
+    @classmethod
+    def ofNode(cls, node):
+        """
+        Returns the totals of a single node, without the descendants.
+
+        Args:
+            node (ComponentNode): the node
+
+        Returns:
+            NodeTotals: the totals of the node alone
+        """
+
+        tp = node.getFeature('type')
+        return cls(toNumber(node.getFeature('price'), 0), {tp: 1}, {tp: 1})
+
+# UPDATE
+
+    def add(self, other, factor = 1, uniqueFactor = 1):
+        """
+        Adds the totals of another subtree, repeated a number of times. Negative
+        factors subtract the totals instead.
+
+        Args:
+            other (NodeTotals): the totals to add
+            factor (float): the multiplier of the price and the weighted counts. Defaults to 1.
+            uniqueFactor (int): the multiplier of the unique counts. Defaults to 1.
+        """
+
+        if factor:
+            self.price += factor * other.price
+            counts = self.counts
+            for key, value in other.counts.items():
+                count = counts.get(key, 0) + factor * value
+                if count: counts[key] = count
+                else: counts.pop(key, None)
+
+        if uniqueFactor:
+            counts = self.unique
+            for key, value in other.unique.items():
+                count = counts.get(key, 0) + uniqueFactor * value
+                if count: counts[key] = count
+                else: counts.pop(key, None)
+
+    def copy(self):
+        """
+        Returns a copy of these totals.
+
+        Returns:
+            NodeTotals: the copied totals
+        """
+
+        return NodeTotals(self.price, self.counts.copy(), self.unique.copy())
+
+# GETTERS
+
+    def getPrice(self):
+        """
+        Returns the total price.
+
+        Returns:
+            float: the total price
+        """
+
+        return self.price
+
+    def getCount(self, *types):
+        """
+        Returns the number of nodes of the passed types, multiplied by the quantities.
+        Every type is counted if no type is passed.
+
+        Returns:
+            float: the weighted number of nodes
+        """
+
+        if not types: return sum(self.counts.values())
+        return sum(self.counts.get(tp, 0) for tp in types)
+
+    def getUniqueCount(self, *types):
+        """
+        Returns the number of nodes of the passed types, every node counted once.
+        Every type is counted if no type is passed.
+
+        Returns:
+            int: the number of nodes
+        """
+
+        if not types: return sum(self.unique.values())
+        return sum(self.unique.get(tp, 0) for tp in types)
+
+    def getPieces(self):
+        """
+        Returns the number of pieces, the nodes that are not assemblies.
+
+        Returns:
+            float: the weighted number of pieces
+        """
+
+        return self.getCount() - self.getCount(*self.ASSEMBLY_TYPES)
+
+    def getUniquePieces(self):
+        """
+        Returns the number of different pieces, the nodes that are not assemblies.
+
+        Returns:
+            int: the number of pieces
+        """
+
+        return self.getUniqueCount() - self.getUniqueCount(*self.ASSEMBLY_TYPES)
+
+    def getHardware(self):
+        """
+        Returns the number of hardware and consumable pieces.
+
+        Returns:
+            float: the weighted number of hardware pieces
+        """
+
+        return self.getCount(*self.HARDWARE_TYPES)
+
+    def getAssemblies(self):
+        """
+        Returns the number of assemblies.
+
+        Returns:
+            float: the weighted number of assemblies
+        """
+
+        return self.getCount('Assembly')
+
+# DUNDERS
+
+    def __eq__(self, other):
+        return (
+            abs(self.price - other.price) < 1e-6
+            and self.counts == other.counts
+            and self.unique == other.unique
+        )
+
+    def __repr__(self):
+        return f'NodeTotals(price={self.price}, counts={self.counts}, unique={self.unique})'
+
+# --- UTILITY ---
+
+def toNumber(value, default):
+    """
+    Returns the value as a number, or the default if it isn't a valid number.
+
+    Args:
+        value (PyObject): the value to convert
+        default (float): the value returned for not valid numbers
+
+    Returns:
+        float: the converted number
+    """
+
+    if type(value) is int or type(value) is float: return value
+    if value is None: return default
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
@@ -1,6 +1,13 @@
-import json
-
-from .TREEutil import extractNode, strToClass, classToStr
+import io
+from collections import deque
+from contextlib import contextmanager
+
+from .TREEutil import strToClass, nodeData
+from .TreeWalk import TreeWalk
+from .TreeChanges import TreeChanges
+from .JSONStreamReader import JSONStreamReader
+from .JSONStreamWriter import JSONStreamWriter
+from .BinaryProject import BinaryProject
 from ..nodes.AbstractNode import AbstractNode
 
 class AbstractTree():
@@ -8,15 +15,214 @@ class AbstractTree():
     Class that describes the basic behaviour of a tree.
     Provides copying, nodes traversal, representation, basic getters
     and json file reading and saving.
+
+    The nodes of the tree notify it when nodes are inserted, removed or edited,
+    subclasses keep their own structures in sync implementing the notification
+    functions.
+
+    The changes are also delivered to the listeners of the tree, as TreeChanges.
+    Outside a batch every change is delivered on its own; in a batch (see
+    batch()) they are collected and delivered coalesced when the batch ends, so
+    an operation on many nodes costs a single notification.
+
+    The tree keeps the nodes with pending children, see AbstractNode. Every
+    function that visits the whole tree fetches them first, through the fetcher
+    function if one is set, so that a model can announce the new rows.
     """
 
 # INIT
 
     def __init__(self, root = None):
+        self.root = None
+        self.pending = {}
+        self.fetcher = None
+        self.listeners = []
+        self.batchChanges = None
+
         if root:
-            self.root = root
+            self.setRoot(root)
         else:
-            self.root = AbstractNode()
+            self.setRoot(self._createRoot())
+
+    def _createRoot(self):
+        """
+        Private function.
+        Returns the root of an empty tree.
+
+        Returns:
+            AbstractNode: the new root
+        """
+
+        return AbstractNode()
+
+    def setRoot(self, root):
+        """
+        Sets the root of this tree. The nodes of the previous root don't belong to
+        this tree anymore.
+
+        Args:
+            root (AbstractNode): the new root
+        """
+
+        oldRoot = self.root
+        if oldRoot is not None and oldRoot.getTree() is self:
+            oldRoot._setPlace(oldRoot.getDepth(), None)
+            self._nodesRemoved(oldRoot)
+
+        self.root = root
+        root._setPlace(root.getDepth(), self)
+        self._nodesAdded(root)
+
+# NOTIFICATIONS
+
+    def _nodesAdded(self, node, fetched = False):
+        """
+        Private function.
+        Called when a node, with its descendants, is inserted in this tree.
+
+        Args:
+            node (AbstractNode): the root of the inserted subtree
+            fetched (bool): whether the node was a pending child. Defaults to False.
+        """
+
+        for descendant in self._iterPreorder(node):
+            if descendant.hasPendingChildren(): self.pending[id(descendant)] = descendant
+
+        self._record(TreeChanges.nodesFetched if fetched else TreeChanges.nodesAdded, node)
+
+    def _nodesRemoved(self, node, parent = None):
+        """
+        Private function.
+        Called when a node, with its descendants, is removed from this tree.
+
+        Args:
+            node (AbstractNode): the root of the removed subtree
+            parent (AbstractNode): the previous parent of the node. Defaults to None.
+        """
+
+        for descendant in self._iterPreorder(node):
+            self.pending.pop(id(descendant), None)
+
+        self._record(TreeChanges.nodesRemoved, node, parent)
+
+    def _pendingChanged(self, node):
+        """
+        Private function.
+        Called when the pending children of a node of this tree are set or fetched.
+
+        Args:
+            node (AbstractNode): the changed node
+        """
+
+        if node.hasPendingChildren():
+            self.pending[id(node)] = node
+        else:
+            self.pending.pop(id(node), None)
+
+    def _featureChanged(self, node, key, oldValue, newValue):
+        """
+        Private function.
+        Called when a feature of a node of this tree is added, edited or deleted.
+
+        Args:
+            node (AbstractNode): the edited node
+            key (str): the name of the feature
+            oldValue (PyObject): the previous value, None if the feature is new
+            newValue (PyObject): the current value, None if the feature is deleted
+        """
+
+        self._record(TreeChanges.featureChanged, node, key, oldValue, newValue)
+
+# CHANGES
+
+    def addListener(self, listener):
+        """
+        Adds a function called with the TreeChanges of this tree: once per batch,
+        or once per change outside a batch.
+
+        Args:
+            listener (callable): the function to call
+        """
+
+        self.listeners.append(listener)
+
+    def removeListener(self, listener):
+        """
+        Removes a listener, if present.
+
+        Args:
+            listener (callable): the function to remove
+        """
+
+        if listener in self.listeners: self.listeners.remove(listener)
+
+    def inBatch(self):
+        """
+        Returns whether a batch is running.
+
+        Returns:
+            bool: the changes are being collected
+        """
+
+        return self.batchChanges is not None
+
+    @contextmanager
+    def batch(self):
+        """
+        Collects the changes made in the block and delivers them to the listeners
+        coalesced, with a single notification, when the block ends. The batches
+        can be nested, the outer one delivers the changes. The changes are applied
+        as they are made: an error in the block ends the batch and delivers the
+        changes made until then.
+
+        Yields:
+            TreeChanges: the changes collected so far
+        """
+
+        if self.batchChanges is not None:
+            yield self.batchChanges
+            return
+
+        changes = self.batchChanges = TreeChanges()
+        try:
+            yield changes
+        finally:
+            self.batchChanges = None
+            if not changes.isEmpty(): self._deliver(changes)
+
+    def _record(self, event, *args):
+        """
+        Private function.
+        Records a change in the running batch, or delivers it at once outside a
+        batch. Nothing is recorded if the tree has no batch and no listeners.
+
+        Args:
+            event (callable): the TreeChanges function that records the change
+            args: the arguments of the change
+        """
+
+        changes = self.batchChanges
+        if changes is not None:
+            event(changes, *args)
+            return
+
+        if not self.listeners: return
+
+        changes = TreeChanges()
+        event(changes, *args)
+        if not changes.isEmpty(): self._deliver(changes)
+
+    def _deliver(self, changes):
+        """
+        Private function.
+        Calls the listeners with the passed changes.
+
+        Args:
+            changes (TreeChanges): the changes to deliver
+        """
+
+        for listener in list(self.listeners):
+            listener(changes)
 
 # COPY
 
@@ -28,62 +234,178 @@ class AbstractTree():
             AbstractTree: the copied tree
         """
 
-        copiedTree = self.__class__()
         copiedRoot = self.root.deepCopy()
-        copiedTree.root = copiedRoot
-        return copiedTree
+        return self.__class__(copiedRoot)
+
+# PENDING CHILDREN
+
+    def hasPendingNodes(self):
+        """
+        Returns whether some nodes of this tree have children not fetched yet.
+
+        Returns:
+            bool: the tree has pending nodes
+        """
+
+        return bool(self.pending)
+
+    def fetchAll(self):
+        """
+        Fetches every pending child of this tree, from the highest levels. The
+        fetcher function is used if set, the node fetchChildren() otherwise.
+        """
+
+        pending = self.pending
+        while pending:
+            node = next(iter(pending.values()))
+            if self.fetcher is None: node.fetchChildren()
+            else: self.fetcher(node)
 
 # TRAVERSAL
 
-    def iterPreorder(self):
+    def iterPreorder(self, prune = None, stop = None):
         """
         Iters through the nodes of this tree from root to leaf level.
 
+        Args:
+            prune (callable): the nodes for which it returns True are skipped with their descendants. Defaults to None.
+            stop (callable): the nodes for which it returns True are visited, their descendants are not. Defaults to None.
+
         Returns:
             Iterator: the next descendant node to visit
         """
 
-        if not self.root: return
+        if not self.root: return iter(())
 
-        return self._iterPreorder(self.root)
+        self.fetchAll()
+        return self._iterPreorder(self.root, prune, stop)
 
-    def _iterPreorder(self, root):
+    def _iterPreorder(self, root, prune = None, stop = None):
         """
-        Private recursive function.
-        Iters through the nodes of this tree from root to leaf level.
+        Private function.
+        Iters through the nodes of a subtree from root to leaf level, with an
+        explicit stack.
 
         Yields:
             AbstractNode: the next node to visit
         """
 
-        yield root
-        for child in root.getChildren():
-            yield  from self._iterPreorder(child)
+        stack = [root]
+        pop = stack.pop
+        extend = stack.extend
+
+        while stack:
+            node = pop()
+            if prune is not None and prune(node): continue
+
+            yield node
+            if stop is not None and stop(node): continue
+
+            children = node.getChildren()
+            if children: extend(reversed(children))
 
-    def iterPostorder(self):
+    def iterPostorder(self, prune = None, stop = None):
         """
         Iters through the nodes of this tree from leaf to root level.
 
+        Args:
+            prune (callable): the nodes for which it returns True are skipped with their descendants. Defaults to None.
+            stop (callable): the nodes for which it returns True are visited, their descendants are not. Defaults to None.
+
         Returns:
             Iterator: the next descendant node to visit
         """
 
-        if not self.root: return
+        if not self.root: return iter(())
 
-        return self._iterPostorder(self.root)
+        self.fetchAll()
+        return self._iterPostorder(self.root, prune, stop)
 
-    def _iterPostorder(self, root):
+    def _iterPostorder(self, root, prune = None, stop = None):
         """
-        Private recursive function.
-        Iters through the nodes of this tree from leaf to root level.
+        Private function.
+        Iters through the nodes of a subtree from leaf to root level, with an
+        explicit stack of the nodes on the current path and the iterators of
+        their children. A node is yielded once its children iterator is done, so
+        the walk can stop early without visiting the rest of the subtree.
 
         Yields:
             AbstractNode: the next descendant node to visit
         """
 
-        for child in root.getChildren():
-            yield  from self._iterPostorder(child)
-        yield root
+        if prune is not None and prune(root): return
+
+        empty = ()
+        stack = [(root, iter(empty if stop is not None and stop(root) else root.getChildren()))]
+        append = stack.append
+        pop = stack.pop
+
+        while stack:
+            node, children = stack[-1]
+
+            for child in children:
+                if prune is not None and prune(child): continue
+
+                append((child, iter(empty if stop is not None and stop(child) else child.getChildren())))
+                break
+            else:
+                pop()
+                yield node
+
+    def iterLevelorder(self, prune = None, stop = None):
+        """
+        Iters through the nodes of this tree one level at a time, from the root level.
+
+        Args:
+            prune (callable): the nodes for which it returns True are skipped with their descendants. Defaults to None.
+            stop (callable): the nodes for which it returns True are visited, their descendants are not. Defaults to None.
+
+        Returns:
+            Iterator: the next descendant node to visit
+        """
+
+        if not self.root: return iter(())
+
+        self.fetchAll()
+        return self._iterLevelorder(self.root, prune, stop)
+
+    def _iterLevelorder(self, root, prune = None, stop = None):
+        """
+        Private function.
+        Iters through the nodes of a subtree one level at a time, with a queue.
+
+        Yields:
+            AbstractNode: the next descendant node to visit
+        """
+
+        if prune is not None and prune(root): return
+
+        queue = deque((root,))
+        while queue:
+            node = queue.popleft()
+            yield node
+
+            if stop is not None and stop(node): continue
+
+            if prune is None:
+                queue.extend(node.getChildren())
+            else:
+                queue.extend(child for child in node.getChildren() if not prune(child))
+
+    def walk(self, order = 'preorder', root = None):
+        """
+        Returns a lazy pipeline over the nodes of this tree, or of a subtree, that
+        can be filtered, mapped, pruned, limited and grouped.
+
+        Args:
+            order (str): 'preorder', 'postorder' or 'levelorder'. Defaults to 'preorder'.
+            root (AbstractNode): the root of the visited subtree. Defaults to the tree root.
+
+        Returns:
+            TreeWalk: the pipeline
+        """
+
+        return TreeWalk(self, root or self.root, order)
 
 # GETTERS
 
@@ -107,11 +429,7 @@ class AbstractTree():
 
         if not self.root: return
 
-        descendants = []
-        for node in self.iterPreorder():
-            descendants.append(node)
-
-        return descendants
+        return self.walk().toList()
 
     def getLeaves(self):
         """
@@ -123,17 +441,12 @@ class AbstractTree():
 
         if not self.root: return
 
-        leaves = []
-        for node in self.iterPreorder():
-            if not node.getChildren():
-                leaves.append(node)
-
-        return leaves
+        return self.walk().filter(lambda node: not node.getChildren()).toList()
 
     def getHeight(self):
         """
         Returns this tree height, with it being the height of the root's highest
-        children +1.
+        children +1. The height is cached in the root.
 
         Returns:
             int: the height of this tree
@@ -141,14 +454,81 @@ class AbstractTree():
 
         if not self.root: return
 
+        self.fetchAll()
         return self.root.getHeight()
 
+# CONTENT HASH
+
+    def getHash(self):
+        """
+        Returns the content hash of this tree, the hash of the root subtree (see
+        AbstractNode.getHash()). After an edit only the path to the root is hashed again.
+
+        Returns:
+            bytes: the digest of the tree
+        """
+
+        return self.root.getHash()
+
+    def sameContent(self, other):
+        """
+        Returns whether this tree has the same nodes, features and structure of
+        another tree, comparing their hashes.
+
+        Args:
+            other (AbstractTree): the tree to compare
+
+        Returns:
+            bool: the trees are equal
+        """
+
+        return self.getHash() == other.getHash()
+
+# DEBUG
+
+    def checkCache(self):
+        """
+        Recalculates from scratch the depth, the height, the position and the tree
+        of every node and compares them against the values cached in the nodes.
+
+        Returns:
+            True: every cached value is correct
+            False: at least one cached value is wrong
+        """
+
+        if not self.root: return True
+
+        depth = 0
+        ancestor = self.root.getParent()
+        while ancestor:
+            depth += 1
+            ancestor = ancestor.getParent()
+
+        depths = {id(self.root): depth}
+        heights = {}
+
+        for node in self.iterPreorder():
+            if node.getDepth() != depths[id(node)]: return False
+            if node.getTree() is not self: return False
+
+            for position, child in enumerate(node.getChildren()):
+                if child.getParent() is not node or child.getIndex() != position: return False
+                depths[id(child)] = depths[id(node)] + 1
+
+        for node in self.iterPostorder():
+            children = node.getChildren()
+            heights[id(node)] = max(heights[id(child)] for child in children) + 1 if children else 0
+            if node.getHeight() != heights[id(node)]: return False
+
+        return True
+
 # REPRESENTATION
 
     def toString(self, tab = 0):
         """
         Returns a string version of the tree with all the nodes features. The string is tabbed
-        to represent the different tree levels.
+        to represent the different tree levels. The text of the subtrees not changed since
+        the last call is reused from the cache of their nodes.
 
         Args:
             tab (int): the number of spaces of indentation. Default as 0.
@@ -157,8 +537,10 @@ class AbstractTree():
             str: the tree structure in string format.
         """
 
-        string = json.dumps(self.toDict(), indent=4)
-        return string
+        self.fetchAll()
+        string = io.StringIO()
+        JSONStreamWriter(string, cache = True).write(self.root)
+        return string.getvalue()
 
     def toDict(self):
         """
@@ -170,6 +552,7 @@ class AbstractTree():
 
         if not self.root: return
 
+        self.fetchAll()
         return self._toDict(self.root)
 
     def _toDict(self, node):
@@ -181,10 +564,7 @@ class AbstractTree():
             dict[str, PyObject]: the dictionary sructure
         """
 
-        data = {}
-        data['class'] = classToStr(node)
-        if classToStr(node) == 'AssemblyNode': data['level'] = node.level
-        data.update(node.items())
+        data = nodeData(node)
 
         data['children'] = []
         for child in node.getChildren():
@@ -195,50 +575,85 @@ class AbstractTree():
 # FILE MANAGEMENT
 
     @staticmethod
-    def jsonRead(filename):
+    def jsonRead(filename, progress = None, recover = False):
         """
-        Converts a .json file to an AbstractNode data structure.
+        Converts a .json file to an AbstractNode data structure. The file is read
+        in chunks, without loading the whole json document.
 
         Args:
             filename (str): the name or path of the file
+            progress (callable): called with the characters read and the size of the file. Defaults to None.
+            recover (bool): whether to return the nodes read from a truncated file instead of raising an error. Defaults to False.
 
         Returns:
             AnstractNode: the root of the resulting tree
-        """
 
-        with open(filename, 'r') as file:
-            data = json.load(file)
+        Raises:
+            JSONStreamError: the file is malformed or truncated
+        """
 
-        root = extractNode(data)
-        return root
+        return JSONStreamReader.readFile(filename, progress, recover)
 
     @staticmethod
     def jsonParse(string):
         """
         Converts a json type string to an AbstractNode data structure.
 
+        Args:
+            string (str): the json string
+
+        Returns:
+            AbstractNode: the root of the resulting tree
+
+        Raises:
+            JSONStreamError: the string is malformed or truncated
+        """
+
+        return JSONStreamReader(io.StringIO(string)).read()
+
+    def jsonSave(self, filename, compact = False):
+        """
+        Converts an AbstractTree to a .json file. The nodes are written while
+        visiting the tree, without building the whole json document. The indented
+        text shares the cache of toString().
+
+        Args:
+            filename (str): the name or path of the file
+            compact (bool): whether to write the file without indentation and spaces. Defaults to False.
+        """
+
+        self.fetchAll()
+        JSONStreamWriter.writeFile(filename, self.root, None if compact else 4, not compact)
+
+    @staticmethod
+    def binaryRead(filename):
+        """
+        Converts a binary project file to an AbstractNode data structure.
+
         Args:
             filename (str): the name or path of the file
 
         Returns:
             AbstractNode: the root of the resulting tree
+
+        Raises:
+            ValueError: the file is not a binary project
         """
 
-        data = json.loads(string)
-        root = extractNode(data)
-        return root
+        with BinaryProject(filename) as project:
+            return project.toNode()
 
-    def jsonSave(self, filename):
+    def binarySave(self, filename):
         """
-        Converts an AbstractTree to a .json file.
+        Converts an AbstractTree to a binary project file, that can be read
+        without decoding it all. See BinaryProject.
 
         Args:
             filename (str): the name or path of the file
         """
 
-        with open(filename, 'w') as file:
-            data = self.toDict()
-            json.dump(data, file, indent = 4)
+        self.fetchAll()
+        BinaryProject.writeFile(filename, self.root)
 
 # DUNDERS
 
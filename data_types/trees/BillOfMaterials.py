@@ -0,0 +1,261 @@
+import csv
+import json
+import math
+
+from .Predicates import In
+from ..nodes.NodeTotals import NodeTotals, toNumber
+
+class BillOfMaterials():
+    """
+    Class that calculates the bill of materials of a component tree: the pieces
+    needed to build the project, or one of its assemblies, with their quantities.
+
+    The quantity of a piece is multiplied by the quantities of all the nodes on
+    its path, and the pieces with the same ID are merged in a single row, with
+    the features of the first node with that ID. Every node that is not an
+    assembly is a piece; the children of every node are counted too.
+
+    The bill of every node with children, for one unit of the node, is kept
+    with the content hash of its subtree (see AbstractNode.getHash()). An edit
+    changes the hashes of the path to the root only, so only the bills of the
+    edited node's ancestors are calculated again, from the kept bills of the
+    other children.
+
+    The rows are written one at a time to the csv and the json lines files,
+    without building the table.
+    """
+
+    __slots__ = ('tree', 'cache', 'pruneSize')
+
+    COLUMNS = [
+        'ID',
+        'name',
+        'description',
+        'type',
+        'manufacture',
+        'status',
+        'seller',
+        'link',
+        'price',
+        'packageQuantity',
+        'quantity',
+        'packages',
+        'total'
+    ]
+
+    # file extensions of the export formats
+    CSV_EXTENSION = '.csv'
+    JSON_LINES_EXTENSION = '.jsonl'
+
+# INIT
+
+    def __init__(self, tree):
+        """
+        Initializes the bill of a tree, with no kept bills.
+
+        Args:
+            tree (ComponentTree): the tree
+        """
+
+        self.tree = tree
+        self.cache = {}
+        self.pruneSize = 1024
+
+# CALCULATION
+
+    def getQuantities(self, node = None):
+        """
+        Returns the pieces needed for one unit of a node, by ID. The returned
+        dictionary is the kept one and must not be modified.
+
+        Args:
+            node (ComponentNode): the node, of this bill tree. Defaults to the root.
+
+        Returns:
+            dict[str, float]: the quantity of every piece ID
+        """
+
+        if node is None: node = self.tree.getRoot()
+
+        # hashing the subtree fetches its pending children
+        node.getHash()
+        if not node.getChildren(): return {}
+
+        self._update(node)
+        self._prune()
+
+        return self.cache[id(node)][2]
+
+    def _update(self, root):
+        """
+        Private function.
+        Calculates the bills of the nodes of a subtree whose hash changed, from
+        the leaves, with an explicit stack. The subtrees with the same hash are
+        skipped.
+        """
+
+        cache = self.cache
+        stack = [(root, False)]
+
+        while stack:
+            node, visited = stack.pop()
+
+            if visited:
+                cache[id(node)] = (node, node.getHash(), self._calculate(node))
+                continue
+
+            kept = cache.get(id(node))
+            if kept is not None and kept[0] is node and kept[1] == node.getHash(): continue
+
+            stack.append((node, True))
+            for child in node.getChildren():
+                if child.getChildren(): stack.append((child, False))
+
+    def _calculate(self, node):
+        """
+        Private function.
+        Returns the bill of one unit of a node from its children and their kept
+        bills.
+        """
+
+        cache = self.cache
+        assemblies = NodeTotals.ASSEMBLY_TYPES
+        quantities = {}
+
+        for child in node.getChildren():
+            quantity = child.getQuantity()
+
+            if child.getFeature('type') not in assemblies:
+                ID = child.getFeature('ID')
+                quantities[ID] = quantities.get(ID, 0) + quantity
+
+            if child.getChildren():
+                for ID, count in cache[id(child)][2].items():
+                    quantities[ID] = quantities.get(ID, 0) + quantity * count
+
+        return quantities
+
+    def _prune(self):
+        """
+        Private function.
+        Drops the bills of the nodes not in the tree anymore, once the kept bills
+        double in number.
+        """
+
+        if len(self.cache) < self.pruneSize: return
+
+        tree = self.tree
+        self.cache = {key: kept for key, kept in self.cache.items() if kept[0].getTree() is tree}
+        self.pruneSize = max(1024, 2 * len(self.cache))
+
+    def clear(self):
+        """
+        Drops every kept bill.
+        """
+
+        self.cache.clear()
+
+# ROWS
+
+    def iterRows(self, node = None):
+        """
+        Iters through the rows of the bill of a node, sorted by ID. Every row is
+        built when it's reached.
+
+        Args:
+            node (ComponentNode): the node, of this bill tree. Defaults to the root.
+
+        Yields:
+            dict[str, PyObject]: the values of the COLUMNS of the next row
+        """
+
+        quantities = self.getQuantities(node)
+        self.tree.addIndex('ID', True)
+
+        pieces = {}
+        for piece in self.tree.query(In('ID', quantities)):
+            pieces.setdefault(piece.getFeature('ID'), piece)
+
+        for ID in sorted(quantities, key = str):
+            yield self._row(pieces[ID], ID, quantities[ID])
+
+    @staticmethod
+    def _row(node, ID, quantity):
+        """
+        Private function.
+        Returns the row of a piece: its features, the quantity, the packages to
+        buy and the total price.
+        """
+
+        price = toNumber(node.getFeature('price'), 0)
+        packageQuantity = toNumber(node.getFeature('packageQuantity'), 0)
+        packages = math.ceil(quantity / packageQuantity) if packageQuantity > 0 else None
+
+        return {
+            'ID': ID,
+            'name': node.getFeature('name'),
+            'description': node.getFeature('description'),
+            'type': node.getFeature('type'),
+            'manufacture': node.getFeature('manufacture'),
+            'status': node.getFeature('status'),
+            'seller': node.getFeature('seller'),
+            'link': node.getFeature('link'),
+            'price': price,
+            'packageQuantity': node.getFeature('packageQuantity'),
+            'quantity': quantity,
+            'packages': packages,
+            'total': price * quantity
+        }
+
+# FILE MANAGEMENT
+
+    def writeCsv(self, file, node = None):
+        """
+        Writes the bill of a node to a csv text stream, with a header row.
+
+        Args:
+            file (TextIO): the text stream to write, opened with newline=''
+            node (ComponentNode): the node, of this bill tree. Defaults to the root.
+        """
+
+        writer = csv.DictWriter(file, self.COLUMNS)
+        writer.writeheader()
+        for row in self.iterRows(node):
+            writer.writerow(row)
+
+    def writeJsonLines(self, file, node = None):
+        """
+        Writes the bill of a node to a text stream as json lines: a json object
+        per row, one per line.
+
+        Args:
+            file (TextIO): the text stream to write
+            node (ComponentNode): the node, of this bill tree. Defaults to the root.
+        """
+
+        for row in self.iterRows(node):
+            file.write(json.dumps(row))
+            file.write('\n')
+
+    def exportFile(self, filename, node = None):
+        """
+        Writes the bill of a node to a csv or a json lines file, by the extension.
+
+        Args:
+            filename (str): the name or path of the file
+            node (ComponentNode): the node, of this bill tree. Defaults to the root.
+
+        Raises:
+            ValueError: the extension is not of an export format
+        """
+
+        lowerName = filename.lower()
+
+        if lowerName.endswith(self.CSV_EXTENSION):
+            with open(filename, 'w', newline = '') as file:
+                self.writeCsv(file, node)
+        elif lowerName.endswith(self.JSON_LINES_EXTENSION):
+            with open(filename, 'w') as file:
+                self.writeJsonLines(file, node)
+        else:
+            raise ValueError(f'{filename!r} is not a {self.CSV_EXTENSION} or {self.JSON_LINES_EXTENSION} file')
@@ -0,0 +1,402 @@
+import json
+import mmap
+import struct
+
+from .TREEutil import strToClass, nodeData
+
+# file layout: header, string table, node records, feature records, ID index
+HEADER = struct.Struct('<4sHHIIQQQQ')
+NODE = struct.Struct('<IIIIII')
+FEATURE = struct.Struct('<II8s')
+OFFSET = struct.Struct('<Q')
+INDEX_ENTRY = struct.Struct('<II')
+COUNT = struct.Struct('<I')
+INT64 = struct.Struct('<q')
+FLOAT64 = struct.Struct('<d')
+
+MAGIC = b'PRJB'
+VERSION = 1
+NO_PARENT = 0xFFFFFFFF
+
+# tags of the feature values
+NULL, FALSE, TRUE, INT, FLOAT, STRING, JSON = range(7)
+
+class BinaryProject():
+    """
+    Class that reads a tree stored in the binary project format, through a
+    memory map of the file. The file holds:
+
+        - a header with the number and the offsets of the other sections;
+        - a string table, where every class name, feature key and string value is stored once;
+        - a fixed size record for every node, in level order, with the index of the
+          parent, the range of the children and the range of the features;
+        - a fixed size record for every feature, with the key, the type and the value;
+        - a footer with the IDs sorted, pointing to their nodes.
+
+    Only the parts used are decoded: the features of a node are read when asked,
+    a node is found by ID with a binary search, and a single subtree can be built
+    without reading the rest of the file. The conversion to and from the json
+    layout is lossless, the order of the features and the type of the values
+    are kept.
+    """
+
+    EXTENSION = '.prjb'
+
+# INIT
+
+    def __init__(self, filename):
+        """
+        Opens the file and maps it in memory.
+
+        Args:
+            filename (str): the name or path of the file
+
+        Raises:
+            ValueError: the file is not a binary project
+        """
+
+        with open(filename, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f'{filename} is not a binary project')
+
+        (
+            magic, version, _, self.nodeCount, self.stringCount,
+            self._stringsOffset, self._nodesOffset, self._featuresOffset, self._indexOffset
+        ) = HEADER.unpack_from(self._map, 0)
+
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'{filename} is not a binary project')
+
+        self._blobOffset = self._stringsOffset + OFFSET.size * (self.stringCount + 1)
+        self._indexCount = COUNT.unpack_from(self._map, self._indexOffset)[0]
+        self._strings = {}
+
+    @classmethod
+    def isBinaryFile(cls, filename):
+        """
+        Returns whether a file name has the extension of the binary projects.
+
+        Args:
+            filename (str): the name or path of the file
+
+        Returns:
+            bool: the file is a binary project
+        """
+
+        return filename.lower().endswith(cls.EXTENSION)
+
+    def close(self):
+        """
+        Closes the memory map of the file.
+        """
+
+        self._map.close()
+
+# WRITING
+
+    @classmethod
+    def writeFile(cls, filename, root):
+        """
+        Writes a tree to a binary project file.
+
+        Args:
+            filename (str): the name or path of the file
+            root (AbstractNode): the root of the tree
+        """
+
+        strings = {}
+        nodeRecords = bytearray()
+        featureRecords = bytearray()
+        index = []
+
+        def intern(string):
+            number = strings.get(string)
+            if number is None: number = strings[string] = len(strings)
+            return number
+
+        # level order: the children of every node get consecutive records
+        nodes = [root] if root is not None else []
+        parents = [NO_PARENT]
+        featureCount = 0
+        position = 0
+        while position < len(nodes):
+            node = nodes[position]
+            children = node.getChildren()
+            firstChild = len(nodes)
+            nodes.extend(children)
+            parents.extend([position] * len(children))
+
+            data = nodeData(node)
+            classname = data.pop('class')
+            data.pop('children', None)
+
+            for key, value in data.items():
+                tag, payload = cls._encodeValue(value, intern)
+                featureRecords += FEATURE.pack(intern(key), tag, payload)
+
+            ID = data.get('ID')
+            if ID.__class__ is str: index.append((ID.encode('utf-8', 'surrogatepass'), intern(ID), position))
+
+            nodeRecords += NODE.pack(intern(classname), parents[position], firstChild, len(children), featureCount, len(data))
+            featureCount += len(data)
+            position += 1
+
+        # the string table: the offsets of the strings, then their bytes
+        blob = bytearray()
+        offsets = bytearray()
+        for string in strings:
+            offsets += OFFSET.pack(len(blob))
+            blob += string.encode('utf-8', 'surrogatepass')
+        offsets += OFFSET.pack(len(blob))
+
+        index.sort(key = lambda entry: entry[0])
+        indexRecords = bytearray(COUNT.pack(len(index)))
+        for _, string, node in index:
+            indexRecords += INDEX_ENTRY.pack(string, node)
+
+        stringsOffset = HEADER.size
+        nodesOffset = stringsOffset + len(offsets) + len(blob)
+        featuresOffset = nodesOffset + len(nodeRecords)
+        indexOffset = featuresOffset + len(featureRecords)
+
+        with open(filename, 'wb') as file:
+            file.write(HEADER.pack(
+                MAGIC, VERSION, 0, len(nodes), len(strings),
+                stringsOffset, nodesOffset, featuresOffset, indexOffset
+            ))
+            file.write(offsets)
+            file.write(blob)
+            file.write(nodeRecords)
+            file.write(featureRecords)
+            file.write(indexRecords)
+
+    @staticmethod
+    def _encodeValue(value, intern):
+        """
+        Private function.
+        Returns the tag and the 8 bytes payload of a feature value. The values
+        that aren't plain numbers or strings are stored as json strings.
+        """
+
+        valueClass = value.__class__
+        if value is None: return NULL, bytes(8)
+        if valueClass is bool: return (TRUE if value else FALSE), bytes(8)
+        if valueClass is int and -(1 << 63) <= value < (1 << 63): return INT, INT64.pack(value)
+        if valueClass is float: return FLOAT, FLOAT64.pack(value)
+        if valueClass is str: return STRING, OFFSET.pack(intern(value))
+        return JSON, OFFSET.pack(intern(json.dumps(value)))
+
+# NODE RECORDS
+
+    def getClassName(self, number):
+        """
+        Returns the class name of a node record.
+
+        Args:
+            number (int): the number of the record
+
+        Returns:
+            str: the class name
+        """
+
+        return self._string(self._node(number)[0])
+
+    def getParentNumber(self, number):
+        """
+        Returns the record number of the parent of a node.
+
+        Args:
+            number (int): the number of the record
+
+        Returns:
+            int: the number of the parent record
+            None: the node is the root
+        """
+
+        parent = self._node(number)[1]
+        return None if parent == NO_PARENT else parent
+
+    def getChildNumbers(self, number):
+        """
+        Returns the record numbers of the children of a node.
+
+        Args:
+            number (int): the number of the record
+
+        Returns:
+            range: the numbers of the children records
+        """
+
+        _, _, firstChild, childCount, _, _ = self._node(number)
+        return range(firstChild, firstChild + childCount)
+
+    def getFeatures(self, number):
+        """
+        Returns the features of a node record, in their original order.
+
+        Args:
+            number (int): the number of the record
+
+        Returns:
+            dict[str, PyObject]: the features of the node
+        """
+
+        _, _, _, _, firstFeature, featureCount = self._node(number)
+
+        features = {}
+        offset = self._featuresOffset + FEATURE.size * firstFeature
+        for _ in range(featureCount):
+            key, tag, payload = FEATURE.unpack_from(self._map, offset)
+            features[self._string(key)] = self._decodeValue(tag, payload)
+            offset += FEATURE.size
+
+        return features
+
+    def findID(self, ID):
+        """
+        Returns the record number of the node with the passed ID, with a binary
+        search in the sorted ID index. Only the probed IDs are decoded.
+
+        Args:
+            ID (str): the ID to search
+
+        Returns:
+            int: the number of the record of the first node with the ID
+            None: no node has the ID
+        """
+
+        if ID.__class__ is not str: return None
+
+        target = ID.encode('utf-8', 'surrogatepass')
+        low = 0
+        high = self._indexCount
+        while low < high:
+            middle = (low + high) // 2
+            if self._stringBytes(self._indexEntry(middle)[0]) < target: low = middle + 1
+            else: high = middle
+
+        if low < self._indexCount:
+            string, number = self._indexEntry(low)
+            if self._stringBytes(string) == target: return number
+
+# CONVERSION
+
+    def toNode(self, number = 0):
+        """
+        Builds the node of a record, with all its descendants. Only the records
+        of the subtree are read.
+
+        Args:
+            number (int): the number of the record. Defaults to 0, the root.
+
+        Returns:
+            AbstractNode: the built node
+            None: the file has no nodes
+        """
+
+        if not self.nodeCount: return None
+
+        # the subtree in level order, then the children inserted from the deepest nodes
+        numbers = [number]
+        position = 0
+        while position < len(numbers):
+            numbers.extend(self.getChildNumbers(numbers[position]))
+            position += 1
+
+        nodes = {}
+        for current in numbers:
+            nodes[current] = strToClass(self.getClassName(current)).fromFeatures(self.getFeatures(current))
+
+        for current in reversed(numbers):
+            children = self.getChildNumbers(current)
+            if children: nodes[current].addChildren([nodes[child] for child in children])
+
+        return nodes[number]
+
+    def getNode(self, ID):
+        """
+        Builds the node with the passed ID, with all its descendants.
+
+        Args:
+            ID (str): the ID of the node
+
+        Returns:
+            AbstractNode: the built node
+            None: no node has the ID
+        """
+
+        number = self.findID(ID)
+        if number is None: return None
+        return self.toNode(number)
+
+# UTILITY
+
+    def _node(self, number):
+        """
+        Private function.
+        Returns the fields of a node record.
+        """
+
+        if not 0 <= number < self.nodeCount: raise IndexError(f'node record {number} out of range')
+        return NODE.unpack_from(self._map, self._nodesOffset + NODE.size * number)
+
+    def _indexEntry(self, position):
+        """
+        Private function.
+        Returns the string and the node record of an entry of the ID index.
+        """
+
+        return INDEX_ENTRY.unpack_from(self._map, self._indexOffset + COUNT.size + INDEX_ENTRY.size * position)
+
+    def _stringBytes(self, number):
+        """
+        Private function.
+        Returns the encoded bytes of a string of the string table.
+        """
+
+        offset = self._stringsOffset + OFFSET.size * number
+        start = OFFSET.unpack_from(self._map, offset)[0]
+        end = OFFSET.unpack_from(self._map, offset + OFFSET.size)[0]
+
+        return self._map[self._blobOffset + start:self._blobOffset + end]
+
+    def _string(self, number):
+        """
+        Private function.
+        Returns a string of the string table, decoding it once.
+        """
+
+        string = self._strings.get(number)
+        if string is None:
+            string = self._strings[number] = self._stringBytes(number).decode('utf-8', 'surrogatepass')
+
+        return string
+
+    def _decodeValue(self, tag, payload):
+        """
+        Private function.
+        Returns the feature value of a tag and its payload.
+        """
+
+        if tag == STRING: return self._string(OFFSET.unpack(payload)[0])
+        if tag == NULL: return None
+        if tag == INT: return INT64.unpack(payload)[0]
+        if tag == FLOAT: return FLOAT64.unpack(payload)[0]
+        if tag == TRUE: return True
+        if tag == FALSE: return False
+        return json.loads(self._string(OFFSET.unpack(payload)[0]))
+
+# DUNDERS
+
+    def __len__(self):
+        return self.nodeCount
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
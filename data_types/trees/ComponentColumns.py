@@ -0,0 +1,243 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ..nodes.NodeTotals import toNumber
+
+class ComponentColumns():
+    """
+    Class that stores a columnar snapshot of a component tree, for analytics.
+    Every node is a row, in preorder, so every parent comes before its children.
+    The numeric features are NumPy arrays and the categorical ones are stored as
+    integer codes with their list of labels.
+
+    The kernels work one depth level at a time on whole arrays, so their cost
+    doesn't depend on the Python speed of the nodes. The snapshot is not updated
+    when the tree changes, a new one must be taken.
+
+    NumPy is an optional dependency, needed only by this class.
+    """
+
+    # features stored as integer codes
+    CATEGORIES = ('type', 'status', 'manufacture', 'seller')
+
+# INIT
+
+    def __init__(self, parent, depth, key, price, quantity, codes, categories, ids = None):
+        """
+        Initializes the snapshot from its arrays.
+
+        Args:
+            parent (ndarray): the row of the parent of every row, -1 for the root
+            depth (ndarray): the depth of every row
+            key (ndarray): the base 10 value of the ID of every row
+            price (ndarray): the price of every row, 0 if not valid
+            quantity (ndarray): the quantity of every row, 1 if not valid
+            codes (dict[str, ndarray]): the code of every row, for every categorical feature
+            categories (dict[str, list]): the labels of the codes, for every categorical feature
+            ids (list[str]): the ID of every row. Defaults to None.
+        """
+
+        _requireNumpy()
+
+        self.parent = parent
+        self.depth = depth
+        self.key = key
+        self.price = price
+        self.quantity = quantity
+        self.codes = codes
+        self.categories = categories
+        self.ids = ids
+        self._levelRows = None
+
+    @classmethod
+    def fromTree(cls, tree):
+        """
+        Takes the snapshot of a component tree.
+
+        Args:
+            tree (ComponentTree): the tree to convert
+
+        Returns:
+            ComponentColumns: the snapshot of the tree
+        """
+
+        _requireNumpy()
+
+        parent = []
+        depth = []
+        key = []
+        price = []
+        quantity = []
+        ids = []
+        labels = {name: {} for name in cls.CATEGORIES}
+        codes = {name: [] for name in cls.CATEGORIES}
+        categorical = [(name, labels[name], codes[name].append) for name in cls.CATEGORIES]
+
+        root = tree.getRoot()
+        rootDepth = root.getDepth()
+
+        # preorder with an explicit stack, carrying the row of the parent
+        stack = [(root, -1)]
+        while stack:
+            node, up = stack.pop()
+            row = len(ids)
+            getFeature = node.getFeature
+
+            parent.append(up)
+            depth.append(node.getDepth() - rootDepth)
+            key.append(node.getSize())
+            price.append(toNumber(getFeature('price'), 0))
+            quantity.append(toNumber(getFeature('quantity'), 1))
+            ids.append(getFeature('ID'))
+
+            for name, codeMap, append in categorical:
+                value = getFeature(name)
+                code = codeMap.get(value)
+                if code is None: code = codeMap[value] = len(codeMap)
+                append(code)
+
+            children = node.getChildren()
+            if children: stack.extend((child, row) for child in reversed(children))
+
+        return cls(
+            np.array(parent, dtype = np.int64),
+            np.array(depth, dtype = np.int32),
+            np.array(key, dtype = np.int64),
+            np.array(price, dtype = np.float64),
+            np.array(quantity, dtype = np.float64),
+            {name: np.array(values, dtype = np.int32) for name, values in codes.items()},
+            {name: list(codeMap) for name, codeMap in labels.items()},
+            ids
+        )
+
+# KERNELS
+
+    def pathQuantities(self):
+        """
+        Returns the quantity of every row multiplied by the quantities of all its
+        ancestors: the number of pieces of the row in the whole project.
+
+        Returns:
+            ndarray: the path multiplied quantities
+        """
+
+        total = self.quantity.copy()
+        for rows in self._levels()[1:]:
+            total[rows] *= total[self.parent[rows]]
+
+        return total
+
+    def subtreeSums(self, values):
+        """
+        Returns, for every row, the sum of the values of the row and of all its
+        descendants.
+
+        Args:
+            values (ndarray): one value for every row
+
+        Returns:
+            ndarray: the subtree sums
+        """
+
+        sums = np.array(values, dtype = np.float64)
+        for rows in reversed(self._levels()[1:]):
+            sums += np.bincount(self.parent[rows], weights = sums[rows], minlength = len(self))
+
+        return sums
+
+    def costs(self):
+        """
+        Returns the cost of every row in the whole project: the price multiplied by
+        the path quantity.
+
+        Returns:
+            ndarray: the cost of every row
+        """
+
+        return self.price * self.pathQuantities()
+
+    def totalCost(self):
+        """
+        Returns the total cost of the project.
+
+        Returns:
+            float: the total cost
+        """
+
+        return float(self.costs().sum())
+
+    def subtreeCosts(self):
+        """
+        Returns, for every row, the cost of its subtree in the whole project.
+
+        Returns:
+            ndarray: the subtree costs
+        """
+
+        return self.subtreeSums(self.costs())
+
+    def quantityPerLevel(self):
+        """
+        Returns the number of pieces at every depth level, path quantities included.
+
+        Returns:
+            ndarray: the number of pieces, indexed by depth
+        """
+
+        return np.bincount(self.depth, weights = self.pathQuantities())
+
+    def groupBy(self, name, values = None):
+        """
+        Sums the values of the rows by the labels of a categorical feature. Without
+        values, the rows are counted.
+
+        Args:
+            name (str): the categorical feature
+            values (ndarray): one value for every row. Defaults to None.
+
+        Returns:
+            dict[PyObject, float]: the sum of every label
+        """
+
+        labels = self.categories[name]
+        sums = np.bincount(self.codes[name], weights = values, minlength = len(labels))
+
+        return {label: sums[code].item() for code, label in enumerate(labels)}
+
+# UTILITY
+
+    def _levels(self):
+        """
+        Private function.
+        Returns the rows of every depth level, from the root level. The levels are
+        calculated once per snapshot.
+
+        Returns:
+            list[ndarray]: the rows of every level
+        """
+
+        if self._levelRows is not None: return self._levelRows
+        if not len(self): return []
+
+        order = np.argsort(self.depth, kind = 'stable')
+        bounds = np.searchsorted(self.depth[order], np.arange(int(self.depth.max()) + 2))
+
+        self._levelRows = [order[bounds[level]:bounds[level + 1]] for level in range(len(bounds) - 1)]
+        return self._levelRows
+
+# DUNDERS
+
+    def __len__(self):
+        return len(self.parent)
+
+# --- UTILITY ---
+
+def _requireNumpy():
+    """
+    Private function.
+    Raises an ImportError if NumPy is not installed.
+    """
+
+    if np is None: raise ImportError('NumPy is required for the columnar snapshots')
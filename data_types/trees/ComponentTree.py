@@ -1,66 +1,326 @@
-from ..nodes.NODESutil import incrementID
 from .TREEutil import strToClass
+from .IDAllocator import IDAllocator
+from .FeatureIndex import FeatureIndex
+from .Predicates import And, Equal, In
+from .ComponentColumns import ComponentColumns
+from .TreeChanges import TreeChanges
+from .BillOfMaterials import BillOfMaterials
+from .TreeDiff import TreeDiff
+from .TreeMerge import TreeMerge
 
 from .AbstractTree import AbstractTree
 from ..nodes.CompositeNodes import ProjectNode
+from ..nodes.NodeTotals import NodeTotals
 
 class ComponentTree(AbstractTree):
     """
     Class that describes the behaviour of a component tree.
     Extends AbstractTree class and provides nodes research, and specific getters.
+    The used IDs are tracked by an IDAllocator, kept in sync with the tree.
+    The totals of the whole tree are the ones cached in the root.
+
+    The tree keeps a FeatureIndex for every declared feature: a unique one on
+    the ID and multi value ones on type, status, seller and manufacture. More
+    indexes can be added at runtime. The searches use them automatically.
     """
 
+    # indexed features, with their uniqueness
+    INDEXES = {
+        'ID': True,
+        'type': False,
+        'status': False,
+        'seller': False,
+        'manufacture': False
+    }
+
     def __init__(self, root = None):
+        self.allocator = IDAllocator()
+        self.indexes = {key: FeatureIndex(key, unique) for key, unique in self.INDEXES.items()}
+        self.bill = None
         super().__init__(root)
-        if not root: self.root = ProjectNode()
+
+    def _createRoot(self):
+        """
+        Private function.
+        Returns the root of an empty component tree.
+
+        Returns:
+            ProjectNode: the new root
+        """
+
+        return ProjectNode()
+
+# NOTIFICATIONS
+
+    def _nodesAdded(self, node, fetched = False):
+        """
+        Private function.
+        Registers the IDs of the inserted nodes and adds them to the indexes.
+        The pending nodes are not in the indexes until they are fetched.
+
+        Args:
+            node (ComponentNode): the root of the inserted subtree
+            fetched (bool): whether the node was a pending child. Defaults to False.
+        """
+
+        indexes = self.indexes.values()
+        for descendant in self._iterPreorder(node):
+            self.allocator.add(descendant.getFeature('ID'))
+            for index in indexes:
+                index.add(descendant, descendant.getFeature(index.key))
+            if descendant.hasPendingChildren(): self.pending[id(descendant)] = descendant
+
+        self._record(TreeChanges.nodesFetched if fetched else TreeChanges.nodesAdded, node)
+
+    def _nodesRemoved(self, node, parent = None):
+        """
+        Private function.
+        Frees the IDs of the removed nodes and removes them from the indexes.
+
+        Args:
+            node (ComponentNode): the root of the removed subtree
+            parent (ComponentNode): the previous parent of the node. Defaults to None.
+        """
+
+        indexes = self.indexes.values()
+        for descendant in self._iterPreorder(node):
+            self.allocator.remove(descendant.getFeature('ID'))
+            for index in indexes:
+                index.remove(descendant, descendant.getFeature(index.key))
+            self.pending.pop(id(descendant), None)
+
+        self._record(TreeChanges.nodesRemoved, node, parent)
+
+    def _featureChanged(self, node, key, oldValue, newValue):
+        """
+        Private function.
+        Updates the used IDs and the indexes when a feature of a node changes.
+        """
+
+        if key == 'ID':
+            self.allocator.remove(oldValue)
+            self.allocator.add(newValue)
+
+        index = self.indexes.get(key)
+        if index is not None: index.update(node, oldValue, newValue)
+
+        self._record(TreeChanges.featureChanged, node, key, oldValue, newValue)
+
+# INDEXES
+
+    def addIndex(self, key, unique = False):
+        """
+        Declares a new index on a feature and fills it with the nodes of the tree.
+        If the feature is already indexed the existing index is returned.
+
+        Args:
+            key (str): the feature to index
+            unique (bool): whether the values are expected to be unique. Defaults to False.
+
+        Returns:
+            FeatureIndex: the index of the feature
+        """
+
+        index = self.indexes.get(key)
+        if index is not None: return index
+
+        index = self.indexes[key] = FeatureIndex(key, unique)
+        for node in self._iterPreorder(self.root):
+            index.add(node, node.getFeature(key))
+
+        return index
+
+    def dropIndex(self, key):
+        """
+        Removes the index of a feature, if present.
+
+        Args:
+            key (str): the indexed feature
+        """
+
+        self.indexes.pop(key, None)
+
+    def getFeatureIndex(self, key):
+        """
+        Returns the index of a feature.
+
+        Args:
+            key (str): the indexed feature
+
+        Returns:
+            FeatureIndex: the index of the feature
+            None: the feature is not indexed
+        """
+
+        return self.indexes.get(key)
 
 # RESEARCH
 
     def searchNode(self, **parameters):
         """
         Search for a node with the specified parameters. If more than one is present in
-        the tree, only the first occurrence is returnded.
+        the tree, only the first occurrence in preorder is returnded. The search is
+        planned like query().
 
         Returns:
             ComponentNode: the first occurrence that respects the given parameters
         """
 
-        for node in self.iterPreorder():
-            check = True
-
-            for key, value in parameters.items():
-                checkingValue = node.getFeature(key)
-                if not checkingValue == value:
-                    check = False
-                    break
+        self.fetchAll()
+        predicate = self._combine((), parameters)
+        candidates, root, depth = self._plan(predicate)
+        if candidates is None: return self._scan(predicate, root, depth).first()
 
-            if check: return node
-        return None
+        return min(filter(predicate.match, candidates), key = self._preorderKey, default = None)
 
     def searchNodes(self, **parameters):
         """
         Returns a list of nodes with the specified parameters. If nothing is specified,
-        all of the nodes in the subtree will be returned.
+        all of the nodes in the subtree will be returned, in preorder. The search is
+        planned like query().
 
         Returns:
             list[ComponentNode]: the list of the corresponding nodes found
         """
 
-        searchList = []
+        return self.query(**parameters)
+
+    def _inPreorder(self, nodes):
+        """
+        Private function.
+        Returns the nodes of an index bucket sorted in the preorder of the tree,
+        the order a walk would find them in.
+
+        Args:
+            nodes (list[ComponentNode]): the nodes, in insertion order
+
+        Returns:
+            list[ComponentNode]: the nodes in preorder
+        """
+
+        if len(nodes) < 2: return nodes
+        return sorted(nodes, key = self._preorderKey)
+
+    @staticmethod
+    def _preorderKey(node):
+        """
+        Private function.
+        Returns the positions of the path from the root to a node. The paths sort
+        like the preorder: an ancestor comes before its descendants.
+
+        Args:
+            node (ComponentNode): the node
+
+        Returns:
+            list[int]: the row of every node of the path, the root excluded
+        """
+
+        path = []
+        parent = node.getParent()
+        while parent is not None:
+            path.append(node.getIndex())
+            node = parent
+            parent = node.getParent()
+
+        path.reverse()
+        return path
+
+# QUERY
+
+    def query(self, *predicates, **features):
+        """
+        Returns the nodes that respect all the passed predicates and have the passed
+        feature values. The query is planned: if an index gives fewer candidates
+        than the nodes to scan, only the candidates are checked, otherwise the tree is
+        scanned, restricted to the subtree and to the levels allowed by the predicates.
+        Either way the nodes are returned in preorder.
+
+        Args:
+            predicates (Predicate): the conditions on the nodes
+            features (dict[str, PyObject]): the features that must be equal to the values
+
+        Returns:
+            list[ComponentNode]: the nodes found
+        """
+
+        self.fetchAll()
+        predicate = self._combine(predicates, features)
+        candidates, root, depth = self._plan(predicate)
+
+        if candidates is None: return self._scan(predicate, root, depth).toList()
+
+        return self._inPreorder(list(filter(predicate.match, candidates)))
+
+    def explain(self, *predicates, **features):
+        """
+        Returns a description of the plan query() would use for the same arguments.
+
+        Returns:
+            str: the plan description
+        """
+
+        self.fetchAll()
+        predicate = self._combine(predicates, features)
+        candidates, root, depth = self._plan(predicate)
+
+        if candidates is not None:
+            return f'index: {len(candidates)} candidates for {predicate!r}'
+
+        return f'scan: from {root.getFeature("ID")!r}, down to level {depth}, for {predicate!r}'
+
+    @staticmethod
+    def _combine(predicates, features):
+        """
+        Private function.
+        Returns a single predicate from the predicates and the feature values.
+        """
+
+        predicates = list(predicates)
+        predicates.extend(Equal(key, value) for key, value in features.items())
+        if len(predicates) == 1: return predicates[0]
+        return And(*predicates)
+
+    def _scan(self, predicate, root, depth):
+        """
+        Private function.
+        Returns the preorder walk of the subtree of the root that yields the nodes
+        respecting the predicate, without going below the deepest level.
+
+        Args:
+            predicate (Predicate): the query predicate
+            root (ComponentNode): the root of the scanned subtree
+            depth (int): the deepest level, None to scan the whole subtree
+
+        Returns:
+            TreeWalk: the filtered walk
+        """
+
+        walk = self.walk(root = root)
+        if depth is not None: walk = walk.stop(lambda node: node.getLevel() >= depth)
+        return walk.filter(predicate.match)
+
+    def _plan(self, predicate):
+        """
+        Private function.
+        Chooses between the index candidates and the scan of the tree, comparing
+        the number of candidates with the size of the subtree to scan. The size of
+        the subtree is read from the cached totals.
+
+        Args:
+            predicate (Predicate): the query predicate
 
-        for node in self.iterPreorder():
-            check = True
+        Returns:
+            tuple[list, ComponentNode, int]: the candidates (None to scan), the scan root and the deepest level
+        """
 
-            for featureKey, featureValue in parameters.items():
-                checkingValue = node.getFeature(featureKey)
-                if not checkingValue == featureValue:
-                    check = False
-                    break
+        root, depth = predicate.scope()
+        if root is None or root.getTree() is not self: root = self.root
 
-            if check:
-                searchList.append(node)
+        estimate = predicate.estimate(self)
+        if estimate is not None and estimate <= root.getTotals().getUniqueCount():
+            return predicate.candidates(self), root, depth
 
-        return searchList
+        return None, root, depth
 
 # GETTERS
 
@@ -71,21 +331,13 @@ class ComponentTree(AbstractTree):
         Args:
             prefix (str): the prefix of the parent of the new item
             level (int): the level of the new item
-            root (ComponentNode): root of the tree to search to speed up the process
 
         Returns:
             str: the next available number
         """
 
-        suffix = '000'
-        ct = 1
-        number = incrementID(prefix, suffix, level, ct)
-
-        while self.searchNode(ID = number):
-            ct += 1
-            number = incrementID(prefix, suffix, level, ct)
-
-        return number
+        self.fetchAll()
+        return self.allocator.newNumber(prefix, level)
 
     def getNewNode(self, parent, classname):
         """
@@ -132,14 +384,114 @@ class ComponentTree(AbstractTree):
 
     def getHardwareNodes(self):
         """
-        Searches for the hardware and product nodes inside the tree and returns the
-        list of these nodes.
+        Searches for the hardware and consumable nodes inside the tree and returns the
+        list of these nodes, in preorder.
 
         Returns:
             list[ComponentNode]: the list of hardware nodes
         """
 
-        hardwareNodes = self.searchNodes(type = 'Hardware')
-        hardwareNodes.extend(self.searchNodes(type = 'Product'))
+        return self.query(In('type', NodeTotals.HARDWARE_TYPES))
+
+    def copy(self):
+        """
+        Extends AbstractTree.copy() declaring the same indexes on the copied tree.
+        """
+
+        copiedTree = super().copy()
+        for key, index in self.indexes.items():
+            copiedTree.addIndex(key, index.unique)
+
+        return copiedTree
+
+    def toColumns(self):
+        """
+        Returns a columnar snapshot of this tree, with NumPy arrays for the
+        analytics kernels. Requires NumPy.
+
+        Returns:
+            ComponentColumns: the snapshot of the tree
+        """
+
+        self.fetchAll()
+        return ComponentColumns.fromTree(self)
+
+    def diff(self, other):
+        """
+        Returns the structural differences from this tree to another one: the
+        nodes added, removed, moved and with changed features, matched by ID.
+        The subtrees with the same content hash are skipped.
+
+        Args:
+            other (ComponentTree): the changed tree
+
+        Returns:
+            TreeDiff: the differences
+        """
+
+        return TreeDiff.compare(self, other)
+
+    def merge(self, base, theirs):
+        """
+        Three-way merge: applies to this tree the changes made from a common base
+        to another version, in place. The conflicting changes are not applied.
+
+        Args:
+            base (ComponentTree): the common base of this tree and the other version
+            theirs (ComponentTree): the other version
+
+        Returns:
+            TreeMerge: the applied changes and the conflicts
+        """
+
+        return TreeMerge.merge(base, self, theirs)
+
+    def getBill(self):
+        """
+        Returns the bill of materials of this tree. The same bill is returned
+        every time, so the bills of the unchanged assemblies are reused.
+
+        Returns:
+            BillOfMaterials: the bill of this tree
+        """
+
+        if self.bill is None: self.bill = BillOfMaterials(self)
+        return self.bill
+
+    def getTotals(self):
+        """
+        Returns the totals of the whole tree: total price, pieces, hardware and
+        assemblies, multiplied by the quantities.
+
+        Returns:
+            NodeTotals: the totals of the tree
+        """
+
+        return self.root.getTotals()
+
+# DEBUG
+
+    def checkCache(self):
+        """
+        Extends AbstractTree.checkCache() recalculating the subtree totals and
+        checking the indexes too.
+        """
+
+        if not super().checkCache(): return False
+
+        totals = {}
+        for node in self.iterPostorder():
+            nodeTotals = NodeTotals.ofNode(node)
+            for child in node.getChildren():
+                nodeTotals.add(totals[id(child)], child.getQuantity())
+
+            totals[id(node)] = nodeTotals
+            if node.getTotals() != nodeTotals: return False
+
+        nodes = self.getNodes()
+        for key, index in self.indexes.items():
+            if len(index) != len(nodes): return False
+            for node in nodes:
+                if not any(indexed is node for indexed in index.get(node.getFeature(key))): return False
 
-        return hardwareNodes
+        return True
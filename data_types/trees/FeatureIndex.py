@@ -0,0 +1,308 @@
+from bisect import bisect_left
+
+class FeatureIndex():
+    """
+    Class that indexes the nodes of a tree by the value of one of their features,
+    so the nodes with a given value are found in O(1). The tree keeps the index
+    updated on every insertion, removal and feature edit.
+
+    A unique index is expected to hold one node per value (like the IDs): the
+    lookups return the first node, and the values shared by more nodes can be
+    listed as duplicates. The nodes with a value that can't be hashed are kept
+    apart and searched linearly.
+
+    The values can also be searched by prefix, through a sorted list of their
+    sort keys. The list is built on the first prefix search, for the sort key of
+    the search, and kept updated from then on: the prefix range is found with a
+    binary search, so only the matching values are visited.
+    """
+
+    __slots__ = ('key', 'unique', 'entries', 'unhashable', 'sortKey', 'sortedKeys', 'sortedValues')
+
+# INIT
+
+    def __init__(self, key, unique = False):
+        """
+        Initializes an empty index.
+
+        Args:
+            key (str): the indexed feature
+            unique (bool): whether the values are expected to be unique. Defaults to False.
+        """
+
+        self.key = key
+        self.unique = unique
+        self.entries = {}
+        self.unhashable = {}
+        self.sortKey = None
+        self.sortedKeys = None
+        self.sortedValues = None
+
+# UPDATE
+
+    def add(self, node, value):
+        """
+        Adds a node to the index under the passed value.
+
+        Args:
+            node (ComponentNode): the node to add
+            value (PyObject): the value of the indexed feature
+        """
+
+        try:
+            bucket = self.entries.get(value)
+        except TypeError:
+            self.unhashable[id(node)] = node
+            return
+
+        if bucket is None:
+            bucket = self.entries[value] = {}
+            if self.sortedKeys is not None: self._addSorted(value)
+        bucket[id(node)] = node
+
+    def remove(self, node, value):
+        """
+        Removes a node from the index, from the bucket of the passed value.
+
+        Args:
+            node (ComponentNode): the node to remove
+            value (PyObject): the value of the indexed feature
+        """
+
+        try:
+            bucket = self.entries.get(value)
+        except TypeError:
+            self.unhashable.pop(id(node), None)
+            return
+
+        if bucket is None: return
+
+        bucket.pop(id(node), None)
+        if not bucket:
+            del self.entries[value]
+            if self.sortedKeys is not None: self._removeSorted(value)
+
+    def update(self, node, oldValue, newValue):
+        """
+        Moves a node from the bucket of the old value to the one of the new value.
+
+        Args:
+            node (ComponentNode): the edited node
+            oldValue (PyObject): the previous value of the feature
+            newValue (PyObject): the current value of the feature
+        """
+
+        self.remove(node, oldValue)
+        self.add(node, newValue)
+
+    def clear(self):
+        """
+        Removes every node from the index.
+        """
+
+        self.entries.clear()
+        self.unhashable.clear()
+        self.sortedKeys = self.sortedValues = None
+
+# SORTED VALUES
+
+    def _sortValues(self, sortKey):
+        """
+        Private function.
+        Builds the sorted list of the values by the passed sort key, unless it's
+        already built for the same key. The values without a sort key (None) are
+        left out.
+        """
+
+        if self.sortedKeys is not None and self.sortKey == sortKey: return
+
+        pairs = []
+        for value in self.entries:
+            key = sortKey(value)
+            if key is not None: pairs.append((key, value))
+        pairs.sort(key = lambda pair: pair[0])
+
+        self.sortKey = sortKey
+        self.sortedKeys = [key for key, _ in pairs]
+        self.sortedValues = [value for _, value in pairs]
+
+    def _addSorted(self, value):
+        """
+        Private function.
+        Inserts a new value in the sorted list, after the values with the same key.
+        """
+
+        key = self.sortKey(value)
+        if key is None: return
+
+        position = bisect_left(self.sortedKeys, key)
+        keys = self.sortedKeys
+        while position < len(keys) and keys[position] == key: position += 1
+
+        keys.insert(position, key)
+        self.sortedValues.insert(position, value)
+
+    def _removeSorted(self, value):
+        """
+        Private function.
+        Removes a value from the sorted list.
+        """
+
+        key = self.sortKey(value)
+        if key is None: return
+
+        keys = self.sortedKeys
+        values = self.sortedValues
+        position = bisect_left(keys, key)
+        while position < len(keys) and keys[position] == key:
+            if values[position] == value:
+                del keys[position]
+                del values[position]
+                return
+            position += 1
+
+    def _prefixRange(self, prefix, sortKey):
+        """
+        Private function.
+        Returns the bounds of the values whose sort key starts with the prefix,
+        in the sorted list.
+        """
+
+        self._sortValues(sortKey)
+        keys = self.sortedKeys
+
+        start = bisect_left(keys, prefix)
+        if not prefix: return start, len(keys)
+
+        # the first key after every key with the prefix
+        end = bisect_left(keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+
+        return start, end
+
+    def getPrefixed(self, prefix, sortKey):
+        """
+        Returns the nodes whose value has a sort key starting with the prefix.
+        The first search with a sort key sorts the values, the next ones are
+        binary searches.
+
+        Args:
+            prefix (str): the prefix of the sort keys
+            sortKey (function): returns the string sort key of a value, or None to leave the value out
+
+        Returns:
+            list[ComponentNode]: the nodes with a matching value
+        """
+
+        start, end = self._prefixRange(prefix, sortKey)
+        entries = self.entries
+
+        nodes = []
+        for value in self.sortedValues[start:end]:
+            nodes.extend(entries[value].values())
+
+        return nodes
+
+    def countPrefixed(self, prefix, sortKey):
+        """
+        Returns the number of values whose sort key starts with the prefix, the
+        number of nodes when the values are unique.
+
+        Args:
+            prefix (str): the prefix of the sort keys
+            sortKey (function): returns the string sort key of a value, or None to leave the value out
+
+        Returns:
+            int: the number of matching values
+        """
+
+        start, end = self._prefixRange(prefix, sortKey)
+        return end - start
+
+# GETTERS
+
+    def get(self, value):
+        """
+        Returns the nodes with the passed value, in insertion order.
+
+        Args:
+            value (PyObject): the value to search
+
+        Returns:
+            list[ComponentNode]: the nodes with the value
+        """
+
+        try:
+            bucket = self.entries.get(value)
+        except TypeError:
+            return [node for node in self.unhashable.values() if node.getFeature(self.key) == value]
+
+        if bucket is None: return []
+        return list(bucket.values())
+
+    def first(self, value):
+        """
+        Returns the first node inserted with the passed value.
+
+        Args:
+            value (PyObject): the value to search
+
+        Returns:
+            ComponentNode: the first node with the value
+            None: no node has the value
+        """
+
+        try:
+            bucket = self.entries.get(value)
+        except TypeError:
+            bucket = None
+
+        if bucket: return next(iter(bucket.values()))
+
+        nodes = self.get(value)
+        if nodes: return nodes[0]
+
+    def count(self, value):
+        """
+        Returns the number of nodes with the passed value.
+
+        Args:
+            value (PyObject): the value to count
+
+        Returns:
+            int: the number of nodes with the value
+        """
+
+        try:
+            bucket = self.entries.get(value)
+        except TypeError:
+            return len(self.get(value))
+
+        return len(bucket) if bucket else 0
+
+    def getValues(self):
+        """
+        Returns the distinct hashable values of the indexed feature.
+
+        Returns:
+            list[PyObject]: the indexed values
+        """
+
+        return list(self.entries)
+
+    def getDuplicates(self):
+        """
+        Returns the values shared by more than one node.
+
+        Returns:
+            list[PyObject]: the duplicated values
+        """
+
+        return [value for value, bucket in self.entries.items() if len(bucket) > 1]
+
+# DUNDERS
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.entries.values()) + len(self.unhashable)
+
+    def __contains__(self, value):
+        return self.count(value) > 0
@@ -0,0 +1,243 @@
+from ..nodes.NODESutil import SPECIAL_PREFIXES, VALUES, incrementID, packID, toBase36, unpackID
+
+class IDFamily():
+    """
+    Class that stores the values already used by a family of numbers, for example
+    the suffixes of the parts under the same prefix, and the lowest value
+    still free.
+    """
+
+    __slots__ = ('values', 'gap')
+
+    def __init__(self):
+        self.values = {}
+        self.gap = 1
+
+    def add(self, value):
+        """
+        Marks a value as used and moves the gap forward if it was filled.
+
+        Args:
+            value (int): the used value
+        """
+
+        self.values[value] = self.values.get(value, 0) + 1
+
+        while self.gap in self.values:
+            self.gap += 1
+
+    def remove(self, value):
+        """
+        Marks one use of a value as free and moves the gap back if needed.
+
+        Args:
+            value (int): the freed value
+        """
+
+        count = self.values.get(value, 0)
+        if count > 1:
+            self.values[value] = count - 1
+        elif count == 1:
+            del self.values[value]
+            if value < self.gap: self.gap = value
+
+    def lowestFree(self, start):
+        """
+        Returns the lowest value not used, greater or equal than the start.
+
+        Args:
+            start (int): the lowest acceptable value
+
+        Returns:
+            int: the lowest free value
+        """
+
+        if start <= 1: return self.gap
+
+        value = start
+        while value in self.values:
+            value += 1
+
+        return value
+
+class IDAllocator():
+    """
+    Class that calculates the next available number for a prefix and a level.
+    The used numbers are grouped in families: one for every prefix at the part
+    level (the suffix changes), and one for every prefix digit at the assembly
+    levels (the digit of the level changes). Every family keeps its lowest gap,
+    so a new number is returned without searching the tree.
+    """
+
+# INIT
+
+    def __init__(self):
+        self.used = {}
+        self.families = {}
+
+# UPDATE
+
+    def add(self, numberID):
+        """
+        Marks a number as used.
+
+        Args:
+            numberID (str): the used number
+        """
+
+        if not numberID: return
+
+        self.used[numberID] = self.used.get(numberID, 0) + 1
+
+        for key, value in self._families(numberID):
+            family = self.families.get(key)
+            if family is None:
+                family = self.families[key] = IDFamily()
+            family.add(value)
+
+    def remove(self, numberID):
+        """
+        Marks one use of a number as free.
+
+        Args:
+            numberID (str): the freed number
+        """
+
+        count = self.used.get(numberID, 0)
+        if not count: return
+
+        if count > 1:
+            self.used[numberID] = count - 1
+        else:
+            del self.used[numberID]
+
+        for key, value in self._families(numberID):
+            self.families[key].remove(value)
+
+# GETTERS
+
+    def newNumber(self, prefix, level):
+        """
+        Returns the next available number for the specified prefix and level.
+        Gives the same result of probing incrementID() with increasing quantities,
+        starting from 1, until a number not used is found.
+
+        Args:
+            prefix (str): the prefix of the parent of the new item
+            level (int): the level of the new item
+
+        Returns:
+            str: the next available number
+        """
+
+        if not self._isStandard(prefix): return self._probe(prefix, level)
+
+        if prefix in SPECIAL_PREFIXES or level > 4:
+            family = self.families.get((prefix, 5))
+            quantity = family.gap if family else 1
+            if quantity >= 36 ** 3: return self._probe(prefix, level)
+            return packID(prefix, toBase36(quantity).zfill(3))
+
+        if level < 2: return self._probe(prefix, level)
+
+        position = level - 2
+        digit = VALUES.index(prefix[position])
+        family = self.families.get(self._wildcard(prefix, position, level))
+        value = family.lowestFree(digit + 1) if family else digit + 1
+
+        number = incrementID(prefix, '000', level, value - digit)
+        if value >= 36 or number in self.used: return self._probe(prefix, level)
+        return number
+
+    def isUsed(self, numberID):
+        """
+        Returns whether a number is already used.
+
+        Args:
+            numberID (str): the number to check
+
+        Returns:
+            bool: the number is used
+        """
+
+        return numberID in self.used
+
+# UTILITY
+
+    def _probe(self, prefix, level):
+        """
+        Private function.
+        Returns the next available number trying every quantity in order. Used for
+        the numbers that don't follow the standard format.
+
+        Args:
+            prefix (str): the prefix of the parent of the new item
+            level (int): the level of the new item
+
+        Returns:
+            str: the next available number
+        """
+
+        quantity = 1
+        number = incrementID(prefix, '000', level, quantity)
+
+        while number in self.used:
+            quantity += 1
+            number = incrementID(prefix, '000', level, quantity)
+
+        return number
+
+    def _families(self, numberID):
+        """
+        Private function.
+        Returns the families a number belongs to, with the value it has in each one.
+
+        Args:
+            numberID (str): the number
+
+        Returns:
+            list[tuple[tuple, int]]: the family keys and the values
+        """
+
+        # the IDs that are not strings, like numbers read from a file, belong to no family
+        if not isinstance(numberID, str): return []
+
+        unpacked = unpackID(numberID)
+        if not unpacked or len(unpacked) != 6 or not unpacked.isascii(): return []
+
+        prefix = unpacked[:3]
+        suffix = unpacked[3:]
+        families = []
+
+        value = int(suffix, 36)
+        if value: families.append(((prefix, 5), value))
+
+        if suffix == '000' and prefix not in SPECIAL_PREFIXES:
+            for level in (2, 3, 4):
+                position = level - 2
+                value = VALUES.index(prefix[position])
+                if value: families.append((self._wildcard(prefix, position, level), value))
+
+        return families
+
+    @staticmethod
+    def _wildcard(prefix, position, level):
+        """
+        Private function.
+        Returns the key of the family of a prefix, the digit that changes at the
+        level is replaced by a wildcard.
+        """
+
+        return (prefix[:position] + '*' + prefix[position + 1:], level)
+
+    @staticmethod
+    def _isStandard(prefix):
+        """
+        Private function.
+        Returns whether the prefix is made of 3 uppercase base 36 digits.
+        """
+
+        return (
+            isinstance(prefix, str) and len(prefix) == 3
+            and prefix.isascii() and prefix.isalnum() and prefix == prefix.upper()
+        )
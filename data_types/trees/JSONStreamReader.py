@@ -0,0 +1,459 @@
+import os
+import re
+from json.decoder import JSONDecoder, scanstring
+
+from .TREEutil import strToClass, extractNode
+
+# next token: structural character, string start, number or literal
+TOKEN = re.compile(r'[ \t\n\r]*(?:([{}\[\]:,])|(")|(-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?)|(true|false|null))')
+LITERALS = {'true': True, 'false': False, 'null': None}
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+NUMBER_CHARACTERS = frozenset('0123456789.eE+-')
+DECODER = JSONDecoder()
+
+class JSONStreamError(ValueError):
+    """
+    Error raised when a json stream is malformed or truncated.
+    """
+
+    def __init__(self, message, position):
+        super().__init__(f'{message} at position {position}')
+        self.position = position
+
+class JSONStreamReader():
+    """
+    Class that builds a tree of nodes straight from a json text stream, without
+    loading the whole document. The text is read in chunks: every node that fits
+    in the buffer is decoded at once by the json module and built, while the
+    nodes that span more chunks are read token by token, so the extra memory is
+    bounded by the chunk size and the features of the nodes still open.
+
+    The children of a node are inserted together when their list ends. A progress
+    function can be passed to follow the reading. A truncated stream raises a
+    JSONStreamError, unless the reader recovers: then the nodes read so far are
+    returned, with their open ancestors closed, and the reader is marked as truncated.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+# INIT
+
+    def __init__(self, file, progress = None, recover = False, chunkSize = None):
+        """
+        Initializes the reader.
+
+        Args:
+            file (TextIO): the text stream to read
+            progress (callable): called after every chunk with the characters read and the total size, if known. Defaults to None.
+            recover (bool): whether to return the partial tree of a truncated stream. Defaults to False.
+            chunkSize (int): the number of characters read at a time. Defaults to CHUNK_SIZE.
+        """
+
+        self.file = file
+        self.progress = progress
+        self.recover = recover
+        self.chunkSize = chunkSize or self.CHUNK_SIZE
+        self.truncated = False
+
+        self._buffer = ''
+        self._position = 0
+        self._start = 0
+        self._consumed = 0
+        self._eof = False
+        self._total = self._size(file)
+
+    @classmethod
+    def readFile(cls, filename, progress = None, recover = False):
+        """
+        Reads a json file and returns the root of the tree.
+
+        Args:
+            filename (str): the name or path of the file
+            progress (callable): the progress function. Defaults to None.
+            recover (bool): whether to return the partial tree of a truncated file. Defaults to False.
+
+        Returns:
+            AbstractNode: the root of the tree
+        """
+
+        with open(filename, 'r') as file:
+            return cls(file, progress, recover).read()
+
+# READING
+
+    def read(self):
+        """
+        Reads the stream and returns the root of the tree.
+
+        Returns:
+            AbstractNode: the root of the tree
+            None: the stream is empty, or truncated before the first node
+        """
+
+        # frames of the nodes and children lists still open
+        stack = []
+        root = None
+        tokens = self._tokens()
+
+        try:
+            for kind, value in tokens:
+                frame = stack[-1] if stack else None
+
+                if frame is None:
+                    if root is not None: raise self._error('unexpected data after the root')
+                    if kind != '{': raise self._error('the root must be an object')
+                    root = self._decodeNode(0)
+                    if root is None: stack.append(self._newFrame(0))
+
+                elif frame.kind == 'node':
+                    if kind == '}':
+                        if frame.state == 'key': raise self._error('expected a key')
+                        if frame.state != 'start' and frame.state != 'comma': raise self._error('missing value')
+                        stack.pop()
+                        node = frame.close()
+                        if node is None: raise self._error('node without class')
+                        if stack: stack[-1].add(node)
+                        else: root = node
+                    elif frame.state == 'start' or frame.state == 'key':
+                        if kind != 'string': raise self._error('expected a key')
+                        frame.key = value
+                        frame.state = 'colon'
+                    elif frame.state == 'colon':
+                        if kind != ':': raise self._error('expected a colon')
+                        frame.state = 'value'
+                    elif frame.state == 'comma':
+                        if kind != ',': raise self._error('expected a comma')
+                        frame.state = 'key'
+                    elif kind == '[' and frame.key == 'children':
+                        if frame.open() is None: raise self._error('node without class')
+                        frame.state = 'comma'
+                        stack.append(_ChildrenFrame(frame))
+                    elif kind == '[' or kind == '{':
+                        frame.set(self._decodeValue())
+                        frame.state = 'comma'
+                    elif kind == 'value' or kind == 'string':
+                        frame.set(value)
+                        frame.state = 'comma'
+                    else:
+                        raise self._error('expected a value')
+
+                else:
+                    if kind == ']':
+                        if frame.state == 'node': raise self._error('expected a node')
+                        stack.pop()
+                        frame.close()
+                    elif kind == ',':
+                        if frame.state != 'comma': raise self._error('expected a node')
+                        frame.state = 'node'
+                    elif kind == '{':
+                        if frame.state == 'comma': raise self._error('expected a comma')
+
+                        # the stack alternates node and children frames
+                        depth = len(stack) // 2
+                        node = self._decodeNode(depth)
+                        if node is None: stack.append(self._newFrame(depth))
+                        else: frame.add(node)
+                    else:
+                        raise self._error('expected a node')
+
+            if stack: raise _Truncated()
+
+        except _Truncated:
+            if not self.recover: raise self._error('truncated stream')
+
+            # the nodes cut before their class are dropped
+            self.truncated = True
+            while stack:
+                frame = stack.pop()
+                if frame.kind == 'node':
+                    node = frame.close()
+                    if node is None: continue
+                    if stack: stack[-1].add(node)
+                    else: root = node
+                else:
+                    frame.close()
+
+        return root
+
+    def _decodeNode(self, depth):
+        """
+        Private function.
+        Decodes and builds the node that starts at the last token, if the whole
+        node fits in a chunk. The buffer is filled once if the node is cut by its end.
+
+        Args:
+            depth (int): the depth of the node in the document
+
+        Returns:
+            AbstractNode: the node, with all its descendants
+            None: the node is longer than a chunk, it must be read token by token
+        """
+
+        # the errors are found and located by the token by token reading
+        while True:
+            try:
+                data, end = DECODER.raw_decode(self._buffer, self._start)
+                break
+            except ValueError:
+                if self._eof or len(self._buffer) - self._start >= self.chunkSize:
+                    self._position = self._start + 1
+                    return None
+
+                self._position = self._start
+                self._fill()
+
+        self._position = end
+        try:
+            return self._extractNode(data, depth)
+        except (KeyError, TypeError, AttributeError):
+            self._position = self._start + 1
+            return None
+
+    def _extractNode(self, data, depth):
+        """
+        Private function.
+        Builds the node of a decoded json object, with its descendants.
+        Subclasses that build the nodes differently extend this function.
+
+        Args:
+            data (dict[str, PyObject]): the json object of the node
+            depth (int): the depth of the node in the document
+
+        Returns:
+            AbstractNode: the node
+        """
+
+        return extractNode(data)
+
+    def _newFrame(self, depth):
+        """
+        Private function.
+        Returns the frame of a node read token by token. Subclasses that build
+        the nodes differently extend this function.
+
+        Args:
+            depth (int): the depth of the node in the document
+
+        Returns:
+            _NodeFrame: the frame of the node
+        """
+
+        return _NodeFrame()
+
+    def _decodeValue(self):
+        """
+        Private function.
+        Decodes the list or object feature that starts at the last token, reading
+        more chunks until it ends.
+
+        Returns:
+            list | dict: the value of the feature
+        """
+
+        # the buffer is kept from the start of the value while filling it
+        self._position = self._start
+        while True:
+            buffer = self._buffer
+            try:
+                value, end = DECODER.raw_decode(buffer, self._position)
+            except ValueError as error:
+                if not self._eof:
+                    self._fill()
+                    continue
+                if error.pos >= len(buffer.rstrip()) or error.msg.startswith('Unterminated'): raise _Truncated()
+                raise self._error(error.msg, error.pos)
+
+            self._position = end
+            return value
+
+# TOKENIZER
+
+    def _tokens(self):
+        """
+        Private function.
+        Yields the tokens of the stream as (kind, value) pairs. The kind is the
+        structural character, 'string' or 'value'. The start of the last token is
+        kept, so that the reader can decode a whole value from there.
+
+        Yields:
+            tuple[str, PyObject]: the next token
+        """
+
+        match = TOKEN.match
+
+        while True:
+            buffer = self._buffer
+            position = self._position
+            found = match(buffer, position)
+
+            # tokens at the end of the buffer can continue in the next chunk
+            if found is None or (not self._eof and found.group(3) and self._isCut(found.end())):
+                if not self._eof:
+                    self._fill()
+                    continue
+
+                end = WHITESPACE.match(buffer, position).end()
+                if end == len(buffer): return
+
+                # a literal cut by the end of the stream
+                if any(literal.startswith(buffer[end:]) for literal in LITERALS): raise _Truncated()
+                self._position = end
+                raise self._error('unexpected character')
+
+            structural, quote, number, literal = found.groups()
+
+            if structural:
+                self._start = found.start(1)
+                self._position = found.end()
+                yield structural, None
+
+            elif quote:
+                try:
+                    string, end = scanstring(buffer, found.end())
+                except ValueError:
+                    if self._eof: raise _Truncated()
+                    self._fill()
+                    continue
+                self._position = end
+                yield 'string', string
+
+            elif number:
+                self._position = found.end()
+                if '.' in number or 'e' in number or 'E' in number:
+                    yield 'value', float(number)
+                else:
+                    yield 'value', int(number)
+
+            else:
+                self._position = found.end()
+                yield 'value', LITERALS[literal]
+
+    def _isCut(self, end):
+        """
+        Private function.
+        Returns whether a number ending at the passed position may continue after
+        the end of the buffer.
+        """
+
+        buffer = self._buffer
+        if end >= len(buffer): return True
+
+        # a number followed by a number character is still incomplete
+        return buffer[end] in NUMBER_CHARACTERS
+
+    def _fill(self):
+        """
+        Private function.
+        Reads the next chunk, keeping the part of the buffer not consumed yet.
+        """
+
+        chunk = self.file.read(self.chunkSize)
+        if not chunk:
+            self._eof = True
+            return
+
+        position = self._position
+        self._consumed += position
+        self._buffer = self._buffer[position:] + chunk
+        self._position = 0
+        self._start -= position
+
+        if self.progress is not None:
+            self.progress(self._consumed + len(self._buffer), self._total)
+
+    def _error(self, message, position = None):
+        """
+        Private function.
+        Returns the error for the passed position of the buffer, the current one by default.
+        """
+
+        if position is None: position = self._position
+        return JSONStreamError(message, self._consumed + position)
+
+    @staticmethod
+    def _size(file):
+        """
+        Private function.
+        Returns the size of the file, None if it isn't known.
+        """
+
+        try:
+            return os.fstat(file.fileno()).st_size
+        except (AttributeError, OSError, ValueError):
+            return None
+
+# --- FRAMES ---
+
+class _Truncated(Exception):
+    """
+    Private class.
+    Raised when the stream ends before the document is complete.
+    """
+
+class _NodeFrame():
+    """
+    Private class.
+    An open node object. The features are collected until the children list
+    starts or the object ends, then the node is created. The state is the
+    expected token: the first key or the end ('start'), a key after a comma
+    ('key'), 'colon', 'value', or a comma or the end ('comma').
+    """
+
+    __slots__ = ('features', 'node', 'key', 'state')
+
+    kind = 'node'
+
+    def __init__(self):
+        self.features = {}
+        self.node = None
+        self.key = None
+        self.state = 'start'
+
+    def set(self, value):
+        key = self.key
+        self.key = None
+        if key == 'children': return
+
+        if self.node is None: self.features[key] = value
+        elif key != 'class': self.node.addFeature(key, value)
+
+    def open(self):
+        self.key = None
+        return self.close()
+
+    def addChildren(self, children):
+        self.node.addChildren(children)
+
+    def close(self):
+        if self.node is None and 'class' in self.features:
+            features = self.features
+            classname = features.pop('class')
+            self.node = strToClass(classname).fromFeatures(features)
+            self.features = None
+
+        return self.node
+
+class _ChildrenFrame():
+    """
+    Private class.
+    An open children list. The nodes are inserted in the parent together when
+    the list ends. The state is the expected token: the first node or the end
+    ('start'), a node after a comma ('node'), or a comma or the end ('comma').
+    """
+
+    __slots__ = ('parent', 'children', 'state')
+
+    kind = 'children'
+
+    def __init__(self, parent):
+        self.parent = parent
+        self.children = []
+        self.state = 'start'
+
+    def add(self, node):
+        self.children.append(node)
+        self.state = 'comma'
+
+    def close(self):
+        if self.children: self.parent.addChildren(self.children)
+        self.children = []
@@ -0,0 +1,266 @@
+import json
+from json.encoder import encode_basestring_ascii
+
+from .TREEutil import nodeData
+
+def _encodeFloat(value):
+    """
+    Private function.
+    Encodes a float like the json module does.
+    """
+
+    if value != value: return 'NaN'
+    if value == float('inf'): return 'Infinity'
+    if value == float('-inf'): return '-Infinity'
+    return float.__repr__(value)
+
+# encoders of the plain feature values, by exact type
+SCALAR_ENCODERS = {
+    str: encode_basestring_ascii,
+    int: int.__repr__,
+    float: _encodeFloat,
+    bool: lambda value: 'true' if value else 'false',
+    type(None): lambda value: 'null',
+}
+
+class JSONStreamWriter():
+    """
+    Class that writes a tree of nodes to a json text stream, visiting the nodes
+    one at a time instead of building the nested dictionaries of the whole tree.
+    The text is collected in small parts and written in chunks, so the extra
+    memory doesn't depend on the size of the tree.
+
+    The indented output is the same, byte by byte, of json.dump() with the same
+    indentation on AbstractTree.toDict(). Without indentation the output is
+    compact, with no spaces at all.
+
+    With the cache on, the text of the subtrees is kept in their nodes until they
+    change, so writing a tree again costs as much as encoding the edited nodes
+    and their ancestors: the rest of the text is copied as is. Only the largest
+    subtrees that fit in the cache keep their text; the nodes inside them are
+    marked as covered, so the cache never holds the same text twice and its
+    memory stays below the size of the document.
+    """
+
+    # number of text parts collected before writing them
+    FLUSH_PARTS = 4096
+
+    # longest text of a subtree kept in the cache of its node
+    CACHE_LIMIT = 1 << 16
+
+    # fragment of the nodes whose text is in the fragment of an ancestor
+    COVERED = ()
+
+# INIT
+
+    def __init__(self, file, indent = 4, cache = False):
+        """
+        Initializes the writer.
+
+        Args:
+            file (TextIO): the text stream to write
+            indent (int): the number of spaces of every indentation level, None for the compact output. Defaults to 4.
+            cache (bool): whether to reuse and store the text of the subtrees in their nodes. Defaults to False.
+        """
+
+        self.file = file
+        self.indent = indent
+        self.cache = cache
+
+        self._keySeparator = ':' if indent is None else ': '
+
+        self._parts = []
+        self._open = []
+        self._nextFlush = self.FLUSH_PARTS
+
+    @classmethod
+    def writeFile(cls, filename, root, indent = 4, cache = False):
+        """
+        Writes a tree to a json file.
+
+        Args:
+            filename (str): the name or path of the file
+            root (AbstractNode): the root of the tree
+            indent (int): the indentation, None for the compact output. Defaults to 4.
+            cache (bool): whether to use the text cached in the nodes. Defaults to False.
+        """
+
+        with open(filename, 'w') as file:
+            cls(file, indent, cache).write(root)
+
+# WRITING
+
+    def write(self, root):
+        """
+        Writes the tree with the passed root.
+
+        With the cache, the text of every subtree shorter than CACHE_LIMIT is
+        stored in its root node as (indent, level, text), and the subtrees not
+        changed since are copied from there instead of being encoded again. A
+        cached text written at another level is indented again. When the text
+        of a node is stored, the children give theirs up and are marked as
+        COVERED: an edit inside the subtree still drops the text of the node.
+
+        Args:
+            root (AbstractNode): the root of the tree, None writes null
+        """
+
+        if root is None:
+            self.file.write('null')
+            return
+
+        parts = self._parts
+        append = parts.append
+        indent = self.indent
+        cache = self.cache
+        openNodes = self._open
+
+        # every entry is a node to open, a separator, or the closing text of a node
+        stack = [(root, 0)]
+        while stack:
+            node, level = stack.pop()
+
+            if node.__class__ is str:
+                append(node)
+                if cache and level is not None: self._closeNode(level)
+                continue
+
+            if cache:
+                text = self._cachedText(node, level)
+                if text is not None:
+                    append(text)
+                    continue
+
+            start = len(parts)
+            self._writeFeatures(node, level)
+
+            children = node.getChildren()
+            if indent is None:
+                if not children:
+                    append('"children":[]}')
+                else:
+                    append('"children":[')
+                    stack.append((']}', node))
+                    for position in range(len(children) - 1, -1, -1):
+                        stack.append((children[position], level + 2))
+                        if position: stack.append((',', None))
+            else:
+                inner = '\n' + ' ' * (indent * (level + 1))
+                if not children:
+                    append(inner + '"children": []\n' + ' ' * (indent * level) + '}')
+                else:
+                    child = '\n' + ' ' * (indent * (level + 2))
+                    append(inner + '"children": [' + child)
+                    stack.append((inner + ']\n' + ' ' * (indent * level) + '}', node))
+                    for position in range(len(children) - 1, -1, -1):
+                        stack.append((children[position], level + 2))
+                        if position: stack.append((',' + child, None))
+
+            if cache:
+                openNodes.append((node, level, start))
+                if not children: self._closeNode(node)
+
+            if len(parts) >= self._nextFlush: self._flush()
+
+        self._flush()
+
+    def _cachedText(self, node, level):
+        """
+        Private function.
+        Returns the cached text of a node for the indentation of this writer and
+        the passed level, None if the node must be encoded.
+        """
+
+        # the covered nodes are encoded again, with the rest of the subtree
+        fragment = node.getFragment()
+        if not fragment or fragment[0] != self.indent: return None
+
+        _, cachedLevel, text = fragment
+        if cachedLevel == level or self.indent is None: return text
+
+        # every line of the text is indented at least as much as its first one
+        shift = self.indent * (level - cachedLevel)
+        if shift > 0: text = text.replace('\n', '\n' + ' ' * shift)
+        else: text = text.replace('\n' + ' ' * -shift, '\n')
+
+        node.setFragment((self.indent, level, text))
+        return text
+
+    def _closeNode(self, node):
+        """
+        Private function.
+        Joins the parts of a node just closed and caches its text, unless the
+        node was dropped as too long. The text of the children is dropped, it's
+        part of the text of the node.
+        """
+
+        openNodes = self._open
+        if not openNodes or openNodes[-1][0] is not node: return
+
+        _, level, start = openNodes.pop()
+        parts = self._parts
+        text = ''.join(parts[start:])
+        parts[start:] = [text]
+
+        if len(text) <= self.CACHE_LIMIT:
+            node.setFragment((self.indent, level, text))
+            for child in node.getChildren():
+                child.setFragment(self.COVERED)
+
+    def _writeFeatures(self, node, level):
+        """
+        Private function.
+        Writes the opening of a node and its features, up to the children key.
+        The features are ordered like in AbstractTree.toDict().
+        """
+
+        data = nodeData(node)
+        data.pop('children', None)
+
+        append = self._parts.append
+        encoders = SCALAR_ENCODERS
+        keySeparator = self._keySeparator
+
+        if self.indent is None:
+            append('{')
+            for key, value in data.items():
+                encoder = encoders.get(value.__class__)
+                encoded = encoder(value) if encoder else json.dumps(value, separators = (',', ':'))
+                append(encode_basestring_ascii(key) + keySeparator + encoded + ',')
+            return
+
+        inner = ',\n' + ' ' * (self.indent * (level + 1))
+        append('{' + inner[1:])
+        first = True
+        for key, value in data.items():
+            encoder = encoders.get(value.__class__)
+            if encoder:
+                encoded = encoder(value)
+            else:
+                encoded = json.dumps(value, indent = self.indent).replace('\n', inner[1:])
+
+            if first: first = False
+            else: append(inner)
+            append(encode_basestring_ascii(key) + keySeparator + encoded)
+        append(',')
+
+    def _flush(self):
+        """
+        Private function.
+        Writes the collected parts to the stream. The parts of the nodes still
+        open are kept until they are cached, unless their text is already too
+        long for the cache.
+        """
+
+        parts = self._parts
+        openNodes = self._open
+        while openNodes and sum(map(len, parts[openNodes[0][2]:])) > self.CACHE_LIMIT:
+            del openNodes[0]
+
+        end = openNodes[0][2] if openNodes else len(parts)
+        if end:
+            self.file.write(''.join(parts[:end]))
+            del parts[:end]
+            openNodes[:] = [(node, level, start - end) for node, level, start in openNodes]
+
+        self._nextFlush = len(parts) + self.FLUSH_PARTS
@@ -0,0 +1,365 @@
+import io
+import json
+
+from .JSONStreamReader import JSONStreamReader, _NodeFrame
+from .TREEutil import extractNode, strToClass
+from ..nodes.ComponentNode import ComponentNode
+from ..nodes.NodeTotals import NodeTotals, toNumber
+
+class LazyLoader(JSONStreamReader):
+    """
+    Class that builds a tree from a json file one level at a time. The file is
+    read once by the stream reader, building only the nodes up to a depth: the
+    children of the deepest built nodes stay pending, as the byte range of the
+    node in the file, until they are fetched (see AbstractNode.fetchChildren()).
+    A fetch reads the range again, building one more level.
+
+    The nodes below the built ones are decoded one at a time and dropped after
+    their totals are added to the totals of their ancestors, so the totals of
+    the component nodes are already correct before any fetch, and the memory
+    doesn't depend on the size of the pending subtrees.
+
+    The progress function, the recovery of truncated files and the errors are
+    the ones of the stream reader. The children of a node cut by the end of a
+    recovered file are read, when fetched, up to the end of the file. The file
+    must not change while some children are pending: the trees fetch them all
+    before saving.
+    """
+
+    # the depth of the deepest nodes built by readFile(): the root and its children
+    DEPTH = 1
+
+# INIT
+
+    def __init__(self, file, filename, depth = DEPTH, offset = 0, progress = None, recover = False):
+        """
+        Initializes the loader.
+
+        Args:
+            file (TextIO): the text stream to read, opened with newline=''
+            filename (str): the name or path of the file, read again by the fetches
+            depth (int): the depth of the deepest nodes built. Defaults to DEPTH.
+            offset (int): the position in the file, in bytes, of the start of the stream. Defaults to 0.
+            progress (callable): the progress function (see JSONStreamReader). Defaults to None.
+            recover (bool): whether to return the partial tree of a truncated file. Defaults to False.
+        """
+
+        super().__init__(file, progress, recover)
+
+        self.filename = filename
+        self.depth = depth
+        self.encoding = getattr(file, 'encoding', None) or 'utf-8'
+        self._classFeatures = {}
+
+        # a position of the buffer and its position in the file, in bytes
+        self._markPosition = 0
+        self._markOffset = offset
+
+    @classmethod
+    def readFile(cls, filename, progress = None, recover = False):
+        """
+        Reads a json file and returns the root of the tree, with its children
+        built and the rest of the nodes pending.
+
+        Args:
+            filename (str): the name or path of the file
+            progress (callable): the progress function. Defaults to None.
+            recover (bool): whether to return the partial tree of a truncated file. Defaults to False.
+
+        Returns:
+            AbstractNode: the root of the tree
+        """
+
+        with open(filename, 'r', newline = '') as file:
+            return cls(file, filename, progress = progress, recover = recover).read()
+
+# BUILDING
+
+    def _decodeNode(self, depth):
+        """
+        Private function.
+        Extends JSONStreamReader._decodeNode(). The nodes above the deepest built
+        ones are read token by token, so their descendants are never decoded together.
+        """
+
+        if depth < self.depth:
+            self._position = self._start + 1
+            return None
+
+        return super()._decodeNode(depth)
+
+    def _extractNode(self, data, depth):
+        """
+        Private function.
+        Extends JSONStreamReader._extractNode(). A node at the deepest built level
+        is built with its children pending, a deeper node is summarized.
+        """
+
+        if depth > self.depth: return self._summarize(data)
+
+        features = dict(data)
+        classname = features.pop('class')
+        childrenData = features.pop('children', None)
+
+        node = strToClass(classname).fromFeatures(features)
+        if childrenData:
+            start = self._offset(self._start)
+            pending = LazyChildren(self, start, self._offset(self._position), len(childrenData))
+            self._setPending(node, pending, self._summarize(data).totals)
+
+        return node
+
+    def _newFrame(self, depth):
+        """
+        Private function.
+        Extends JSONStreamReader._newFrame() with the frames of the nodes at the
+        deepest built level and below.
+        """
+
+        if depth < self.depth: return super()._newFrame(depth)
+        if depth == self.depth: return _PendingFrame(self, self._offset(self._start))
+        return _SummaryFrame(self)
+
+    @staticmethod
+    def _setPending(node, pending, totals):
+        """
+        Private function.
+        Sets the pending children of a node, with the totals of its subtree if
+        the node is a component node.
+        """
+
+        if totals is None: node.setPendingChildren(pending)
+        else: node.setPendingChildren(pending, totals)
+
+# TOTALS
+
+    def _summarize(self, data):
+        """
+        Private function.
+        Returns the summary of a decoded json object: the totals of its subtree
+        and its quantity. The totals are calculated from the deepest objects,
+        like ComponentNode does with the built nodes, with an explicit stack.
+        """
+
+        summaries = {}
+        stack = [(data, False)]
+        while stack:
+            current, visited = stack.pop()
+            children = current.get('children')
+
+            if not visited and children:
+                stack.append((current, True))
+                stack.extend((child, False) for child in children)
+                continue
+
+            summary = _Summary(self._features(current))
+            for child in children or ():
+                summary.addChild(summaries.pop(id(child)))
+            summaries[id(current)] = summary
+
+        return summaries[id(data)]
+
+    def _features(self, data):
+        """
+        Private function.
+        Returns the type, the price and the quantity the node of a json object
+        will have, from the fixed features of the class, the object and the
+        schema defaults. Returns None if the node is not a component node.
+        """
+
+        classname = data['class']
+        features = self._classFeatures.get(classname)
+        if features is None:
+            nodeClass = strToClass(classname)
+            if not issubclass(nodeClass, ComponentNode):
+                features = self._classFeatures[classname] = False
+            else:
+                features = self._classFeatures[classname] = nodeClass.SCHEMA.defaults, nodeClass.FIXED
+
+        if not features: return None
+
+        defaults, fixed = features
+        values = [
+            fixed[key] if key in fixed else data.get(key, defaults.get(key))
+            for key in ('type', 'price', 'quantity')
+        ]
+
+        return values[0], toNumber(values[1], 0), toNumber(values[2], 1)
+
+# BYTE OFFSETS
+
+    def _offset(self, position):
+        """
+        Private function.
+        Returns the position in the file, in bytes, of a position of the buffer.
+        The positions are asked in order, so only the text after the last one
+        asked is encoded.
+        """
+
+        if position > self._markPosition:
+            text = self._buffer[self._markPosition:position]
+            self._markOffset += len(text) if text.isascii() else len(text.encode(self.encoding))
+            self._markPosition = position
+
+        return self._markOffset
+
+    def _endOffset(self):
+        """
+        Private function.
+        Returns the position in the file, in bytes, of the end of the last token,
+        None if the file is truncated.
+        """
+
+        if self.truncated: return None
+        return self._offset(self._position)
+
+    def _fill(self):
+        """
+        Private function.
+        Extends JSONStreamReader._fill() moving the mark of the byte offsets
+        before the read part of the buffer is dropped.
+        """
+
+        dropped = self._position
+        self._offset(dropped)
+        super()._fill()
+        self._markPosition -= dropped - self._position
+
+class LazyChildren():
+    """
+    Class that describes the pending children of a node: the byte range of the
+    node in the json file and the number of children. The children are built by
+    reading the range with a loader, with their own children pending, unless the
+    range fits in a chunk: then the whole subtree is built.
+    """
+
+    __slots__ = ('filename', 'encoding', 'recover', 'start', 'end', 'count')
+
+    def __init__(self, loader, start, end, count):
+        self.filename = loader.filename
+        self.encoding = loader.encoding
+        self.recover = loader.recover
+        self.start = start
+        self.end = end
+        self.count = count
+
+    def build(self):
+        """
+        Builds the children nodes.
+
+        Returns:
+            list[AbstractNode]: the children
+        """
+
+        with open(self.filename, 'rb') as file:
+            file.seek(self.start)
+            data = file.read() if self.end is None else file.read(self.end - self.start)
+
+        # a subtree that fits in a chunk is built at once
+        text = data.decode(self.encoding)
+        if self.end is not None and len(data) <= JSONStreamReader.CHUNK_SIZE:
+            return [extractNode(childData) for childData in json.loads(text)['children']]
+
+        loader = LazyLoader(io.StringIO(text, newline = ''), self.filename, 1, self.start, recover = self.recover)
+        loader.encoding = self.encoding
+        node = loader.read()
+
+        children = list(node.getChildren())
+        node.removeChildren(children)
+
+        return children
+
+    def __len__(self):
+        return self.count
+
+# --- FRAMES ---
+
+class _Summary():
+    """
+    Private class.
+    The totals of a subtree that is not built and the quantity of its root.
+    The totals are None if the root is not a component node.
+    """
+
+    __slots__ = ('totals', 'quantity')
+
+    def __init__(self, features):
+        if features is None:
+            self.totals = None
+            self.quantity = None
+        else:
+            tp, price, self.quantity = features
+            self.totals = NodeTotals(price, {tp: 1}, {tp: 1})
+
+    def addChild(self, summary):
+        if self.totals is not None and summary.totals is not None:
+            self.totals.add(summary.totals, summary.quantity)
+
+class _SummaryFrame(_NodeFrame):
+    """
+    Private class.
+    An open node object below the deepest built level. The features are kept
+    until the object ends, the children are summarized as they end, and the
+    node is replaced by the summary of its subtree.
+    """
+
+    __slots__ = ('loader', 'summaries')
+
+    def __init__(self, loader):
+        super().__init__()
+        self.loader = loader
+        self.summaries = []
+
+    def set(self, value):
+        key = self.key
+        self.key = None
+        if key != 'children': self.features[key] = value
+
+    def open(self):
+        self.key = None
+        return self if 'class' in self.features else None
+
+    def addChildren(self, children):
+        self.summaries.extend(children)
+
+    def close(self):
+        if 'class' not in self.features: return None
+
+        summary = _Summary(self.loader._features(self.features))
+        for child in self.summaries:
+            summary.addChild(child)
+
+        return summary
+
+class _PendingFrame(_SummaryFrame):
+    """
+    Private class.
+    An open node object at the deepest built level. The node is built with its
+    features, its children are summarized and set as pending when it ends.
+    """
+
+    __slots__ = ('start', 'count')
+
+    def __init__(self, loader, start):
+        super().__init__(loader)
+        self.start = start
+        self.count = 0
+
+    def addChildren(self, children):
+        super().addChildren(children)
+        self.count += len(children)
+
+    def close(self):
+        summary = super().close()
+        if summary is None: return None
+
+        features = dict(self.features)
+        classname = features.pop('class')
+        node = strToClass(classname).fromFeatures(features)
+
+        if self.count:
+            loader = self.loader
+            pending = LazyChildren(loader, self.start, loader._endOffset(), self.count)
+            loader._setPending(node, pending, summary.totals)
+
+        return node
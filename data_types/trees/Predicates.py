@@ -0,0 +1,372 @@
+from ..nodes.NODESutil import unpackID
+from ..nodes.NodeTotals import toNumber
+
+# --- BASE PREDICATE ---
+
+class Predicate():
+    """
+    Class that describes a condition on the nodes of a component tree, used by
+    ComponentTree.query(). Every predicate checks a single node, and gives the
+    query planner some hints: the candidate nodes an index can provide, the
+    subtree the nodes must be in and the deepest level they can have.
+
+    Predicates are combined with the operators & (and), | (or) and ~ (not).
+    """
+
+    __slots__ = ()
+
+    def match(self, node):
+        """
+        Returns whether a node respects this predicate.
+
+        Args:
+            node (ComponentNode): the node to check
+
+        Returns:
+            bool: the node respects the predicate
+        """
+
+        raise NotImplementedError
+
+    def estimate(self, tree):
+        """
+        Returns the number of nodes an index of the tree can provide as candidates
+        for this predicate.
+
+        Args:
+            tree (ComponentTree): the searched tree
+
+        Returns:
+            int: the number of candidates
+            None: the predicate can't use an index
+        """
+
+        return None
+
+    def candidates(self, tree):
+        """
+        Returns the nodes provided by an index of the tree. Every node respecting
+        the predicate is a candidate, the candidates still need to be matched.
+        Valid only if estimate() doesn't return None.
+
+        Args:
+            tree (ComponentTree): the searched tree
+
+        Returns:
+            list[ComponentNode]: the candidate nodes
+        """
+
+        return []
+
+    def scope(self):
+        """
+        Returns the subtree the matching nodes belong to and their deepest level,
+        used to prune the scan of the tree.
+
+        Returns:
+            tuple[ComponentNode, int]: the root of the subtree and the deepest level, None if any
+        """
+
+        return None, None
+
+# OPERATORS
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __invert__(self):
+        return Not(self)
+
+# --- FEATURE PREDICATES ---
+
+class Equal(Predicate):
+    """
+    The feature is equal to a value. Uses the index of the feature if present.
+    """
+
+    __slots__ = ('key', 'value')
+
+    def __init__(self, key, value):
+        self.key = key
+        self.value = value
+
+    def match(self, node):
+        return node.getFeature(self.key) == self.value
+
+    def estimate(self, tree):
+        index = tree.getFeatureIndex(self.key)
+        if index is None: return None
+        return index.count(self.value)
+
+    def candidates(self, tree):
+        return tree.getFeatureIndex(self.key).get(self.value)
+
+    def __repr__(self):
+        return f'Equal({self.key!r}, {self.value!r})'
+
+class In(Predicate):
+    """
+    The feature is one of the passed values. Uses the index of the feature if present.
+    The values are looked up in a set when they are all hashable.
+    """
+
+    __slots__ = ('key', 'values', 'lookup')
+
+    def __init__(self, key, values):
+        self.key = key
+        self.values = list(values)
+
+        try:
+            self.lookup = set(self.values)
+        except TypeError:
+            self.lookup = self.values
+
+    def match(self, node):
+        try:
+            return node.getFeature(self.key) in self.lookup
+        except TypeError:
+            return node.getFeature(self.key) in self.values
+
+    def estimate(self, tree):
+        index = tree.getFeatureIndex(self.key)
+        if index is None: return None
+        return sum(index.count(value) for value in self.values)
+
+    def candidates(self, tree):
+        index = tree.getFeatureIndex(self.key)
+        nodes = []
+        for value in self.values:
+            nodes.extend(index.get(value))
+        return nodes
+
+    def __repr__(self):
+        return f'In({self.key!r}, {self.values!r})'
+
+class Range(Predicate):
+    """
+    The feature is a number between the bounds, bounds included. A missing bound
+    leaves the range open on that side. Not valid numbers never match.
+    """
+
+    __slots__ = ('key', 'low', 'high')
+
+    def __init__(self, key, low = None, high = None):
+        self.key = key
+        self.low = low
+        self.high = high
+
+    def match(self, node):
+        value = toNumber(node.getFeature(self.key), None)
+        if value is None: return False
+        if self.low is not None and value < self.low: return False
+        if self.high is not None and value > self.high: return False
+        return True
+
+    def __repr__(self):
+        return f'Range({self.key!r}, {self.low!r}, {self.high!r})'
+
+class IDPrefix(Predicate):
+    """
+    The ID starts with the passed prefix. The '#' and '-' characters are ignored,
+    so 'MEH' and '#MEH-0' are valid prefixes of '#MEH-001'. Uses the ID index if
+    present, with a binary search of the prefix in the sorted IDs. Only the empty
+    prefix matches the IDs that are not strings.
+    """
+
+    __slots__ = ('prefix',)
+
+    def __init__(self, prefix):
+        self.prefix = unpackID(prefix) or ''
+
+    @staticmethod
+    def sortKey(ID):
+        """
+        Returns the sort key of an indexed ID: the ID without the '#' and '-'
+        characters, None for the IDs that are not strings.
+
+        Args:
+            ID (PyObject): the ID
+
+        Returns:
+            str: the unpacked ID
+            None: the ID is not a string
+        """
+
+        if not isinstance(ID, str): return None
+        return unpackID(ID) or ''
+
+    def match(self, node):
+        if not isinstance(node.getFeature('ID'), str): return not self.prefix
+
+        ID = node.getID()
+        if ID.prefix is None: return not self.prefix
+        return (ID.prefix + ID.suffix).startswith(self.prefix)
+
+    def estimate(self, tree):
+        # every node matches the empty prefix, the index doesn't help
+        index = tree.getFeatureIndex('ID')
+        if index is None or not self.prefix: return None
+        return index.countPrefixed(self.prefix, self.sortKey)
+
+    def candidates(self, tree):
+        return tree.getFeatureIndex('ID').getPrefixed(self.prefix, self.sortKey)
+
+    def __repr__(self):
+        return f'IDPrefix({self.prefix!r})'
+
+# --- STRUCTURE PREDICATES ---
+
+class Level(Predicate):
+    """
+    The level of the node is between the bounds, bounds included. A single level
+    is matched passing only the lower bound. Prunes the scan below the highest level.
+    """
+
+    __slots__ = ('low', 'high')
+
+    def __init__(self, low, high = None):
+        self.low = low
+        self.high = low if high is None else high
+
+    def match(self, node):
+        return self.low <= node.getLevel() <= self.high
+
+    def scope(self):
+        return None, self.high
+
+    def __repr__(self):
+        return f'Level({self.low!r}, {self.high!r})'
+
+class Within(Predicate):
+    """
+    The node is in the subtree of the passed node. The subtree root is included,
+    unless inclusive is False. Restricts the scan to the subtree.
+    """
+
+    __slots__ = ('node', 'inclusive')
+
+    def __init__(self, node, inclusive = True):
+        self.node = node
+        self.inclusive = inclusive
+
+    def match(self, node):
+        if node is self.node: return self.inclusive
+
+        root = self.node
+        ancestor = node.getParent()
+        while ancestor is not None:
+            if ancestor is root: return True
+            ancestor = ancestor.getParent()
+        return False
+
+    def scope(self):
+        return self.node, None
+
+    def __repr__(self):
+        return f'Within({self.node.getFeature("ID")!r})'
+
+# --- LOGICAL PREDICATES ---
+
+class And(Predicate):
+    """
+    Every predicate is respected. Uses the predicate with the fewest index
+    candidates, and the narrowest scope of the predicates.
+    """
+
+    __slots__ = ('predicates',)
+
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def match(self, node):
+        return all(predicate.match(node) for predicate in self.predicates)
+
+    def estimate(self, tree):
+        best = self._bestPredicate(tree)
+        return None if best is None else best[1]
+
+    def candidates(self, tree):
+        return self._bestPredicate(tree)[0].candidates(tree)
+
+    def scope(self):
+        root = None
+        depth = None
+
+        for predicate in self.predicates:
+            predicateRoot, predicateDepth = predicate.scope()
+            if root is None: root = predicateRoot
+            if predicateDepth is not None and (depth is None or predicateDepth < depth):
+                depth = predicateDepth
+
+        return root, depth
+
+    def _bestPredicate(self, tree):
+        """
+        Private function.
+        Returns the predicate with the fewest index candidates and their number.
+        """
+
+        best = None
+        for predicate in self.predicates:
+            count = predicate.estimate(tree)
+            if count is not None and (best is None or count < best[1]):
+                best = (predicate, count)
+        return best
+
+    def __repr__(self):
+        return f'And{self.predicates!r}'
+
+class Or(Predicate):
+    """
+    At least one predicate is respected. Uses the indexes only if every predicate can.
+    """
+
+    __slots__ = ('predicates',)
+
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def match(self, node):
+        return any(predicate.match(node) for predicate in self.predicates)
+
+    def estimate(self, tree):
+        total = 0
+        for predicate in self.predicates:
+            count = predicate.estimate(tree)
+            if count is None: return None
+            total += count
+        return total
+
+    def candidates(self, tree):
+        nodes = {}
+        for predicate in self.predicates:
+            for node in predicate.candidates(tree):
+                nodes[id(node)] = node
+        return list(nodes.values())
+
+    def scope(self):
+        depths = [predicate.scope()[1] for predicate in self.predicates]
+        if not depths or None in depths: return None, None
+        return None, max(depths)
+
+    def __repr__(self):
+        return f'Or{self.predicates!r}'
+
+class Not(Predicate):
+    """
+    The predicate is not respected. Always scans.
+    """
+
+    __slots__ = ('predicate',)
+
+    def __init__(self, predicate):
+        self.predicate = predicate
+
+    def match(self, node):
+        return not self.predicate.match(node)
+
+    def __repr__(self):
+        return f'Not({self.predicate!r})'
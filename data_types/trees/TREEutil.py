@@ -1,5 +1,4 @@
-import sys
-
+from ..nodes.AbstractNode import NODE_CLASSES
 from ..nodes.CompositeNodes import (
     ProjectNode, AssemblyNode, LeafNode,
     MechanicalNode, ElectricalNode, ElectromechanicalNode, MeasuredNode, ProductNode,
@@ -7,7 +6,7 @@ from ..nodes.CompositeNodes import (
 
 def strToClass(classname):
     """
-    Returns a class from the classname given, if it is declared in this namespace.
+    Returns a node class from the classname given, if it is registered.
 
     Args:
         classname (str): the class name
@@ -16,7 +15,7 @@ def strToClass(classname):
         Class: the class extracted from the string
     """
 
-    return getattr(sys.modules[__name__], classname)
+    return NODE_CLASSES[classname]
 
 def classToStr(instance):
     """
@@ -31,35 +30,45 @@ def classToStr(instance):
 
     return instance.__class__.__name__
 
-def extractNode(data):
+def nodeData(node):
     """
-    Traverse the json object and extracts the nodes from it in a tree data structure.
-    The root of the tree is extracted.
+    Returns the json object of a node without its children: the class name, the
+    level of the assemblies and then all the features.
 
     Args:
-        data (dict[str, PyObject]): the json data
+        node (AbstractNode): the node to convert
 
     Returns:
-        AbstractNode: the root of the tree
+        dict[str, PyObject]: the json object of the node
+    """
+
+    data = {}
+    data['class'] = classname = classToStr(node)
+    if classname == 'AssemblyNode': data['level'] = node.level
+    data.update(node.items())
+
+    return data
+
+def extractNode(data):
     """
+    Builds the tree of a json object and returns its root. Every node is built
+    setting each feature once (see AbstractNode.fromFeatures()) and the children
+    of a node are inserted together, when they are complete, so the cached values
+    are calculated once per node. The 'class' key selects the class of the node
+    and is not stored as a feature. The json object is not modified.
 
-    if not data['children']:
-        del data['children']
-        classname = data['class']
-        return strToClass(classname)(**data)
+    Args:
+        data (dict[str, PyObject]): the json object of the root
 
-    classname = data['class']
-    del data['class']
-    if classname == 'AssemblyNode':
-        parent = strToClass(classname)(level = data['level'])
-    else:
-        parent = strToClass(classname)()
+    Returns:
+        AbstractNode: the root of the tree
+    """
 
-    for childData in data['children']:
-        child = extractNode(childData)
-        parent.addChild(child)
+    features = dict(data)
+    classname = features.pop('class')
+    childrenData = features.pop('children', None)
 
-    del data['children']
-    parent.addFeatures(**data)
+    node = strToClass(classname).fromFeatures(features)
+    if childrenData: node.addChildren([extractNode(childData) for childData in childrenData])
 
-    return parent
+    return node
@@ -0,0 +1,281 @@
+from .TreeDiff import NodeChange
+from ..nodes.AbstractNode import AbstractNode
+
+class TreeChanges():
+    """
+    Class that collects the changes of the nodes of a tree: the feature writes,
+    the inserted and removed subtrees and the fetched pending children. The
+    tree fills it during a batch, or with a single change outside a batch, and
+    delivers it to its listeners.
+
+    The changes are coalesced: the writes of the same feature keep the first
+    old value and the last new value, and are dropped if they restore the old
+    one, compared by type and value like the content hash; a subtree inserted and removed in the same batch is dropped, one
+    removed and inserted again is moved. Only the roots of the inserted and
+    removed subtrees are listed: the writes, insertions and removals inside a
+    subtree inserted in the same batch are part of the insertion.
+
+    The fetched children are not edits, they are listed apart so the models
+    can announce the new rows.
+    """
+
+    __slots__ = ('edited', 'oldValues', 'newValues', 'added', 'removed', 'fetched', '_nodes')
+
+# INIT
+
+    def __init__(self):
+        """
+        Initializes an empty set of changes.
+        """
+
+        self.edited = {}
+        self.oldValues = {}
+        self.newValues = {}
+        self.added = {}
+        self.removed = {}
+        self.fetched = {}
+        self._nodes = None
+
+# EVENTS
+
+    def featureChanged(self, node, key, oldValue, newValue):
+        """
+        Records a feature write.
+
+        Args:
+            node (AbstractNode): the edited node
+            key (str): the name of the feature
+            oldValue (PyObject): the previous value, None if the feature is new
+            newValue (PyObject): the current value, None if the feature is deleted
+        """
+
+        if self._isInserted(node): return
+
+        # flat values by node and feature, grouped by node only when read
+        entry = (id(node), key)
+        if entry not in self.newValues:
+            self.oldValues[entry] = oldValue
+            self.edited[id(node)] = node
+        self.newValues[entry] = newValue
+
+        self._nodes = None
+
+    def nodesAdded(self, node):
+        """
+        Records the insertion of a subtree.
+
+        Args:
+            node (AbstractNode): the root of the inserted subtree
+        """
+
+        if self._isInserted(node.getParent()): return
+
+        self.added[id(node)] = node
+
+    def nodesRemoved(self, node, parent = None):
+        """
+        Records the removal of a subtree.
+
+        Args:
+            node (AbstractNode): the root of the removed subtree
+            parent (AbstractNode): the previous parent of the node. Defaults to None.
+        """
+
+        if self._isInserted(parent): return
+
+        if self.added.pop(id(node), None) is None:
+            self.removed[id(node)] = node
+
+    def nodesFetched(self, node):
+        """
+        Records the fetch of a pending child.
+
+        Args:
+            node (AbstractNode): the fetched child
+        """
+
+        self.fetched[id(node)] = node
+
+    def _isInserted(self, node):
+        """
+        Private function.
+        Returns whether a node is in a subtree inserted in these changes: the
+        node or one of its ancestors was inserted, and not moved.
+        """
+
+        added = self.added
+        if not added: return False
+
+        removed = self.removed
+        while node is not None:
+            key = id(node)
+            if key in added and key not in removed: return True
+            node = node.getParent()
+
+        return False
+
+# GETTERS
+
+    def getFeatures(self, node):
+        """
+        Returns the changed features of a node, as key: (old, new).
+
+        Args:
+            node (AbstractNode): the node
+
+        Returns:
+            dict[str, tuple]: the changed features
+        """
+
+        entry = self._groupFeatures().get(id(node))
+        if entry is None: return {}
+
+        return dict(entry[1])
+
+    def getChangedNodes(self):
+        """
+        Returns the nodes with changed features.
+
+        Returns:
+            list[AbstractNode]: the edited nodes
+        """
+
+        newValues = self.newValues
+        sameValue = AbstractNode.sameValue
+        changed = {entry[0] for entry, oldValue in self.oldValues.items() if not sameValue(oldValue, newValues[entry])}
+
+        return [node for nodeID, node in self.edited.items() if nodeID in changed]
+
+    def _groupFeatures(self):
+        """
+        Private function.
+        Returns the changed features grouped by node, as id: (node, features),
+        without the ones that went back to the old value. The groups are cached
+        until the next feature write.
+        """
+
+        if self._nodes is not None: return self._nodes
+
+        nodes = self._nodes = {}
+        newValues = self.newValues
+        sameValue = AbstractNode.sameValue
+        for entry, oldValue in self.oldValues.items():
+            newValue = newValues[entry]
+            if sameValue(oldValue, newValue): continue
+
+            nodeID, key = entry
+            group = nodes.get(nodeID)
+            if group is None: group = nodes[nodeID] = (self.edited[nodeID], {})
+            group[1][key] = (oldValue, newValue)
+
+        return nodes
+
+    def getAdded(self):
+        """
+        Returns the roots of the inserted subtrees, the moved ones included.
+
+        Returns:
+            list[AbstractNode]: the inserted nodes
+        """
+
+        return list(self.added.values())
+
+    def getRemoved(self):
+        """
+        Returns the roots of the removed subtrees, the moved ones included.
+
+        Returns:
+            list[AbstractNode]: the removed nodes
+        """
+
+        return list(self.removed.values())
+
+    def getChanges(self):
+        """
+        Returns the node level changes, like the ones of TreeDiff: the removed
+        nodes, the added ones, the moved ones and the ones with changed features.
+        The old and new node of a change are the same node.
+
+        Returns:
+            list[NodeChange]: the changes
+        """
+
+        changes = [
+            NodeChange('removed', node, None)
+            for key, node in self.removed.items() if key not in self.added
+        ]
+        changes.extend(
+            NodeChange('added', None, node)
+            for key, node in self.added.items() if key not in self.removed
+        )
+        changes.extend(
+            NodeChange('moved', node, node)
+            for key, node in self.added.items() if key in self.removed
+        )
+
+        for node, features in self._groupFeatures().values():
+            changes.append(NodeChange('changed', node, node, dict(features)))
+
+        return changes
+
+# BOOLEANS
+
+    def hasEdits(self):
+        """
+        Returns whether the content of the tree changed. The fetched children
+        don't change it.
+
+        Returns:
+            bool: some nodes were edited, inserted or removed
+        """
+
+        if self.added or self.removed: return True
+        newValues = self.newValues
+        sameValue = AbstractNode.sameValue
+        return any(not sameValue(oldValue, newValues[entry]) for entry, oldValue in self.oldValues.items())
+
+    def isStructural(self):
+        """
+        Returns whether rows were inserted, removed or fetched.
+
+        Returns:
+            bool: the structure of the tree changed
+        """
+
+        return bool(self.added or self.removed or self.fetched)
+
+    def isEmpty(self):
+        """
+        Returns whether nothing changed.
+
+        Returns:
+            bool: there are no changes
+        """
+
+        return not (self.isStructural() or self.hasEdits())
+
+# REPRESENTATION
+
+    def toString(self):
+        """
+        Returns a string version of the changes, one per line.
+
+        Returns:
+            str: the changes in string format
+        """
+
+        return '\n'.join(change.toString() for change in self.getChanges())
+
+# DUNDERS
+
+    def __iter__(self):
+        return iter(self.getChanges())
+
+    def __bool__(self):
+        return not self.isEmpty()
+
+    def __repr__(self):
+        return self.toString()
+
+    def __str__(self):
+        return self.toString()
@@ -0,0 +1,385 @@
+from bisect import bisect_left
+from collections import deque
+
+class TreeDiff():
+    """
+    Class that holds the structural differences between two component trees:
+    the nodes added, removed, moved and with changed features, going from the
+    old tree to the new one.
+
+    The nodes are matched by ID through the ID indexes of the trees. The IDs
+    shared by more nodes, or missing, match only between the children of two
+    matched nodes, in order. The trees are visited together from the roots and
+    the matched subtrees with the same content hash are skipped, so the cost
+    depends on the changed part of the trees: a node is visited only if its
+    subtree changed, or if it is in an added or removed subtree.
+    """
+
+    __slots__ = ('added', 'removed', 'moved', 'changed')
+
+# INIT
+
+    def __init__(self):
+        """
+        Initializes an empty diff.
+        """
+
+        self.added = []
+        self.removed = []
+        self.moved = []
+        self.changed = []
+
+    @classmethod
+    def compare(cls, oldTree, newTree, pairs = None):
+        """
+        Returns the differences between two component trees. The pending children
+        of both trees are fetched.
+
+        With a pairs list, every matched node is listed with its match, the nodes
+        of the skipped subtrees too, so the cost becomes linear in the size of the
+        trees.
+
+        Args:
+            oldTree (ComponentTree): the tree before the changes
+            newTree (ComponentTree): the tree after the changes
+            pairs (list): filled with the (old node, new node) matches. Defaults to None.
+
+        Returns:
+            TreeDiff: the differences
+        """
+
+        oldTree.fetchAll()
+        newTree.fetchAll()
+
+        diff = cls()
+        _Matcher(diff, oldTree, newTree, pairs).run()
+
+        return diff
+
+# GETTERS
+
+    def getChanges(self):
+        """
+        Returns every change: the removed nodes, the added ones, the moved ones
+        and the ones with changed features.
+
+        Returns:
+            list[NodeChange]: the changes
+        """
+
+        return self.removed + self.added + self.moved + self.changed
+
+    def isEmpty(self):
+        """
+        Returns whether the trees have the same content.
+
+        Returns:
+            bool: there are no differences
+        """
+
+        return not (self.added or self.removed or self.moved or self.changed)
+
+# REPRESENTATION
+
+    def toString(self):
+        """
+        Returns a string version of the diff, one change per line.
+
+        Returns:
+            str: the diff in string format
+        """
+
+        return '\n'.join(change.toString() for change in self.getChanges())
+
+# DUNDERS
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.moved) + len(self.changed)
+
+    def __iter__(self):
+        return iter(self.getChanges())
+
+    def __bool__(self):
+        return not self.isEmpty()
+
+    def __repr__(self):
+        return self.toString()
+
+    def __str__(self):
+        return self.toString()
+
+class NodeChange():
+    """
+    Class that describes the change of a single node. The kind is 'added',
+    'removed', 'moved' or 'changed'. The old node belongs to the old tree and
+    the new node to the new one, the missing one is None. The features map the
+    changed keys to their old and new values, a missing feature is None; a
+    change of class is under the 'class' key.
+    """
+
+    __slots__ = ('kind', 'ID', 'oldNode', 'newNode', 'features')
+
+    SYMBOLS = {'added': '+', 'removed': '-', 'moved': '>', 'changed': '~'}
+
+    def __init__(self, kind, oldNode, newNode, features = None):
+        self.kind = kind
+        self.oldNode = oldNode
+        self.newNode = newNode
+        self.features = features or {}
+        self.ID = (newNode if newNode is not None else oldNode).getFeature('ID')
+
+    def getOldParentID(self):
+        """
+        Returns the ID of the parent of the node in the old tree.
+
+        Returns:
+            str: the ID of the old parent
+            None: the node is not in the old tree or it is the root
+        """
+
+        return _parentID(self.oldNode)
+
+    def getNewParentID(self):
+        """
+        Returns the ID of the parent of the node in the new tree.
+
+        Returns:
+            str: the ID of the new parent
+            None: the node is not in the new tree or it is the root
+        """
+
+        return _parentID(self.newNode)
+
+    def toString(self):
+        """
+        Returns a one line description of the change.
+
+        Returns:
+            str: the change in string format
+        """
+
+        string = f'{self.SYMBOLS[self.kind]} {self.ID}'
+        if self.kind == 'added': string += f' in {self.getNewParentID()}'
+        elif self.kind == 'removed': string += f' from {self.getOldParentID()}'
+        elif self.kind == 'moved':
+            string += f' from {self.getOldParentID()}[{self.oldNode.getIndex()}]'
+            string += f' to {self.getNewParentID()}[{self.newNode.getIndex()}]'
+        else:
+            string += ': ' + ', '.join(f'{key} {old!r} -> {new!r}' for key, (old, new) in self.features.items())
+
+        return string
+
+    def __repr__(self):
+        return self.toString()
+
+    def __str__(self):
+        return self.toString()
+
+# --- UTILITY ---
+
+def _parentID(node):
+    """
+    Private function.
+    Returns the ID of the parent of a node, None without a node or a parent.
+    """
+
+    if node is None or node.getParent() is None: return None
+    return node.getParent().getFeature('ID')
+
+def _preorder(node):
+    """
+    Private function.
+    Yields the nodes of a subtree in preorder.
+    """
+
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(node.getChildren()))
+
+def _featureChanges(oldNode, newNode):
+    """
+    Private function.
+    Returns the changed features of two matched nodes, as key: (old, new).
+    """
+
+    changes = {}
+    if oldNode.__class__ is not newNode.__class__:
+        changes['class'] = (oldNode.__class__.__name__, newNode.__class__.__name__)
+
+    if oldNode.sameFeatures(newNode): return changes
+
+    # the values are compared by type too, like the hashes
+    oldFeatures = oldNode.items()
+    newFeatures = newNode.items()
+    sameValue = oldNode.sameValue
+
+    for key, value in newFeatures.items():
+        oldValue = oldFeatures.get(key)
+        if key not in oldFeatures or not sameValue(oldValue, value):
+            changes[key] = (oldValue, value)
+
+    for key, value in oldFeatures.items():
+        if key not in newFeatures: changes[key] = (value, None)
+
+    return changes
+
+def _stableRows(rows):
+    """
+    Private function.
+    Returns the positions of a longest increasing subsequence of rows: the
+    children that kept their order, the others moved.
+    """
+
+    tails = []
+    tailPositions = []
+    previous = [None] * len(rows)
+
+    for position, row in enumerate(rows):
+        slot = bisect_left(tails, row)
+        if slot: previous[position] = tailPositions[slot - 1]
+        if slot == len(tails):
+            tails.append(row)
+            tailPositions.append(position)
+        else:
+            tails[slot] = row
+            tailPositions[slot] = position
+
+    stable = set()
+    position = tailPositions[-1] if tailPositions else None
+    while position is not None:
+        stable.add(position)
+        position = previous[position]
+
+    return stable
+
+class _Matcher():
+    """
+    Private class.
+    Visits two trees together and fills a diff.
+    """
+
+    __slots__ = ('diff', 'oldTree', 'newTree', 'pairs', 'oldIDs', 'newIDs')
+
+    def __init__(self, diff, oldTree, newTree, pairs = None):
+        self.diff = diff
+        self.oldTree = oldTree
+        self.newTree = newTree
+        self.pairs = pairs
+        self.oldIDs = oldTree.addIndex('ID', True)
+        self.newIDs = newTree.addIndex('ID', True)
+
+    def isUnique(self, ID):
+        """
+        Returns whether an ID belongs to one node in both trees, so the nodes
+        match wherever they are.
+        """
+
+        return self.oldIDs.count(ID) == 1 and self.newIDs.count(ID) == 1
+
+    def run(self):
+        """
+        Matches the roots and visits the pairs of nodes whose subtrees differ.
+        """
+
+        diff = self.diff
+        pairs = self.pairs
+        oldRoot = self.oldTree.getRoot()
+        stack = [(oldRoot, self.newTree.getRoot())]
+
+        while stack:
+            oldNode, newNode = stack.pop()
+
+            if oldNode is None:
+                diff.added.append(NodeChange('added', None, newNode))
+                self._addedChildren(newNode, stack)
+                continue
+
+            if oldNode.getHash() == newNode.getHash():
+                if pairs is not None: pairs.extend(zip(_preorder(oldNode), _preorder(newNode)))
+                continue
+
+            if pairs is not None: pairs.append((oldNode, newNode))
+
+            changes = _featureChanges(oldNode, newNode)
+            if changes: diff.changed.append(NodeChange('changed', oldNode, newNode, changes))
+
+            self._matchChildren(oldNode, newNode, oldRoot, stack)
+
+    def _matchChildren(self, oldNode, newNode, oldRoot, stack):
+        """
+        Matches the children of two matched nodes, adding the pairs to the stack
+        and the moved, added and removed nodes to the diff.
+        """
+
+        diff = self.diff
+        isUnique = self.isUnique
+        oldIDs = self.oldIDs
+
+        # the children with an ambiguous ID, matched in order
+        fallback = {}
+        for child in oldNode.getChildren():
+            ID = child.getFeature('ID')
+            if not isUnique(ID): fallback.setdefault(ID, deque()).append(child)
+
+        stayed = []
+        for child in newNode.getChildren():
+            ID = child.getFeature('ID')
+            if isUnique(ID):
+                match = oldIDs.first(ID)
+                if match is oldRoot: match = None
+            else:
+                queue = fallback.get(ID)
+                match = queue.popleft() if queue else None
+
+            if match is not None and match.getParent() is oldNode:
+                stayed.append((match, child))
+            elif match is not None:
+                diff.moved.append(NodeChange('moved', match, child))
+                stack.append((match, child))
+            else:
+                stack.append((None, child))
+
+        # the children that kept their parent but not their order
+        stable = _stableRows([match.getIndex() for match, _ in stayed])
+        for position, (match, child) in enumerate(stayed):
+            if position not in stable: diff.moved.append(NodeChange('moved', match, child))
+            stack.append((match, child))
+
+        for queue in fallback.values():
+            for child in queue:
+                self._removed(child)
+
+    def _addedChildren(self, newNode, stack):
+        """
+        Matches the children of an added node: the ones with a unique ID were
+        moved from the old tree, the others are added too.
+        """
+
+        oldRoot = self.oldTree.getRoot()
+        for child in newNode.getChildren():
+            ID = child.getFeature('ID')
+            match = self.oldIDs.first(ID) if self.isUnique(ID) else None
+            if match is oldRoot: match = None
+
+            if match is not None:
+                self.diff.moved.append(NodeChange('moved', match, child))
+            stack.append((match, child))
+
+    def _removed(self, node):
+        """
+        Adds a node of the old tree without a match to the removed nodes, with its
+        descendants. The descendants with a unique ID were moved and are matched
+        from the new tree.
+        """
+
+        removed = self.diff.removed
+        isUnique = self.isUnique
+        stack = [node]
+        while stack:
+            current = stack.pop()
+            if current is not node and isUnique(current.getFeature('ID')): continue
+
+            removed.append(NodeChange('removed', current, None))
+            stack.extend(reversed(current.getChildren()))
@@ -0,0 +1,418 @@
+from .TreeDiff import TreeDiff
+from .TREEutil import strToClass
+
+class TreeMerge():
+    """
+    Class that merges two versions of a component tree edited in parallel from
+    a common base: the changes from the base to their version are applied to
+    our version, in place, and the conflicting ones are reported.
+
+    The nodes are matched like in TreeDiff, by ID. Their feature edits, the
+    changes of class, the inserted nodes, the removed ones and the moves are
+    applied when our version didn't touch the same things. A change of class
+    replaces our node with a node of their class, with the merged features and
+    our children. The conflicts keep our version:
+
+        - feature: both versions changed the same feature to different values;
+        - class: both versions changed the class of a node differently, or
+          their version changed the class of the root;
+        - edit/delete: their version changed a node removed in ours;
+        - delete/edit: their version removed a subtree that ours changed;
+        - move/move: both versions moved a node to different parents;
+        - move/delete: their version moved a node in a place removed in ours;
+        - move/skipped: their version moved a node in a node they inserted,
+          not inserted because of another conflict;
+        - add/delete: their version inserted a node in a place removed in ours;
+        - add/add: both versions inserted different nodes with the same new ID.
+
+    The merge works on the trees, not on the json objects: the three versions
+    can be read with the streaming or the binary readers. The changes to our
+    version are made in a batch, its listeners are notified once.
+    """
+
+    __slots__ = ('applied', 'conflicts')
+
+# INIT
+
+    def __init__(self):
+        """
+        Initializes an empty merge result.
+        """
+
+        self.applied = []
+        self.conflicts = []
+
+    @classmethod
+    def merge(cls, base, ours, theirs):
+        """
+        Applies to our tree the changes from the base tree to their tree.
+
+        Args:
+            base (ComponentTree): the common base
+            ours (ComponentTree): our version, modified in place
+            theirs (ComponentTree): their version
+
+        Returns:
+            TreeMerge: the applied changes and the conflicts
+        """
+
+        merge = cls()
+        with ours.batch():
+            _Merger(merge, base, ours, theirs).run()
+
+        return merge
+
+# GETTERS
+
+    def hasConflicts(self):
+        """
+        Returns whether some changes were not applied because of a conflict.
+
+        Returns:
+            bool: the merge has conflicts
+        """
+
+        return bool(self.conflicts)
+
+# REPRESENTATION
+
+    def toString(self):
+        """
+        Returns a string version of the merge: the applied changes, then the
+        conflicts, one per line.
+
+        Returns:
+            str: the merge in string format
+        """
+
+        lines = [change.toString() for change in self.applied]
+        lines.extend(conflict.toString() for conflict in self.conflicts)
+
+        return '\n'.join(lines)
+
+# DUNDERS
+
+    def __repr__(self):
+        return self.toString()
+
+    def __str__(self):
+        return self.toString()
+
+class MergeConflict():
+    """
+    Class that describes a change of their version not applied because it
+    conflicts with ours. The nodes of the three versions are given when they
+    exist, the key is the feature of the feature conflicts.
+    """
+
+    __slots__ = ('kind', 'ID', 'baseNode', 'oursNode', 'theirsNode', 'key')
+
+    def __init__(self, kind, baseNode, oursNode, theirsNode, key = None):
+        self.kind = kind
+        self.baseNode = baseNode
+        self.oursNode = oursNode
+        self.theirsNode = theirsNode
+        self.key = key
+
+        node = next(node for node in (theirsNode, oursNode, baseNode) if node is not None)
+        self.ID = node.getFeature('ID')
+
+    def toString(self):
+        """
+        Returns a one line description of the conflict.
+
+        Returns:
+            str: the conflict in string format
+        """
+
+        string = f'! {self.kind} {self.ID}'
+        if self.key is not None:
+            ours = self.oursNode.getFeature(self.key)
+            theirs = self.theirsNode.getFeature(self.key)
+            string += f': {self.key} ours {ours!r}, theirs {theirs!r}'
+
+        return string
+
+    def __repr__(self):
+        return self.toString()
+
+    def __str__(self):
+        return self.toString()
+
+class _Merger():
+    """
+    Private class.
+    Applies the changes of their version to ours and fills a merge result.
+    """
+
+    def __init__(self, merge, base, ours, theirs):
+        self.merge = merge
+        self.base = base
+        self.ours = ours
+        self.theirs = theirs
+
+    def run(self):
+        """
+        Diffs both versions against the base, then applies their feature edits,
+        insertions and moves, and removals last, so the nodes moved out of a
+        removed subtree are saved.
+        """
+
+        oursPairs = []
+        theirsPairs = []
+        oursDiff = TreeDiff.compare(self.base, self.ours, oursPairs)
+        theirsDiff = TreeDiff.compare(self.base, self.theirs, theirsPairs)
+
+        # base node -> our node, and back; their node -> base node
+        self.toOurs = {id(baseNode): node for baseNode, node in oursPairs}
+        self.oursBase = {id(node): baseNode for baseNode, node in oursPairs}
+        self.theirsBase = {id(node): baseNode for baseNode, node in theirsPairs}
+
+        # their inserted nodes -> our copies, and the ones not inserted
+        self.inserted = {}
+        self.copies = set()
+        self.skipped = set()
+
+        self.oursChanged = {id(change.oldNode): change for change in oursDiff.changed}
+        self.oursMoved = {id(change.oldNode) for change in oursDiff.moved}
+
+        self._applyFeatures(theirsDiff.changed)
+        self._applyPlacements(theirsDiff.added, theirsDiff.moved)
+        self._applyRemovals(theirsDiff.removed)
+
+    def _conflict(self, kind, baseNode, oursNode, theirsNode, key = None):
+        """
+        Adds a conflict to the merge result.
+        """
+
+        self.merge.conflicts.append(MergeConflict(kind, baseNode, oursNode, theirsNode, key))
+
+    def _resolve(self, node):
+        """
+        Returns our node matching one of their nodes, None if it's not in ours.
+        """
+
+        inserted = self.inserted.get(id(node))
+        if inserted is not None: return inserted
+
+        baseNode = self.theirsBase.get(id(node))
+        if baseNode is None: return None
+
+        return self.toOurs.get(id(baseNode))
+
+# FEATURES
+
+    def _applyFeatures(self, changes):
+        """
+        Applies their feature edits to the matched nodes, unless our version
+        edited the same features differently.
+        """
+
+        for change in changes:
+            baseNode = change.oldNode
+            theirsNode = change.newNode
+            node = self.toOurs.get(id(baseNode))
+            if node is None:
+                self._conflict('edit/delete', baseNode, None, theirsNode)
+                continue
+
+            oursChange = self.oursChanged.get(id(baseNode))
+            oursFeatures = oursChange.features if oursChange else {}
+            theirsFeatures = theirsNode.items()
+
+            applied = False
+            classname = None
+            for key, (_, value) in change.features.items():
+                if key in oursFeatures:
+                    if node.sameValue(oursFeatures[key][1], value): continue
+                    if key == 'class': self._conflict('class', baseNode, node, theirsNode)
+                    else: self._conflict('feature', baseNode, node, theirsNode, key)
+                    continue
+
+                # the class is changed last, with the merged features
+                if key == 'class':
+                    classname = value
+                elif key in theirsFeatures:
+                    node.addFeature(key, value)
+                    applied = True
+                else:
+                    node.delFeature(key)
+                    applied = True
+
+            if classname is not None:
+                if self._swapClass(baseNode, node, classname): applied = True
+                else: self._conflict('class', baseNode, node, theirsNode)
+
+            if applied: self.merge.applied.append(change)
+
+    def _swapClass(self, baseNode, node, classname):
+        """
+        Replaces one of our nodes with a node of another class, with the same
+        features and children, in the same place. Returns False if the node is
+        the root, which is kept.
+        """
+
+        parent = node.getParent()
+        if parent is None: return False
+
+        newNode = strToClass(classname).fromFeatures(node.items())
+        children = list(node.getChildren())
+        node.removeChildren(children)
+        newNode.addChildren(children)
+
+        position = node.getIndex()
+        node.detach()
+        parent.insertChild(newNode, position)
+
+        self.toOurs[id(baseNode)] = newNode
+        del self.oursBase[id(node)]
+        self.oursBase[id(newNode)] = baseNode
+
+        return True
+
+# PLACEMENTS
+
+    def _applyPlacements(self, added, moved):
+        """
+        Inserts their new nodes and moves the matched ones, in the preorder of
+        their tree, so the parents and the previous siblings are placed first.
+        """
+
+        placements = {id(change.newNode): change for change in added}
+        placements.update((id(change.newNode), change) for change in moved)
+        if not placements: return
+
+        for node in self.theirs.iterPreorder():
+            change = placements.get(id(node))
+            if change is None: continue
+
+            if change.kind == 'added': self._insert(change)
+            else: self._move(change)
+
+    def _insert(self, change):
+        """
+        Inserts a copy of one of their new nodes, without its children, which are
+        placed on their own.
+        """
+
+        theirsNode = change.newNode
+        parent = self._resolve(theirsNode.getParent())
+        if parent is None:
+            # the children of a skipped node are skipped with it
+            if id(theirsNode.getParent()) not in self.skipped: self._conflict('add/delete', None, None, theirsNode)
+            self.skipped.add(id(theirsNode))
+            return
+
+        ID = theirsNode.getFeature('ID')
+        if self.base.getFeatureIndex('ID').count(ID) == 0:
+            # a new ID inserted by both versions
+            twins = self.ours.getFeatureIndex('ID').get(ID)
+            if twins:
+                twin = next((
+                    twin for twin in twins
+                    if id(twin) not in self.copies and twin.getParent() is parent and twin.sameFeatures(theirsNode)
+                ), None)
+                if twin is None:
+                    self._conflict('add/add', None, twins[0], theirsNode)
+                    self.skipped.add(id(theirsNode))
+                else:
+                    self.inserted[id(theirsNode)] = twin
+                return
+
+        node = theirsNode.superficialCopy()
+        parent.insertChild(node, self._position(theirsNode, parent))
+        self.inserted[id(theirsNode)] = node
+        self.copies.add(id(node))
+        self.merge.applied.append(change)
+
+    def _move(self, change):
+        """
+        Moves one of our nodes where their version moved it, unless ours moved it
+        somewhere else or removed it.
+        """
+
+        baseNode = change.oldNode
+        theirsNode = change.newNode
+        node = self.toOurs.get(id(baseNode))
+        parent = self._resolve(theirsNode.getParent())
+
+        if node is not None and parent is None and id(theirsNode.getParent()) in self.skipped:
+            self._conflict('move/skipped', baseNode, node, theirsNode)
+            return
+
+        if node is None or parent is None:
+            self._conflict('move/delete', baseNode, node, theirsNode)
+            return
+
+        if id(baseNode) in self.oursMoved:
+            if node.getParent() is not parent: self._conflict('move/move', baseNode, node, theirsNode)
+            return
+
+        # a node can't be moved inside itself
+        if any(ancestor is node for ancestor in parent.iterAncestors()):
+            self._conflict('move/move', baseNode, node, theirsNode)
+            return
+
+        node.detach()
+        parent.insertChild(node, self._position(theirsNode, parent))
+        self.merge.applied.append(change)
+
+    def _position(self, theirsNode, parent):
+        """
+        Returns the position of our parent where one of their nodes goes: after
+        the nearest previous sibling in their tree that is a child of our parent.
+        """
+
+        siblings = theirsNode.getParent().getChildren()
+        for position in range(theirsNode.getIndex() - 1, -1, -1):
+            sibling = self._resolve(siblings[position])
+            if sibling is not None and sibling.getParent() is parent: return sibling.getIndex() + 1
+
+        return 0
+
+# REMOVALS
+
+    def _applyRemovals(self, changes):
+        """
+        Removes the subtrees removed in their version. A subtree is kept whole
+        if our version edited, moved or inserted any node in it.
+        """
+
+        removed = {id(change.oldNode) for change in changes}
+
+        for change in changes:
+            baseNode = change.oldNode
+            if id(baseNode.getParent()) in removed: continue
+
+            node = self.toOurs.get(id(baseNode))
+            if node is None: continue
+
+            conflict = None
+            for descendant in self._subtree(node):
+                descendantBase = self.oursBase.get(id(descendant))
+                if (
+                    descendantBase is None or id(descendantBase) not in removed or
+                    id(descendantBase) in self.oursChanged or id(descendantBase) in self.oursMoved
+                ):
+                    conflict = descendant
+                    break
+
+            if conflict is not None:
+                self._conflict('delete/edit', baseNode, node, None)
+                continue
+
+            node.detach()
+            self.merge.applied.append(change)
+
+    @staticmethod
+    def _subtree(node):
+        """
+        Private function.
+        Yields the nodes of a subtree in preorder.
+        """
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.getChildren()))
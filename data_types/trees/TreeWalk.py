@@ -0,0 +1,212 @@
+from itertools import islice
+
+class TreeWalk():
+    """
+    Class that describes a lazy pipeline over the nodes of a tree. The walk
+    visits a subtree in preorder, postorder or level order, and the stages are
+    chained on it: filter, map, prune, stop, take and, at the end, a collector like
+    toList(), first() or groupBy().
+
+    Every stage returns a new walk, so a walk can be reused as a base for others.
+    Nothing is visited until the walk is iterated or collected, and take() or
+    first() stop the traversal early.
+
+    The prune and stop stages act during the traversal, so they always receive
+    the nodes, wherever they are in the chain. The pending children of the tree
+    are fetched when the walk starts.
+    """
+
+    __slots__ = ('tree', 'root', 'order', 'prunes', 'stops', 'stages', 'limit')
+
+    ORDERS = ('preorder', 'postorder', 'levelorder')
+
+# INIT
+
+    def __init__(self, tree, root, order = 'preorder'):
+        """
+        Initializes an empty pipeline.
+
+        Args:
+            tree (AbstractTree): the tree that provides the traversals
+            root (AbstractNode): the root of the visited subtree
+            order (str): 'preorder', 'postorder' or 'levelorder'. Defaults to 'preorder'.
+        """
+
+        if order not in self.ORDERS: raise ValueError(f'unknown traversal order: {order}')
+
+        self.tree = tree
+        self.root = root
+        self.order = order
+        self.prunes = ()
+        self.stops = ()
+        self.stages = ()
+        self.limit = None
+
+# STAGES
+
+    def filter(self, function):
+        """
+        Keeps only the items for which the function returns True.
+
+        Args:
+            function (callable): the test on the items
+
+        Returns:
+            TreeWalk: the extended walk
+        """
+
+        return self._extend(stages = self.stages + ((True, function),))
+
+    def map(self, function):
+        """
+        Replaces the items with the result of the function.
+
+        Args:
+            function (callable): the transformation of the items
+
+        Returns:
+            TreeWalk: the extended walk
+        """
+
+        return self._extend(stages = self.stages + ((False, function),))
+
+    def prune(self, function):
+        """
+        Skips the nodes for which the function returns True, together with all their
+        descendants. The descendants are not visited at all.
+
+        Args:
+            function (callable): the test on the nodes
+
+        Returns:
+            TreeWalk: the extended walk
+        """
+
+        return self._extend(prunes = self.prunes + (function,))
+
+    def stop(self, function):
+        """
+        Doesn't descend below the nodes for which the function returns True. The
+        nodes themselves are still visited.
+
+        Args:
+            function (callable): the test on the nodes
+
+        Returns:
+            TreeWalk: the extended walk
+        """
+
+        return self._extend(stops = self.stops + (function,))
+
+    def take(self, number):
+        """
+        Stops the walk after the passed number of items.
+
+        Args:
+            number (int): the maximum number of items
+
+        Returns:
+            TreeWalk: the extended walk
+        """
+
+        limit = number if self.limit is None else min(self.limit, number)
+        return self._extend(limit = limit)
+
+# COLLECTORS
+
+    def toList(self):
+        """
+        Returns the items of the walk in a list.
+
+        Returns:
+            list[PyObject]: the items
+        """
+
+        return list(self)
+
+    def first(self):
+        """
+        Returns the first item of the walk, stopping the traversal there.
+
+        Returns:
+            PyObject: the first item
+            None: the walk is empty
+        """
+
+        return next(iter(self), None)
+
+    def groupBy(self, function):
+        """
+        Groups the items of the walk by the value returned by the function.
+
+        Args:
+            function (callable): the grouping key of the items
+
+        Returns:
+            dict[PyObject, list[PyObject]]: the items of every key, in walk order
+        """
+
+        groups = {}
+        for item in self:
+            groups.setdefault(function(item), []).append(item)
+
+        return groups
+
+    def count(self):
+        """
+        Returns the number of items of the walk.
+
+        Returns:
+            int: the number of items
+        """
+
+        return sum(1 for item in self)
+
+# UTILITY
+
+    def _extend(self, prunes = None, stops = None, stages = None, limit = None):
+        """
+        Private function.
+        Returns a copy of this walk with the passed parts replaced.
+        """
+
+        walk = TreeWalk(self.tree, self.root, self.order)
+        walk.prunes = self.prunes if prunes is None else prunes
+        walk.stops = self.stops if stops is None else stops
+        walk.stages = self.stages if stages is None else stages
+        walk.limit = self.limit if limit is None else limit
+
+        return walk
+
+    @staticmethod
+    def _combine(functions):
+        """
+        Private function.
+        Returns a single test that is True when any of the functions is True.
+        """
+
+        if not functions: return None
+        if len(functions) == 1: return functions[0]
+        return lambda node: any(function(node) for function in functions)
+
+# DUNDERS
+
+    def __iter__(self):
+        if self.root is None: return iter(())
+
+        self.tree.fetchAll()
+        prune = self._combine(self.prunes)
+        stop = self._combine(self.stops)
+        if self.order == 'preorder':
+            items = self.tree._iterPreorder(self.root, prune, stop)
+        elif self.order == 'postorder':
+            items = self.tree._iterPostorder(self.root, prune, stop)
+        else:
+            items = self.tree._iterLevelorder(self.root, prune, stop)
+
+        for isFilter, function in self.stages:
+            items = filter(function, items) if isFilter else map(function, items)
+
+        if self.limit is not None: items = islice(items, self.limit)
+
+        return items